@@ -0,0 +1,113 @@
+-- Server-side aggregation for the reportes page
+-- Generated by tests/reportes_aggregation.py, which also holds the reference
+-- aggregation these functions must match and the benchmark against the
+-- client-side Maps.
+--
+-- The page calls:
+--   supabase.rpc('reportes_unidades_serie', { desde, hasta, modo })  -- line chart
+--   supabase.rpc('reportes_unidades_por_ciudad', { desde, hasta })    -- donut
+--   supabase.rpc('reportes_entrevistas_serie', { desde, hasta, modo })  -- bar chart
+-- with modo 'day' | 'week' | 'month' and null desde/hasta for an open range.
+--
+-- The functions read daily summaries (a few rows per day and ciudad), so
+-- their cost no longer grows with the tables. Refresh the summaries after
+-- imports and on a schedule, e.g. with pg_cron:
+--   SELECT cron.schedule('reportes-resumen', '*/15 * * * *', 'SELECT public.refresh_reportes_resumen()');
+
+-- Date of a 'YYYY-MM-DD...' value; null for anything else (free text,
+-- impossible dates) instead of failing the whole query. Built only from
+-- immutable functions (make_date, not a ::date cast) so the planner inlines it.
+CREATE OR REPLACE FUNCTION public.reportes_fecha(raw text)
+RETURNS date
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT CASE
+    WHEN raw ~ '^[1-9][0-9]{3}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])'
+     AND substr(raw, 9, 2)::int <= extract(day FROM make_date(substr(raw, 1, 4)::int, substr(raw, 6, 2)::int, 1)
+                                                 + interval '1 month - 1 day')
+    THEN make_date(substr(raw, 1, 4)::int, substr(raw, 6, 2)::int, substr(raw, 9, 2)::int)
+  END
+$$;
+
+-- Chart bucket of a day: 'YYYY-MM-DD', ISO 'YYYY-Www' or 'YYYY-MM'
+CREATE OR REPLACE FUNCTION public.reportes_bucket(dia date, modo text)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT CASE modo
+    WHEN 'day' THEN to_char(dia, 'YYYY-MM-DD')
+    WHEN 'week' THEN to_char(dia, 'IYYY-"W"IW')
+    ELSE to_char(dia, 'YYYY-MM')
+  END
+$$;
+
+-- Unidades registered and sold per day and ciudad (dated by entrega, else
+-- created_at, else updated_at, as the page does)
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.reportes_unidades_diarias AS
+SELECT dia, ciudad, count(*) AS registradas, count(*) FILTER (WHERE vendida) AS vendidas
+FROM (
+  SELECT public.reportes_fecha(COALESCE(NULLIF(u.entrega, ''), u.created_at::text, u.updated_at::text)) AS dia,
+         COALESCE(c.nombre, NULLIF(u.ciudad, ''), 'N/A') AS ciudad,
+         u.estado_comercial = 'Vendida' AS vendida
+  FROM public.unidades u
+  LEFT JOIN public.ciudades c ON c.id = u.ciudad_id
+  WHERE u.deleted_at IS NULL
+  OFFSET 0  -- keeps the subquery, so reportes_fecha runs once per row
+) u
+WHERE dia IS NOT NULL
+GROUP BY dia, ciudad;
+
+-- Unique index: lets REFRESH ... CONCURRENTLY keep the view readable
+CREATE UNIQUE INDEX IF NOT EXISTS reportes_unidades_diarias_dia_ciudad
+ON public.reportes_unidades_diarias (dia, ciudad);
+
+-- Entrevistas per day
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.reportes_entrevistas_diarias AS
+SELECT dia, count(*) AS entrevistas
+FROM (SELECT public.reportes_fecha(e.fecha_iso::text) AS dia FROM public.contacto_entrevistas e OFFSET 0) e
+WHERE dia IS NOT NULL
+GROUP BY dia;
+
+CREATE UNIQUE INDEX IF NOT EXISTS reportes_entrevistas_diarias_dia
+ON public.reportes_entrevistas_diarias (dia);
+
+CREATE OR REPLACE FUNCTION public.reportes_unidades_serie(desde date, hasta date, modo text)
+RETURNS TABLE (bucket text, registradas bigint, vendidas bigint)
+LANGUAGE sql STABLE
+AS $$
+  SELECT public.reportes_bucket(d.dia, modo), sum(d.registradas)::bigint, sum(d.vendidas)::bigint
+  FROM public.reportes_unidades_diarias d
+  WHERE (desde IS NULL OR d.dia >= desde) AND (hasta IS NULL OR d.dia <= hasta)
+  GROUP BY 1
+  ORDER BY 1
+$$;
+
+CREATE OR REPLACE FUNCTION public.reportes_unidades_por_ciudad(desde date, hasta date)
+RETURNS TABLE (ciudad text, unidades bigint)
+LANGUAGE sql STABLE
+AS $$
+  SELECT d.ciudad, sum(d.registradas)::bigint
+  FROM public.reportes_unidades_diarias d
+  WHERE (desde IS NULL OR d.dia >= desde) AND (hasta IS NULL OR d.dia <= hasta)
+  GROUP BY 1
+  ORDER BY 2 DESC, 1
+$$;
+
+CREATE OR REPLACE FUNCTION public.reportes_entrevistas_serie(desde date, hasta date, modo text)
+RETURNS TABLE (bucket text, entrevistas bigint)
+LANGUAGE sql STABLE
+AS $$
+  SELECT public.reportes_bucket(d.dia, modo), sum(d.entrevistas)::bigint
+  FROM public.reportes_entrevistas_diarias d
+  WHERE (desde IS NULL OR d.dia >= desde) AND (hasta IS NULL OR d.dia <= hasta)
+  GROUP BY 1
+  ORDER BY 1
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_reportes_resumen()
+RETURNS void
+LANGUAGE sql
+AS $$
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.reportes_unidades_diarias;
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.reportes_entrevistas_diarias;
+$$;
@@ -0,0 +1,182 @@
+"""
+Deterministic "page is ready" waits for the Angular app.
+
+Replaces natural-language prompts such as "Wait until Angular has finished
+rendering all components" with a JS probe evaluated in the page. The probe
+polls, inside the page, until every requested condition holds:
+
+- Angular is stable (``getAllAngularTestabilities().every(isStable)``, when
+  the app exposes testabilities) and the DOM has stopped mutating
+- No Supabase request (``/rest/v1``, ``/auth/v1``, ...) is in flight
+- The URL contains a given fragment
+- At least one of a set of selectors is visible, none of another set is,
+  and some text is (or is no longer) on the page, or in given elements
+
+It returns as soon as the conditions hold, usually within milliseconds.
+"""
+import weakref
+from typing import Any, Dict, Iterable, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+from trajectory_cache import run_cached
+from instrumentation import annotate, traced
+
+
+# Counts in-flight Supabase fetches and records the last DOM mutation.
+# Idempotent; registered as an init script too so it survives navigations.
+INSTALL_TRACKER_JS = """
+(() => {
+    if (window.__crmWait) return;
+    const state = window.__crmWait = { pending: 0, lastMutation: Date.now() };
+    const isSupabase = (url) => /\\/(rest|auth|storage|functions)\\/v1\\//.test(url);
+    const originalFetch = window.fetch;
+    window.fetch = function (input, init) {
+        const url = typeof input === 'string' ? input : (input && input.url) || '';
+        if (!isSupabase(url)) return originalFetch.apply(this, arguments);
+        state.pending++;
+        return originalFetch.apply(this, arguments).finally(() => { state.pending--; });
+    };
+    const observe = () => new MutationObserver(() => { state.lastMutation = Date.now(); })
+        .observe(document.documentElement, { childList: true, subtree: true, attributes: true, characterData: true });
+    if (document.documentElement) observe(); else document.addEventListener('DOMContentLoaded', observe);
+})()
+"""
+
+PROBE_JS = """
+async ({ urlContains, abortUrlContains, anyOf, absent, text, absentText, absentTextIn, networkIdle, quietMs, timeoutMs }) => {
+    const started = Date.now();
+    const visible = (sel) => Array.from(document.querySelectorAll(sel)).some((el) => el.getClientRects().length > 0);
+    const bodyText = () => (document.body && document.body.innerText) || '';
+    const scopedText = () => absentTextIn
+        ? Array.from(document.querySelectorAll(absentTextIn)).map((el) => el.innerText || '').join('\n')
+        : bodyText();
+    const checks = {
+        url: () => !urlContains || location.href.includes(urlContains),
+        angular: () => {
+            const getAll = window.getAllAngularTestabilities;
+            const testabilities = typeof getAll === 'function' ? getAll() : [];
+            return testabilities.every((t) => t.isStable());
+        },
+        quiet: () => !window.__crmWait || Date.now() - window.__crmWait.lastMutation >= quietMs,
+        network: () => !networkIdle || !window.__crmWait || window.__crmWait.pending === 0,
+        anyOf: () => anyOf.length === 0 || anyOf.some(visible),
+        absent: () => !absent.some(visible),
+        text: () => !text || bodyText().includes(text),
+        absentText: () => !absentText || !scopedText().includes(absentText),
+    };
+    let failed = [];
+    while (true) {
+        if (abortUrlContains && location.href.includes(abortUrlContains)) {
+            return { ok: false, aborted: true, failed: ['url'], elapsedMs: Date.now() - started, url: location.href };
+        }
+        failed = Object.keys(checks).filter((name) => !checks[name]());
+        if (failed.length === 0) {
+            return { ok: true, aborted: false, failed, elapsedMs: Date.now() - started, url: location.href };
+        }
+        if (Date.now() - started >= timeoutMs) break;
+        await new Promise((r) => setTimeout(r, 25));
+    }
+    return { ok: false, aborted: false, failed, elapsedMs: Date.now() - started, url: location.href };
+}
+"""
+
+# Pages that already have the tracker registered as an init script
+_initialised_pages: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+async def install_tracker(page: Any) -> None:
+    """Install the network/DOM tracker in the page and on future navigations."""
+    try:
+        if page not in _initialised_pages and hasattr(page, "add_init_script"):
+            await page.add_init_script(INSTALL_TRACKER_JS)
+            _initialised_pages.add(page)
+    except TypeError:
+        pass
+    await page.evaluate(f"() => {INSTALL_TRACKER_JS}")
+
+
+async def probe_page(
+    page: Any,
+    url_contains: Optional[str] = None,
+    any_of: Iterable[str] = (),
+    absent: Iterable[str] = (),
+    text: Optional[str] = None,
+    absent_text: Optional[str] = None,
+    absent_text_in: Optional[str] = None,
+    abort_url_contains: Optional[str] = None,
+    network_idle: bool = True,
+    quiet_ms: int = 100,
+    timeout_ms: int = 10000
+) -> Dict[str, Any]:
+    """
+    Poll the page until all conditions hold or the timeout expires.
+
+    Args:
+        page: Page object (see browser_page.get_current_page)
+        url_contains: Fragment the current URL must contain
+        any_of: CSS selectors of which at least one must be visible
+        absent: CSS selectors that must not be visible
+        text: Text that must appear on the page
+        absent_text: Text that must no longer appear on the page
+        absent_text_in: CSS selector of the elements ``absent_text`` is looked
+            for in (default: the whole page, toasts included)
+        abort_url_contains: Stop immediately (not ok) if the URL contains this,
+            e.g. '/login' after an auth guard redirect
+        network_idle: Require no Supabase request in flight
+        quiet_ms: Time without DOM mutations required to consider it rendered
+        timeout_ms: Maximum time to wait
+
+    Returns:
+        Dictionary with 'ok', 'aborted', the names of the 'failed' checks,
+        'elapsedMs' and the final 'url'
+    """
+    await install_tracker(page)
+    return await page.evaluate(PROBE_JS, {
+        "urlContains": url_contains,
+        "abortUrlContains": abort_url_contains,
+        "anyOf": list(any_of),
+        "absent": list(absent),
+        "text": text,
+        "absentText": absent_text,
+        "absentTextIn": absent_text_in,
+        "networkIdle": network_idle,
+        "quietMs": quiet_ms,
+        "timeoutMs": timeout_ms,
+    })
+
+
+@traced("wait_for_angular", kind="wait")
+async def wait_for_angular(
+    agent: Agent,
+    fallback_prompt: Optional[str] = None,
+    **conditions: Any
+) -> None:
+    """
+    Wait until the Angular app is stable and the given conditions hold.
+
+    Accepts the same conditions as probe_page. If the page cannot be reached
+    directly, ``fallback_prompt`` (when given) is sent to the agent instead.
+
+    Args:
+        agent: The browser-use Agent instance
+        fallback_prompt: Natural-language wait used when no page is available
+        **conditions: Keyword arguments for probe_page
+
+    Raises:
+        TimeoutError: If the conditions do not hold within the timeout
+    """
+    page = await get_current_page(agent)
+    if page is None:
+        if fallback_prompt:
+            await run_cached(agent, fallback_prompt)
+        return
+
+    result = await probe_page(page, **conditions)
+    annotate(conditions=conditions, elapsed_ms=result["elapsedMs"], failed=result["failed"])
+    if not result["ok"]:
+        reason = "redirected" if result["aborted"] else f"timed out after {result['elapsedMs']}ms"
+        raise TimeoutError(
+            f"Page not ready ({reason}); failed checks: {', '.join(result['failed'])}; "
+            f"url: {result['url']}"
+        )
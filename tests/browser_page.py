@@ -0,0 +1,49 @@
+"""
+Access to the live page behind a browser-use Agent.
+
+The deterministic helpers in this directory (form filling, waits, session
+restore, ...) talk to the page directly instead of going through an LLM step.
+browser-use has exposed the current page under different attributes across
+releases, so the lookup is centralised here.
+"""
+from typing import Any, Optional
+from browser_use import Agent
+
+
+async def get_current_page(agent: Agent, start: bool = False) -> Optional[Any]:
+    """
+    Return the page the agent is currently driving, or None if unavailable.
+
+    Supports ``agent.browser_session`` (browser-use >= 0.2) and the older
+    ``agent.browser_context``. The returned object exposes at least
+    ``evaluate(js, arg)`` and ``url``.
+
+    Args:
+        agent: The browser-use Agent instance
+        start: Launch the agent's browser if it has not been started yet
+            (normally ``agent.run`` does this on the first step)
+
+    Returns:
+        The current page object, or None if the agent has no open page yet
+    """
+    for attr in ("browser_session", "browser_context"):
+        holder = getattr(agent, attr, None)
+        if holder is None:
+            continue
+        for getter in ("get_current_page", "must_get_current_page"):
+            fn = getattr(holder, getter, None)
+            if fn is None:
+                continue
+            try:
+                page = await fn()
+            except Exception:
+                continue
+            if page is not None:
+                return page
+        if start and hasattr(holder, "start"):
+            try:
+                await holder.start()
+            except Exception:
+                continue
+            return await get_current_page(agent)
+    return None
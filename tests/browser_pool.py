@@ -0,0 +1,423 @@
+"""
+Pool of warm headless browsers shared by the scenarios of one process.
+
+Building an Agent normally launches a browser, and every scenario then
+downloads and parses the Angular bundle from scratch. The pool instead:
+
+- keeps ``size`` Chromium processes running for the whole process
+- hands each scenario a fresh incognito context (``browser.new_context()``:
+  no cookies or storage shared with other scenarios), opened ahead of time so
+  a lease is ready in milliseconds
+- serves the app's static assets (scripts, styles, fonts, images of
+  ``base_url``) to every context from an in-memory cache primed once at
+  start, so no context downloads the bundle again
+- recycles a browser after ``max_uses`` leases, or as soon as it disconnects
+  or one of its pages crashes; leases still open on it finish first
+
+Scenarios use it through the process-wide ``shared_pool()``:
+
+    lease = await (await shared_pool(base_url)).acquire()
+    agent = Agent(task=..., llm=llm, browser_session=await lease.browser_session())
+    ...
+    await agent.close()
+    await pool.release(lease)
+    ...
+    await close_shared_pool()  # once, at the end of the process
+
+Set BROWSER_POOL=0 to give every Agent its own browser again;
+BROWSER_POOL_SIZE and BROWSER_POOL_MAX_USES tune the pool.
+
+Smoke check (builds an Agent on a lease, no LLM or Supabase needed):
+
+    python tests/browser_pool.py --base-url http://localhost:4200
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from playwright.async_api import Browser, BrowserContext, Page, Route, async_playwright
+
+
+DEFAULT_POOL_SIZE = 2
+
+# Leases served by one browser process before it is replaced
+DEFAULT_MAX_USES = 20
+
+# Resource types served from the shared asset cache
+STATIC_RESOURCE_TYPES = {"script", "stylesheet", "font", "image"}
+
+# Assets larger than this are always fetched from the network
+MAX_ASSET_BYTES = 10 * 1024 * 1024
+
+# Seconds to wait for a context to close before giving up on it
+CLOSE_TIMEOUT_S = 5
+
+_CHROMIUM_ARGS = ["--disable-dev-shm-usage", "--no-first-run", "--no-default-browser-check"]
+
+
+class AssetCache:
+    """Static assets of one origin, shared by all the pool's contexts."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.assets: Dict[str, Tuple[int, Dict[str, str], bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable(self, route: Route) -> bool:
+        request = route.request
+        return (request.method == "GET"
+                and request.resource_type in STATIC_RESOURCE_TYPES
+                and request.url.startswith(self.origin + "/"))
+
+    async def handle(self, route: Route) -> None:
+        """Route handler: answer from the cache, or fetch and remember."""
+        if not self.cacheable(route):
+            await route.fallback()
+            return
+        url = route.request.url
+        cached = self.assets.get(url)
+        if cached is not None:
+            self.hits += 1
+            status, headers, body = cached
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+        self.misses += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            await route.fallback()
+            return
+        if response.status == 200 and len(body) <= MAX_ASSET_BYTES:
+            headers = {k: v for k, v in response.headers.items() if k.lower() != "content-encoding"}
+            self.assets[url] = (response.status, headers, body)
+        await route.fulfill(response=response, body=body)
+
+
+class Lease:
+    """A fresh incognito context (and its first page) lent to one scenario."""
+
+    def __init__(self, slot: "_Slot", context: BrowserContext, page: Page, wait_ms: float, warm: bool):
+        self.slot = slot
+        self.context = context
+        self.page = page
+        self.wait_ms = wait_ms
+        self.warm = warm
+        self.crashed = False
+        page.on("crash", lambda _: self._crash())
+
+    def _crash(self) -> None:
+        self.crashed = True
+
+    @property
+    def browser(self) -> Browser:
+        return self.slot.browser
+
+    async def browser_session(self) -> Any:
+        """
+        A started browser-use BrowserSession driving this lease's context.
+
+        Needs the Playwright-based BrowserSession of browser-use 0.2 (see
+        requirements.txt), which takes the Browser, BrowserContext and Page
+        objects directly. ``keep_alive`` stops ``Agent.close()`` from closing
+        the context; the pool closes it on release. Agent only accepts a
+        keep_alive session once it is started, so it is started here. The
+        field holding the current page was renamed between releases;
+        whichever one is declared is set.
+        """
+        from browser_use import BrowserSession
+
+        fields = getattr(BrowserSession, "model_fields", {})
+        kwargs: Dict[str, Any] = {"browser": self.browser, "browser_context": self.context, "keep_alive": True}
+        page_field = next((name for name in ("agent_current_page", "page") if name in fields), None)
+        if page_field:
+            kwargs[page_field] = self.page
+        return await BrowserSession(**kwargs).start()
+
+
+class _Slot:
+    """One browser process and the context it keeps ready for the next lease."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+        self.dead = False
+        self.spare: Optional[asyncio.Task] = None
+        browser.on("disconnected", lambda _: self._disconnected())
+
+    def _disconnected(self) -> None:
+        self.dead = True
+
+
+class BrowserPool:
+    """K warm browsers lending fresh incognito contexts."""
+
+    def __init__(
+        self,
+        base_url: str,
+        size: int = DEFAULT_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+        headless: bool = True,
+        preload: bool = True,
+        context_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            base_url: Base URL of the application (its assets are cached)
+            size: Browser processes kept running
+            max_uses: Leases per browser before it is replaced
+            headless: Launch browsers headless
+            preload: Open base_url in spare contexts, so leases start with
+                the app already booted
+            context_options: Extra ``browser.new_context`` options
+        """
+        self.base_url = base_url.rstrip("/")
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.preload = preload
+        self.context_options = context_options or {}
+        self.assets = AssetCache(self.base_url)
+        self.slots: List[_Slot] = []
+        self.leases = 0
+        self.recycled = 0
+        self._retiring: List[_Slot] = []
+        self._launches: Set[asyncio.Task] = set()
+        self._playwright = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> "BrowserPool":
+        """Launch the browsers, prime the asset cache and open the spare contexts."""
+        self._playwright = await async_playwright().start()
+        self.slots = list(await asyncio.gather(*(self._launch() for _ in range(self.size))))
+        await self.prime()
+        for slot in self.slots:
+            self._prepare_spare(slot)
+        return self
+
+    async def _launch(self) -> _Slot:
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=_CHROMIUM_ARGS)
+        return _Slot(browser)
+
+    async def prime(self) -> None:
+        """Load base_url once so the asset cache holds the app bundle."""
+        context, page = await self._open_context(self.slots[0], preload=False)
+        try:
+            await page.goto(self.base_url, wait_until="networkidle")
+        except Exception as e:
+            print(f"⚠ Browser pool could not prime the asset cache: {e}")
+        finally:
+            await self._close_context(context)
+
+    async def _open_context(self, slot: _Slot, preload: bool) -> Tuple[BrowserContext, Page]:
+        context = await slot.browser.new_context(**self.context_options)
+        await context.route("**/*", self.assets.handle)
+        page = await context.new_page()
+        if preload:
+            await page.goto(self.base_url, wait_until="load")
+        return context, page
+
+    def _prepare_spare(self, slot: _Slot) -> None:
+        if slot.retired or slot.dead:
+            return
+        slot.spare = asyncio.create_task(self._open_context(slot, self.preload))
+        # Collected by acquire(); silence "exception never retrieved" if it isn't
+        slot.spare.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _close_context(self, context: BrowserContext) -> None:
+        try:
+            await asyncio.wait_for(context.close(), CLOSE_TIMEOUT_S)
+        except Exception:
+            pass
+
+    def _retire(self, slot: _Slot) -> None:
+        """Take a browser out of rotation and launch its replacement in the background."""
+        if slot.retired:
+            return
+        slot.retired = True
+        self.recycled += 1
+        self.slots.remove(slot)
+        self._retiring.append(slot)
+        if slot.spare is not None:
+            slot.spare.cancel()
+            slot.spare = None
+        launch = asyncio.create_task(self._launch())
+        launch.add_done_callback(self._launched)
+        self._launches.add(launch)
+        if slot.active == 0:
+            asyncio.create_task(self._close_browser(slot))
+
+    def _launched(self, launch: asyncio.Task) -> None:
+        self._launches.discard(launch)
+        if launch.cancelled():
+            return
+        if launch.exception() is not None:
+            print(f"⚠ Browser pool could not relaunch a browser: {launch.exception()}")
+            return
+        slot = launch.result()
+        self.slots.append(slot)
+        self._prepare_spare(slot)
+
+    async def _close_browser(self, slot: _Slot) -> None:
+        if slot in self._retiring:
+            self._retiring.remove(slot)
+        try:
+            await asyncio.wait_for(slot.browser.close(), CLOSE_TIMEOUT_S)
+        except Exception:
+            pass
+
+    async def acquire(self) -> Lease:
+        """Lease a fresh incognito context from the least used browser."""
+        started = time.perf_counter()
+        async with self._lock:
+            for slot in [s for s in self.slots if s.dead]:
+                self._retire(slot)
+            while not self.slots:
+                if not self._launches:
+                    raise RuntimeError("Browser pool has no running browser (relaunching failed)")
+                await asyncio.wait(set(self._launches), return_when=asyncio.FIRST_COMPLETED)
+            slot = min(self.slots, key=lambda s: (s.active, s.uses))
+            slot.active += 1
+            slot.uses += 1
+            spare, slot.spare = slot.spare, None
+            if slot.uses >= self.max_uses:
+                # This is the browser's last lease
+                self._retire(slot)
+            else:
+                self._prepare_spare(slot)
+        warm = spare is not None and spare.done()
+        try:
+            try:
+                context, page = await spare if spare is not None else await self._open_context(slot, self.preload)
+            except Exception:
+                warm = False
+                context, page = await self._open_context(slot, self.preload)
+        except Exception:
+            slot.active -= 1
+            raise
+        self.leases += 1
+        return Lease(slot, context, page, (time.perf_counter() - started) * 1000, warm)
+
+    async def release(self, lease: Lease) -> None:
+        """Close the lease's context; retire its browser if it crashed."""
+        slot = lease.slot
+        slot.active -= 1
+        if lease.crashed or slot.dead:
+            async with self._lock:
+                self._retire(slot)
+        else:
+            await self._close_context(lease.context)
+        if slot.retired and slot.active == 0:
+            await self._close_browser(slot)
+
+    async def close(self) -> None:
+        """Close every browser and stop Playwright."""
+        for launch in list(self._launches):
+            launch.cancel()
+        for slot in self.slots:
+            if slot.spare is not None:
+                slot.spare.cancel()
+        await asyncio.gather(*(self._close_browser(slot) for slot in self.slots + self._retiring))
+        self.slots = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self.slots),
+            "leases": self.leases,
+            "recycled": self.recycled,
+            "asset_hits": self.assets.hits,
+            "asset_misses": self.assets.misses,
+            "cached_assets": len(self.assets.assets),
+        }
+
+
+_shared: Optional[BrowserPool] = None
+_shared_lock: Optional[asyncio.Lock] = None
+
+
+def pool_enabled() -> bool:
+    """False when BROWSER_POOL=0."""
+    return os.getenv("BROWSER_POOL", "1") != "0"
+
+
+async def shared_pool(base_url: str) -> BrowserPool:
+    """The process-wide pool, started on first use (BROWSER_POOL_SIZE, BROWSER_POOL_MAX_USES)."""
+    global _shared, _shared_lock
+    if _shared_lock is None:
+        _shared_lock = asyncio.Lock()
+    async with _shared_lock:
+        if _shared is None:
+            _shared = await BrowserPool(
+                base_url,
+                size=int(os.getenv("BROWSER_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                max_uses=int(os.getenv("BROWSER_POOL_MAX_USES", DEFAULT_MAX_USES)),
+            ).start()
+    return _shared
+
+
+async def close_shared_pool() -> None:
+    """Close the process-wide pool if it was started."""
+    global _shared
+    if _shared is not None:
+        pool, _shared = _shared, None
+        stats = pool.stats()
+        await pool.close()
+        print(f"✓ Browser pool closed: {stats['leases']} leases, {stats['recycled']} browsers recycled, "
+              f"{stats['asset_hits']} asset requests served from cache")
+
+
+async def smoke_check(base_url: str) -> None:
+    """
+    Build an Agent on a leased context and check it drives the lease's page.
+
+    The Agent gets a hermetic ScriptedLLM, so no model is called.
+    """
+    from browser_use import Agent
+    from browser_page import get_current_page
+    from hermetic import SCRIPTED_AGENT_OPTIONS, ScriptedLLM
+
+    pool = await BrowserPool(base_url, size=1).start()
+    try:
+        lease = await pool.acquire()
+        try:
+            agent = Agent(
+                task="Browser pool smoke check",
+                llm=ScriptedLLM(),
+                browser_session=await lease.browser_session(),
+                **SCRIPTED_AGENT_OPTIONS
+            )
+            page = await get_current_page(agent)
+            if page is None or page not in lease.context.pages:
+                raise RuntimeError("Agent is not driving the leased context")
+            await agent.close()
+            # keep_alive: the context belongs to the pool until release
+            if lease.context not in lease.browser.contexts:
+                raise RuntimeError("Agent.close() closed the leased context")
+            print(f"✓ Agent built on a leased context ({lease.wait_ms:.0f} ms, "
+                  f"{'warm' if lease.warm else 'cold'}), page {page.url}")
+        finally:
+            await pool.release(lease)
+    finally:
+        await pool.close()
+
+
+async def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Smoke-check the warm browser pool with a browser-use Agent.")
+    parser.add_argument("--base-url", default="http://localhost:4200", help="Base URL of the application")
+    args = parser.parse_args()
+    await smoke_check(args.base_url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,463 @@
+"""
+Bulk loader for unidades import files (plantilla-unidades layout).
+
+The /importar page resolves (or creates) the proyecto of every row and
+inserts unidades one request at a time. This loader does the same work in
+bulk:
+
+1. ciudades, barrios and proyectos are read once (``id,nombre`` only,
+   paged) and matched by name case-insensitively, like the importer does
+2. per chunk, the proyectos not seen yet are created in one request
+3. the chunk's valid rows (rules from unidades-import.config.ts, see
+   import_preflight.py) are upserted into ``unidades`` in batches of
+   ``--batch-size`` rows, with at most ``--concurrency`` requests in flight
+
+Row and proyecto IDs are derived from the file contents (uuid5), so batches
+can be retried or replayed without duplicating anything. Completed batches
+are recorded in a checkpoint file next to the input; after a failure, the
+same command resumes from the first batch not yet loaded (``--fresh`` starts
+over). Invalid rows are skipped and counted; run import_preflight.py for the
+per-row report.
+
+Usage:
+    python tests/bulk_load.py tests/.generated/unidades_1000000.csv
+    python tests/bulk_load.py tests/.generated/unidades_100000.csv --standin
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from postgrest.types import ReturnMethod
+from supabase import AsyncClient
+
+from db_verify import get_async_client
+from import_preflight import IMPORT_CONFIG_TS, load_import_config, read_chunks, resolve_columns, validate_chunk
+from postgrest_standin import ANON_KEY, PostgrestStandIn, load_table_schemas
+
+
+load_dotenv()
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CONCURRENCY = 4
+
+# Batches validated together (keeps validation vectorized over large chunks)
+BATCHES_PER_CHUNK = 50
+
+# PostgREST's default max-rows; lookups are paged with this size
+PAGE_SIZE = 1000
+
+# Attempts per batch before the load is aborted (and can be resumed)
+MAX_ATTEMPTS = 3
+
+# Import field -> unidades column, where camelCase -> snake_case is not enough
+_RENAMED = {"precioUSD": "precio", "fechaEntrega": "entrega", "estado": "estado_comercial"}
+
+# Import fields resolved to foreign keys (or UI-only) instead of copied
+_RESOLVED = {"nombreProyecto", "proyectoNombre", "proyectoId", "ciudad", "ciudadId", "barrio", "barrioId"}
+
+
+def _snake_case(name: str) -> str:
+    return "".join(f"_{c.lower()}" if c.isupper() else c for c in name).lstrip("_")
+
+
+def _name_key(values: pd.Series) -> pd.Series:
+    return values.str.strip().str.lower()
+
+
+def file_digest(path: Path) -> str:
+    """SHA-1 of the file contents (identifies the load in the checkpoint and IDs)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def proyecto_id(nombre: str) -> str:
+    """Stable proyecto ID for a name, so concurrent or repeated loads agree."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"crm:proyecto:{nombre.strip().lower()}"))
+
+
+class Checkpoint:
+    """Completed batches of one file, persisted after every batch."""
+
+    def __init__(self, path: Path, digest: str, batch_size: int):
+        self.path = path
+        self.digest = digest
+        self.batch_size = batch_size
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.done: Set[int] = set()
+        self.rows = 0
+        self.proyectos_created = 0
+
+    @classmethod
+    def load(cls, path: Path, digest: str, batch_size: int, fresh: bool = False) -> "Checkpoint":
+        """
+        Resume from ``path`` when it belongs to the same file and batch size.
+
+        Raises:
+            ValueError: If the checkpoint is for different contents or batch
+                size (pass fresh=True to discard it)
+        """
+        checkpoint = cls(path, digest, batch_size)
+        if fresh or not path.exists():
+            return checkpoint
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data["digest"] != digest or data["batchSize"] != batch_size:
+            raise ValueError(
+                f"{path} was written for different contents or --batch-size {data['batchSize']}; "
+                "use --fresh to start over"
+            )
+        checkpoint.created_at = data["createdAt"]
+        checkpoint.done = set(data["done"])
+        checkpoint.rows = data["rows"]
+        checkpoint.proyectos_created = data["proyectosCreated"]
+        return checkpoint
+
+    def save(self) -> None:
+        """Write atomically (a crash mid-write keeps the previous state)."""
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "digest": self.digest,
+            "batchSize": self.batch_size,
+            "createdAt": self.created_at,
+            "rows": self.rows,
+            "proyectosCreated": self.proyectos_created,
+            "done": sorted(self.done),
+        }), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class Lookups:
+    """Name -> ID maps for ciudades, barrios and proyectos (lowercased names)."""
+
+    def __init__(self, ciudades: List[Dict[str, Any]], barrios: List[Dict[str, Any]], proyectos: List[Dict[str, Any]]):
+        self.ciudades = {c["nombre"].strip().lower(): c["id"] for c in reversed(ciudades) if c.get("nombre")}
+        # Same precedence as the importer's Array.find: first match wins
+        self.barrios_in_ciudad = {
+            (b["ciudad_id"], b["nombre"].strip().lower()): b["id"] for b in reversed(barrios) if b.get("nombre")
+        }
+        self.barrios = {b["nombre"].strip().lower(): b["id"] for b in reversed(barrios) if b.get("nombre")}
+        self.barrio_ciudad = {b["id"]: b.get("ciudad_id") for b in barrios}
+        # The importer's proyectosMap: the last proyecto with a name wins
+        self.proyectos = {p["nombre"].strip().lower(): p["id"] for p in proyectos if p.get("nombre")}
+
+
+async def _select_all(client: AsyncClient, table: str, columns: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    while True:
+        response = await (client.table(table).select(columns).order("id")
+                          .range(len(rows), len(rows) + PAGE_SIZE - 1).execute())
+        rows.extend(response.data)
+        if len(response.data) < PAGE_SIZE:
+            return rows
+
+
+async def load_lookups(client: AsyncClient) -> Lookups:
+    """Read ciudades, barrios and proyectos in three (paged) queries."""
+    ciudades, barrios, proyectos = await asyncio.gather(
+        _select_all(client, "ciudades", "id,nombre"),
+        _select_all(client, "barrios", "id,nombre,ciudad_id"),
+        _select_all(client, "proyectos", "id,nombre"),
+    )
+    return Lookups(ciudades, barrios, proyectos)
+
+
+async def create_missing_proyectos(client: AsyncClient, lookups: Lookups, names: pd.Series) -> int:
+    """Create, in one request, the proyectos named in ``names`` that do not exist yet."""
+    missing: Dict[str, str] = {}
+    for nombre in names[names != ""].str.strip().unique():
+        key = nombre.lower()
+        if key not in lookups.proyectos and key not in missing:
+            missing[key] = nombre
+    if not missing:
+        return 0
+    rows = [{"id": proyecto_id(nombre), "nombre": nombre} for nombre in missing.values()]
+    await client.table("proyectos").upsert(rows, on_conflict="id", returning=ReturnMethod.minimal).execute()
+    for row in rows:
+        lookups.proyectos[row["nombre"].lower()] = row["id"]
+    return len(rows)
+
+
+def _column_values(values: pd.Series, data_type: str) -> List[Any]:
+    """JSON-ready values of one clean column ('' becomes None)."""
+    if data_type == "number":
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+        out = np.full(len(numbers), None, dtype=object)
+        present = ~np.isnan(numbers)
+        integral = present & (numbers == np.floor(numbers)) & (np.abs(numbers) < 2 ** 53)
+        out[integral] = numbers[integral].astype(np.int64).tolist()
+        fractional = present & ~integral
+        out[fractional] = numbers[fractional].tolist()
+        return out.tolist()
+    if data_type == "array":
+        return [[{"id": item, "name": item} for item in value.split(", ")] if value else []
+                for value in values.tolist()]
+    return [value if value != "" else None for value in values.tolist()]
+
+
+def _foreign_keys(clean: pd.DataFrame, lookups: Lookups) -> Dict[str, List[Any]]:
+    """proyecto_id, ciudad_id and barrio_id per row, as the importer resolves them."""
+    n = len(clean)
+    empty = pd.Series("", index=clean.index)
+
+    proyecto = clean["proyectoId"] if "proyectoId" in clean else empty
+    proyecto = proyecto.where(proyecto != "", _name_key(clean.get("nombreProyecto", empty)).map(lookups.proyectos))
+
+    ciudad = pd.to_numeric(clean.get("ciudadId", empty), errors="coerce")
+    ciudad = ciudad.fillna(_name_key(clean.get("ciudad", empty)).map(lookups.ciudades).astype(float))
+
+    barrio_names = _name_key(clean.get("barrio", empty))
+    by_ciudad = pd.Series(
+        [lookups.barrios_in_ciudad.get((int(c), b)) if c == c else None
+         for c, b in zip(ciudad.tolist(), barrio_names.tolist())],
+        index=clean.index, dtype=float,
+    )
+    anywhere = barrio_names.map(lookups.barrios).astype(float)
+    barrio = pd.to_numeric(clean.get("barrioId", empty), errors="coerce")
+    barrio = barrio.fillna(by_ciudad.where(ciudad.notna(), anywhere))
+    # A barrio matched without a ciudad brings its ciudad along
+    ciudad = ciudad.fillna(barrio.map(lookups.barrio_ciudad).astype(float))
+
+    def ints(values: pd.Series) -> List[Optional[int]]:
+        return [int(v) if v == v else None for v in values.tolist()]
+
+    return {
+        "proyecto_id": [v if isinstance(v, str) and v else None for v in proyecto.tolist()] if n else [],
+        "ciudad_id": ints(ciudad),
+        "barrio_id": ints(barrio),
+    }
+
+
+def build_records(
+    clean: pd.DataFrame,
+    config: Dict[str, Any],
+    lookups: Lookups,
+    table_columns: Iterable[str],
+    ids: List[str],
+    timestamp: str
+) -> List[Dict[str, Any]]:
+    """
+    Turn validated rows into ``unidades`` rows, mirroring UnidadService.addUnidad.
+
+    Args:
+        clean: Valid rows under the import field names (validate_chunk output)
+        config: Output of load_import_config
+        lookups: Name -> ID maps (proyectos must already exist)
+        table_columns: Columns of the unidades table
+        ids: One unidad ID per row
+        timestamp: created_at/updated_at of the load
+    """
+    table_columns = set(table_columns)
+    types = {rule["fieldName"]: rule["dataType"] for rule in config["fields"]}
+    columns: Dict[str, List[Any]] = {"id": ids}
+    for field in clean.columns:
+        column = _RENAMED.get(field, _snake_case(field))
+        if field in _RESOLVED or column not in table_columns or column == "moneda":
+            continue
+        columns[column] = _column_values(clean[field], types.get(field, "string"))
+    columns.update(_foreign_keys(clean, lookups))
+    columns.setdefault("amenities", [[] for _ in ids])
+    names = list(columns)
+    constant = {"created_at": timestamp, "updated_at": timestamp, "deleted_at": None}
+    return [{**dict(zip(names, values)), **constant} for values in zip(*columns.values())]
+
+
+def _exact_chunks(frames: Iterator[pd.DataFrame], size: int) -> Iterator[pd.DataFrame]:
+    """Re-cut frames into chunks of exactly ``size`` rows (the last may be shorter)."""
+    buffer: List[pd.DataFrame] = []
+    buffered = 0
+    for frame in frames:
+        buffer.append(frame)
+        buffered += len(frame)
+        while buffered >= size:
+            joined = pd.concat(buffer, ignore_index=True) if len(buffer) > 1 else buffer[0].reset_index(drop=True)
+            yield joined.iloc[:size]
+            rest = joined.iloc[size:]
+            buffer, buffered = ([rest] if len(rest) else []), len(rest)
+    if buffered:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+async def _upsert_batch(client: AsyncClient, rows: List[Dict[str, Any]]) -> None:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            await (client.table("unidades")
+                   .upsert(rows, on_conflict="id", returning=ReturnMethod.minimal)
+                   .execute())
+            return
+        except Exception:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def bulk_load(
+    path: Path,
+    client: AsyncClient,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    checkpoint_path: Optional[Path] = None,
+    fresh: bool = False,
+    config_path: Path = IMPORT_CONFIG_TS
+) -> Dict[str, Any]:
+    """
+    Load a file into ``unidades``, resuming from its checkpoint if present.
+
+    Args:
+        path: CSV or XLSX in the plantilla-unidades layout
+        client: Async Supabase client
+        batch_size: Rows per upsert request
+        concurrency: Upsert requests in flight at once
+        checkpoint_path: Progress file (default: ``<file>.checkpoint.json``)
+        fresh: Ignore an existing checkpoint and load everything
+        config_path: TypeScript import config to read the rules from
+
+    Returns:
+        Summary with rows loaded/skipped/invalid, proyectos created, batches,
+        seconds and rows/s
+    """
+    path = Path(path)
+    checkpoint_path = Path(checkpoint_path or path.with_name(f"{path.stem}.checkpoint.json"))
+    config = load_import_config(config_path)
+    table_columns = load_table_schemas()["unidades"].keys()
+    digest = file_digest(path)
+    checkpoint = Checkpoint.load(checkpoint_path, digest, batch_size, fresh)
+    already_done = len(checkpoint.done)
+
+    started = time.perf_counter()
+    lookups = await load_lookups(client)
+    chunk_rows = batch_size * BATCHES_PER_CHUNK
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight: Set[asyncio.Task] = set()
+    failures: List[BaseException] = []
+    total = invalid = loaded = skipped = proyectos = 0
+    columns: Optional[Dict[str, str]] = None
+
+    def finished(task: asyncio.Task, batch: int, count: int) -> None:
+        nonlocal loaded
+        semaphore.release()
+        in_flight.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            failures.append(task.exception())
+            return
+        loaded += count
+        checkpoint.done.add(batch)
+        checkpoint.rows += count
+        checkpoint.save()
+
+    try:
+        for chunk_index, chunk in enumerate(_exact_chunks(read_chunks(path, chunk_rows), chunk_rows)):
+            offset = chunk_index * chunk_rows
+            total += len(chunk)
+            first_batch = offset // batch_size
+            batches = range(first_batch, first_batch + -(-len(chunk) // batch_size))
+            pending = [b for b in batches if b not in checkpoint.done]
+            skipped += len(chunk) - sum(min(batch_size, offset + len(chunk) - b * batch_size) for b in pending)
+            if not pending:
+                continue
+            if columns is None:
+                columns = resolve_columns(list(chunk.columns), config)
+            _, clean = validate_chunk(chunk, config, columns, first_row=offset + 2)
+            invalid += len(chunk) - len(clean)
+            if "nombreProyecto" in clean:
+                created = await create_missing_proyectos(client, lookups, clean["nombreProyecto"])
+                proyectos += created
+                checkpoint.proyectos_created += created
+
+            positions = clean.index.to_numpy() + offset
+            ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"crm:unidad:{digest}:{p}")) for p in positions.tolist()]
+            records = build_records(clean, config, lookups, table_columns, ids, checkpoint.created_at)
+            bounds = np.searchsorted(positions, [b * batch_size for b in range(batches.start, batches.stop + 1)])
+            for batch in pending:
+                rows = records[bounds[batch - batches.start]:bounds[batch - batches.start + 1]]
+                await semaphore.acquire()
+                if failures:
+                    semaphore.release()
+                    raise failures[0]
+                task = asyncio.create_task(_upsert_batch(client, rows))
+                in_flight.add(task)
+                task.add_done_callback(lambda t, b=batch, c=len(rows): finished(t, b, c))
+        if in_flight:
+            await asyncio.wait(set(in_flight))
+        if failures:
+            raise failures[0]
+    finally:
+        for task in list(in_flight):
+            task.cancel()
+        if in_flight:
+            await asyncio.wait(set(in_flight))
+        checkpoint.save()
+
+    seconds = time.perf_counter() - started
+    return {
+        "file": str(path),
+        "totalRows": total,
+        "loadedRows": loaded,
+        "skippedRows": skipped,
+        "invalidRows": invalid,
+        "proyectosCreated": proyectos,
+        "batches": len(checkpoint.done) - already_done,
+        "resumedBatches": already_done,
+        "checkpoint": str(checkpoint_path),
+        "seconds": round(seconds, 2),
+        "rowsPerSecond": round(loaded / seconds) if seconds else None,
+    }
+
+
+async def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Bulk-load an unidades import file into Supabase.")
+    parser.add_argument("file", type=Path, help="CSV or XLSX in the plantilla-unidades layout")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per upsert request")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Upsert requests in flight")
+    parser.add_argument("--checkpoint", type=Path, help="Progress file (default: <file>.checkpoint.json)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--standin", action="store_true",
+                        help="Load into an in-process PostgREST stand-in instead of SUPABASE_URL")
+    args = parser.parse_args()
+
+    standin = None
+    if args.standin:
+        standin = PostgrestStandIn().start()
+        url, key = standin.url, ANON_KEY
+    else:
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            print("❌ SUPABASE_URL and SUPABASE_KEY must be set (or use --standin)")
+            sys.exit(2)
+
+    try:
+        client = await get_async_client(url, key)
+        summary = await bulk_load(
+            args.file, client, args.batch_size, args.concurrency, args.checkpoint, args.fresh
+        )
+    finally:
+        if standin is not None:
+            standin.stop()
+
+    print(f"✓ {summary['loadedRows']} unidades loaded in {summary['seconds']}s "
+          f"({summary['rowsPerSecond']} rows/s, {summary['batches']} batches)")
+    if summary["resumedBatches"]:
+        print(f"  Resumed: {summary['skippedRows']} rows in {summary['resumedBatches']} batches were already loaded")
+    print(f"  Proyectos created: {summary['proyectosCreated']}")
+    if summary["invalidRows"]:
+        print(f"  ⚠ {summary['invalidRows']} invalid rows skipped "
+              f"(python tests/import_preflight.py {args.file} for the report)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
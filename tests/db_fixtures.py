@@ -0,0 +1,241 @@
+"""
+Namespace-scoped test fixtures for the Supabase database.
+
+Scenarios that only need existing data can seed it directly instead of
+creating it through the UI:
+
+    fixtures = FixtureSet(client, namespace=test.test_timestamp, url=supabase_url)
+    rows = await fixtures.seed({
+        "ciudades": [{"key": "mvd", "nombre": "Montevideo"}],
+        "barrios": [{"key": "pocitos", "nombre": "Pocitos", "ciudad_id": "@mvd"}],
+        "proyectos": [{"key": "p1", "nombre": "Proyecto Fixture", "ciudad_id": "@mvd"}],
+        "unidades": [{"key": "u1", "nombre": "Unidad Fixture", "proyecto_id": "@p1", "precio": 100000}],
+    })
+    rows["u1"]["id"]  # -> 'fx-<namespace>-…'
+    ...
+    await fixtures.teardown()
+
+Each table is inserted in a single request (in foreign-key order) and
+``"@key"`` values are replaced by the ID of the row seeded under that key.
+Rows are tagged with the namespace: ``proyectos`` and ``unidades`` get IDs
+prefixed with ``fx-<namespace>-``, ``ciudades`` and ``barrios`` (integer IDs)
+get a `` [fx-<namespace>]`` suffix in their nombre.
+
+Teardown hard-deletes the namespace with one filtered DELETE per table, so
+test rows don't accumulate as soft-deleted rows in ``unidades``. Unidades
+created through the UI can be included with ``name_patterns`` (e.g.
+``'Test Unidad <timestamp>*'``), and proyectos with ``proyecto_patterns``. Every namespace is recorded in
+``tests/.fixture_runs/`` until its teardown finishes; ``sweep_orphans``
+tears down the namespaces left behind by processes that died.
+"""
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from postgrest.types import ReturnMethod
+from supabase import AsyncClient
+
+from instrumentation import annotate, record, trace_step
+
+
+# Namespaces whose teardown has not completed yet, one JSON file each
+DEFAULT_REGISTRY_DIR = Path(__file__).parent / ".fixture_runs"
+
+# Insert order (referenced tables first); teardown runs in reverse
+TABLE_ORDER = ("ciudades", "barrios", "proyectos", "unidades")
+
+# Tables with text IDs, tagged through the ID; the others through the nombre
+_ID_TAGGED = {"proyectos", "unidades"}
+
+
+def _slug(namespace: str) -> str:
+    # '_' and '%' are LIKE wildcards; keep the tag literal
+    return re.sub(r"[^A-Za-z0-9-]+", "-", namespace).strip("-")
+
+
+def _pid_alive(pid: Any) -> bool:
+    # 0 and negative PIDs signal process groups, so a missing pid counts as dead
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class FixtureSet:
+    """Rows seeded for one namespace, removable in one teardown."""
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        namespace: str,
+        url: str = "",
+        name_patterns: Sequence[str] = (),
+        registry_dir: Path = DEFAULT_REGISTRY_DIR,
+        proyecto_patterns: Sequence[str] = ()
+    ):
+        """
+        Args:
+            client: Async Supabase client (see db_verify.get_async_client)
+            namespace: Run label, e.g. UnidadCRUDTest.test_timestamp
+            url: Supabase URL, recorded so sweeps only touch the same project
+            name_patterns: ``like`` patterns of unidad names created outside
+                the fixtures (through the UI) to delete with the namespace
+            registry_dir: Where pending namespaces are recorded
+            proyecto_patterns: ``like`` patterns of proyecto names created
+                outside the fixtures (e.g. by an import) to delete too
+        """
+        self.client = client
+        self.namespace = namespace
+        self.tag = f"fx-{_slug(namespace)}"
+        self.url = url
+        self.name_patterns = list(name_patterns)
+        self.proyecto_patterns = list(proyecto_patterns)
+        self.registry_path = Path(registry_dir) / f"{self.tag}.json"
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def register(self) -> None:
+        """
+        Record the namespace so a crashed run can be swept later (idempotent).
+
+        A namespace recorded by another process (a run being resumed) is
+        claimed by this one, so sweeps leave it alone while it runs.
+        """
+        try:
+            if json.loads(self.registry_path.read_text(encoding="utf-8")).get("pid") == os.getpid():
+                return
+        except (OSError, ValueError):
+            pass
+        self._write_registry()
+
+    def include(self, name_patterns: Sequence[str] = (), proyecto_patterns: Sequence[str] = ()) -> None:
+        """Also delete unidades/proyectos matching these patterns (recorded for sweeps too)."""
+        self.name_patterns.extend(name_patterns)
+        self.proyecto_patterns.extend(proyecto_patterns)
+        self._write_registry()
+
+    def _write_registry(self) -> None:
+        self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+        self.registry_path.write_text(json.dumps({
+            "namespace": self.namespace,
+            "url": self.url,
+            "pid": os.getpid(),
+            "name_patterns": self.name_patterns,
+            "proyecto_patterns": self.proyecto_patterns,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }), encoding="utf-8")
+
+    def _tagged(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = {column: (self.rows[value[1:]]["id"] if isinstance(value, str) and value.startswith("@") else value)
+               for column, value in row.items() if column != "key"}
+        if table in _ID_TAGGED:
+            row.setdefault("id", f"{self.tag}-{uuid.uuid4().hex}")
+        else:
+            row["nombre"] = f"{row.get('nombre', '')} [{self.tag}]".strip()
+        if table == "unidades":
+            now = datetime.now(timezone.utc).isoformat()
+            row = {"created_at": now, "updated_at": now, "deleted_at": None, **row}
+        return row
+
+    async def seed(self, spec: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Insert the rows of ``spec`` (table -> rows), one request per table.
+
+        Rows may carry a ``key``; other rows reference them with ``"@key"``
+        in any column. Returns every seeded row by key (with its ``id``),
+        and accumulates them in ``self.rows``.
+
+        Raises:
+            ValueError: For tables other than ciudades, barrios, proyectos, unidades
+        """
+        unknown = set(spec) - set(TABLE_ORDER)
+        if unknown:
+            raise ValueError(f"Cannot seed {', '.join(sorted(unknown))}; supported: {', '.join(TABLE_ORDER)}")
+        self.register()
+        seeded: Dict[str, Dict[str, Any]] = {}
+        for table in TABLE_ORDER:
+            items = spec.get(table) or []
+            if not items:
+                continue
+            payload = [self._tagged(table, item) for item in items]
+            async with trace_step(f"seed {table}", kind="db"):
+                if table in _ID_TAGGED:
+                    # IDs are known up front; skip sending the rows back
+                    await self.client.table(table).insert(payload, returning=ReturnMethod.minimal).execute()
+                    inserted = payload
+                else:
+                    inserted = (await self.client.table(table).insert(payload).execute()).data
+                record(db_calls=1, db_rows=len(inserted))
+            for item, row in zip(items, inserted):
+                if "key" in item:
+                    seeded[item["key"]] = row
+                    self.rows[item["key"]] = row
+        return seeded
+
+    async def teardown(self) -> Dict[str, int]:
+        """
+        Hard-delete everything in the namespace and forget it.
+
+        Returns:
+            Rows deleted per table
+        """
+        like = f"{self.tag}-*"
+        deletes = [
+            ("unidades", "id", like),
+            ("unidades", "proyecto_id", like),
+            *(("unidades", "nombre", pattern) for pattern in self.name_patterns),
+            ("proyectos", "id", like),
+            *(("proyectos", "nombre", pattern) for pattern in self.proyecto_patterns),
+            ("barrios", "nombre", f"* [{self.tag}]"),
+            ("ciudades", "nombre", f"* [{self.tag}]"),
+        ]
+        counts: Dict[str, int] = {}
+        async with trace_step("fixture teardown", kind="db"):
+            for table, column, pattern in deletes:
+                response = await (self.client.table(table)
+                                  .delete(count="exact", returning=ReturnMethod.minimal)
+                                  .like(column, pattern)
+                                  .execute())
+                counts[table] = counts.get(table, 0) + (response.count or 0)
+            annotate(namespace=self.namespace, deleted=counts)
+            record(db_calls=len(deletes))
+        self.rows.clear()
+        self.registry_path.unlink(missing_ok=True)
+        return counts
+
+
+async def sweep_orphans(
+    client: AsyncClient,
+    url: str = "",
+    registry_dir: Path = DEFAULT_REGISTRY_DIR
+) -> List[str]:
+    """
+    Tear down namespaces registered by processes that are no longer running.
+
+    Only namespaces recorded for ``url`` are swept, so a run against the
+    stand-in never deletes from the real project (or the other way round).
+
+    Returns:
+        The namespaces that were removed
+    """
+    swept = []
+    for path in sorted(Path(registry_dir).glob("fx-*.json")):
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if entry.get("url", "") != url or _pid_alive(entry.get("pid")):
+            continue
+        fixtures = FixtureSet(client, entry["namespace"], url, entry.get("name_patterns", ()), registry_dir,
+                              proyecto_patterns=entry.get("proyecto_patterns", ()))
+        await fixtures.teardown()
+        swept.append(entry["namespace"])
+    return swept
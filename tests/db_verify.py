@@ -0,0 +1,216 @@
+"""
+Non-blocking Supabase verification for the ``unidades`` table.
+
+UI saves are eventually consistent from the test's point of view: the toast
+may appear before or after the row is visible through PostgREST. The
+assertions here therefore poll with bounded exponential backoff instead of
+checking once, use the async Supabase client so the event loop (and any
+concurrent scenarios) keeps running while waiting, select only the columns
+being asserted, and look rows up by primary key once it is known.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from supabase import acreate_client, AsyncClient
+
+from instrumentation import annotate, record, trace_step
+
+
+T = TypeVar("T")
+
+# One client (and therefore one HTTP connection pool) per project and key
+_clients: Dict[Tuple[str, str], AsyncClient] = {}
+_clients_lock: Optional[asyncio.Lock] = None
+
+
+async def get_async_client(url: str, key: str) -> AsyncClient:
+    """
+    Return the shared async Supabase client for a project, creating it once.
+
+    Args:
+        url: Supabase project URL
+        key: Supabase anon/service key
+
+    Returns:
+        A pooled AsyncClient reused by every caller with the same url/key
+    """
+    global _clients_lock
+    if _clients_lock is None:
+        _clients_lock = asyncio.Lock()
+    async with _clients_lock:
+        if (url, key) not in _clients:
+            _clients[(url, key)] = await acreate_client(url, key)
+        return _clients[(url, key)]
+
+
+def _matches(actual: Any, expected: Any) -> bool:
+    """Compare DB and expected values, treating numeric strings as numbers."""
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool) and actual is not None:
+        try:
+            return float(actual) == float(expected)
+        except (TypeError, ValueError):
+            return False
+    return actual == expected
+
+
+async def eventually(
+    check: Callable[[], Awaitable[T]],
+    timeout_s: float = 10.0,
+    initial_delay_s: float = 0.2,
+    max_delay_s: float = 2.0,
+    factor: float = 2.0
+) -> T:
+    """
+    Retry an async check until it stops raising AssertionError.
+
+    Delays grow exponentially from ``initial_delay_s`` up to ``max_delay_s``
+    and the total time is bounded by ``timeout_s``; the last AssertionError is
+    re-raised once the budget is spent.
+
+    Args:
+        check: Coroutine function that raises AssertionError while the
+            condition does not hold and returns a value once it does
+        timeout_s: Total time budget in seconds
+        initial_delay_s: Delay before the first retry
+        max_delay_s: Upper bound for a single delay
+        factor: Growth factor between delays
+
+    Returns:
+        The value returned by the first successful check
+    """
+    deadline = time.monotonic() + timeout_s
+    delay = initial_delay_s
+    while True:
+        try:
+            return await check()
+        except AssertionError:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * factor, max_delay_s)
+
+
+class UnidadVerifier:
+    """Awaitable 'eventually' assertions against the unidades table."""
+
+    def __init__(self, client: AsyncClient, timeout_s: float = 10.0):
+        """
+        Args:
+            client: Async Supabase client (see get_async_client)
+            timeout_s: Default time budget for each assertion
+        """
+        self.client = client
+        self.timeout_s = timeout_s
+
+    async def fetch(
+        self,
+        columns: Iterable[str],
+        unidad_id: Optional[str] = None,
+        nombre: Optional[str] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch non-deleted unidades by id, list of ids or nombre.
+
+        Only ``id`` plus the requested columns are selected.
+        """
+        select = ",".join(dict.fromkeys(["id", *columns]))
+        query = self.client.table("unidades").select(select).is_("deleted_at", "null")
+        if unidad_id is not None:
+            query = query.eq("id", unidad_id)
+        elif ids is not None:
+            query = query.in_("id", ids)
+        elif nombre is not None:
+            query = query.eq("nombre", nombre)
+        else:
+            raise ValueError("One of unidad_id, ids or nombre is required")
+        async with trace_step("supabase unidades select", kind="db"):
+            response = await query.execute()
+            rows = response.data or []
+            annotate(select=select)
+            record(db_calls=1, db_rows=len(rows))
+        return rows
+
+    async def assert_exists(
+        self,
+        expected: Optional[Dict[str, Any]] = None,
+        unidad_id: Optional[str] = None,
+        nombre: Optional[str] = None,
+        timeout_s: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Wait until exactly one matching unidad exists with the expected values.
+
+        Args:
+            expected: Column -> expected value (only these columns are read)
+            unidad_id: Primary key, preferred once known
+            nombre: Name to look up when the id is not known yet
+            timeout_s: Override of the default time budget
+
+        Returns:
+            The matching row (id plus the asserted columns)
+        """
+        expected = expected or {}
+
+        async def check() -> Dict[str, Any]:
+            rows = await self.fetch(expected.keys(), unidad_id=unidad_id, nombre=nombre)
+            label = unidad_id or nombre
+            assert len(rows) == 1, f"Expected 1 unidad '{label}', found {len(rows)}. Data: {rows}"
+            row = rows[0]
+            for column, value in expected.items():
+                assert _matches(row.get(column), value), (
+                    f"{column} mismatch for unidad '{label}'. Expected: {value}, "
+                    f"Found in DB: {row.get(column)}"
+                )
+            return row
+
+        return await eventually(check, timeout_s or self.timeout_s)
+
+    async def assert_deleted(
+        self,
+        unidad_id: Optional[str] = None,
+        nombre: Optional[str] = None,
+        timeout_s: Optional[float] = None
+    ) -> None:
+        """Wait until no non-deleted unidad matches the id or nombre."""
+        async def check() -> None:
+            rows = await self.fetch([], unidad_id=unidad_id, nombre=nombre)
+            assert not rows, (
+                f"Expected 0 unidades '{unidad_id or nombre}', found {len(rows)}. Data: {rows}"
+            )
+
+        await eventually(check, timeout_s or self.timeout_s)
+
+    async def assert_many(
+        self,
+        expected_by_id: Dict[str, Dict[str, Any]],
+        timeout_s: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Verify many unidades with a single ``in_`` query per attempt.
+
+        Args:
+            expected_by_id: Unidad id -> {column: expected value}
+            timeout_s: Override of the default time budget
+
+        Returns:
+            Unidad id -> row as read from the DB
+        """
+        columns = sorted({c for expected in expected_by_id.values() for c in expected})
+        ids = list(expected_by_id)
+
+        async def check() -> Dict[str, Dict[str, Any]]:
+            rows = {row["id"]: row for row in await self.fetch(columns, ids=ids)}
+            missing = [i for i in ids if i not in rows]
+            assert not missing, f"Unidades not found in DB: {missing}"
+            mismatches = [
+                f"{i}.{column}: expected {value}, found {rows[i].get(column)}"
+                for i, expected in expected_by_id.items()
+                for column, value in expected.items()
+                if not _matches(rows[i].get(column), value)
+            ]
+            assert not mismatches, "Mismatched unidades: " + "; ".join(mismatches)
+            return rows
+
+        return await eventually(check, timeout_s or self.timeout_s)
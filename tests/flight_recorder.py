@@ -0,0 +1,268 @@
+"""
+Flight recorder: the last steps of a run, kept in memory and written out only on failure.
+
+After every agent step (see trajectory_cache.run_cached) the recorder keeps a
+frame: the step, its outcome, the URL, a DOM snapshot and a JPEG screenshot.
+Frames live in a ring buffer of the last ``capacity`` steps, with the DOM
+gzipped, so memory stays bounded however long the run is.
+
+Capturing stays off the step path: ``record()`` notes the step and URL
+synchronously, then fetches the DOM and screenshot in a background task
+that overlaps the next step (usually an LLM call, much slower than a
+screenshot). If the previous capture is still running the new frame keeps
+only its URL, so captures never queue up behind each other. Compression and
+file writes run on a background thread.
+
+When the scenario fails, ``dump()`` captures the failing page (full-page
+screenshot), waits for the pending capture and writes a self-contained HTML
+report with every frame (screenshots inlined, DOM snapshots rendered in
+sandboxed iframes) plus the failure screenshot on its own:
+
+    tests/screenshots/test_failure_<namespace>.html
+    tests/screenshots/test_failure_<namespace>.jpg
+
+Scenarios install a recorder for their agent steps with:
+
+    recorder = FlightRecorder()
+    use_flight_recorder(recorder)
+    ...
+    path = await recorder.dump(page, "test_failure_...", error)   # on failure
+    recorder.close()
+
+Set FLIGHT_RECORDER=0 to disable it; FLIGHT_RECORDER_FRAMES sets the capacity.
+"""
+import asyncio
+import base64
+import gzip
+import html
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+
+
+# Where failure reports are written
+DEFAULT_SCREENSHOT_DIR = Path(__file__).parent / "screenshots"
+
+# Steps kept in the ring buffer
+DEFAULT_CAPACITY = 10
+
+# JPEG quality of step screenshots (the failure screenshot uses FAILURE_JPEG_QUALITY)
+JPEG_QUALITY = 50
+FAILURE_JPEG_QUALITY = 80
+
+# Seconds dump() waits for a pending capture before writing the report without it
+PENDING_TIMEOUT_S = 5
+
+
+@dataclass
+class Frame:
+    """What the page looked like after one step."""
+
+    step: str
+    url: str
+    at: float
+    error: Optional[str] = None
+    # Gzipped page HTML and JPEG screenshot, filled in by the background capture
+    dom_gz: Optional[bytes] = None
+    screenshot: Optional[bytes] = None
+    capture_error: Optional[str] = None
+    skipped: bool = False
+
+    @property
+    def status(self) -> str:
+        return "error" if self.error else "ok"
+
+
+class FlightRecorder:
+    """Ring buffer of the last steps' URL, DOM and screenshot."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, screenshot_dir: Path = DEFAULT_SCREENSHOT_DIR):
+        """
+        Args:
+            capacity: Steps kept (older frames are dropped)
+            screenshot_dir: Where dump() writes the report
+        """
+        self.frames: Deque[Frame] = deque(maxlen=max(1, capacity))
+        self.screenshot_dir = Path(screenshot_dir)
+        self.captures = 0
+        self.skipped = 0
+        self.capture_s = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flight-recorder")
+
+    def record(self, page: Any, step: str, error: Optional[BaseException] = None) -> Frame:
+        """
+        Add a frame for a finished step; its DOM and screenshot are captured in the background.
+
+        Args:
+            page: The page the step ran on
+            step: Step label (the task sent to the agent)
+            error: The step's exception, if it raised
+        """
+        frame = Frame(
+            step=step,
+            url=getattr(page, "url", ""),
+            at=time.time(),
+            error=f"{type(error).__name__}: {error}" if error else None,
+        )
+        self.frames.append(frame)
+        if self._pending is not None and not self._pending.done():
+            frame.skipped = True
+            self.skipped += 1
+        else:
+            self._pending = asyncio.create_task(self._capture(page, frame))
+        return frame
+
+    async def _capture(self, page: Any, frame: Frame, full_page: bool = False, quality: int = JPEG_QUALITY) -> None:
+        started = time.perf_counter()
+        try:
+            content = await page.content()
+            frame.screenshot = await page.screenshot(type="jpeg", quality=quality, scale="css", full_page=full_page)
+            loop = asyncio.get_running_loop()
+            frame.dom_gz = await loop.run_in_executor(self._executor, gzip.compress, content.encode("utf-8"))
+        except Exception as e:
+            frame.capture_error = f"{type(e).__name__}: {e}"
+        finally:
+            self.captures += 1
+            self.capture_s += time.perf_counter() - started
+
+    async def dump(self, page: Optional[Any], name: str, error: Optional[BaseException] = None) -> Path:
+        """
+        Capture the failing page and write the HTML report of every frame.
+
+        Args:
+            page: The page at the time of failure (None when the browser is gone)
+            name: File name stem, e.g. 'test_failure_<namespace>'
+            error: The failure
+
+        Returns:
+            Path of the HTML report
+        """
+        if self._pending is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._pending), PENDING_TIMEOUT_S)
+            except Exception:
+                pass
+        frames = list(self.frames)
+        if page is not None:
+            final = Frame(step="failure", url=getattr(page, "url", ""), at=time.time(),
+                          error=f"{type(error).__name__}: {error}" if error else None)
+            await self._capture(page, final, full_page=True, quality=FAILURE_JPEG_QUALITY)
+            frames.append(final)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._write, frames, name, error)
+
+    def _write(self, frames: List[Frame], name: str, error: Optional[BaseException]) -> Path:
+        """Write the report and the failure screenshot (runs on the background thread)."""
+        self.screenshot_dir.mkdir(parents=True, exist_ok=True)
+        stem = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        if frames and frames[-1].screenshot:
+            (self.screenshot_dir / f"{stem}.jpg").write_bytes(frames[-1].screenshot)
+        path = self.screenshot_dir / f"{stem}.html"
+        path.write_text(render_report(frames, name, error, self.stats()), encoding="utf-8")
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": len(self.frames),
+            "captures": self.captures,
+            "skipped": self.skipped,
+            "capture_s": round(self.capture_s, 3),
+            "buffered_bytes": sum(len(f.dom_gz or b"") + len(f.screenshot or b"") for f in self.frames),
+        }
+
+    def close(self) -> None:
+        """Cancel a pending capture and stop the background thread."""
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        self._executor.shutdown(wait=True)
+
+
+_REPORT_CSS = """
+body { font-family: system-ui, sans-serif; margin: 2rem; color: #1d2330; background: #f5f6f8; }
+h1 { font-size: 1.4rem; margin-bottom: .25rem; }
+.meta { color: #5b6475; font-size: .9rem; }
+.failure { background: #fdecec; border-left: 4px solid #c62828; padding: .75rem 1rem; white-space: pre-wrap; }
+.frame { background: #fff; border: 1px solid #dde1e8; border-radius: 6px; margin: 1.5rem 0; padding: 1rem; }
+.frame.error { border-color: #c62828; }
+.frame h2 { font-size: 1rem; margin: 0 0 .5rem; }
+.frame img { max-width: 100%; border: 1px solid #dde1e8; }
+.frame iframe { width: 100%; height: 600px; border: 1px solid #dde1e8; background: #fff; }
+.note { color: #8a6d00; }
+"""
+
+
+def render_report(frames: List[Frame], name: str, error: Optional[BaseException], stats: Dict[str, Any]) -> str:
+    """Self-contained HTML report: the failure, then every frame, latest first."""
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+        f"<title>Flight recorder: {html.escape(name)}</title><style>{_REPORT_CSS}</style></head><body>",
+        f"<h1>{html.escape(name)}</h1>",
+        f"<p class=\"meta\">Written {datetime.now():%Y-%m-%d %H:%M:%S} · {len(frames)} frames · "
+        f"{stats['captures']} captures in {stats['capture_s']:.2f}s, {stats['skipped']} skipped</p>",
+    ]
+    if error is not None:
+        parts.append(f"<pre class=\"failure\">{html.escape(f'{type(error).__name__}: {error}')}</pre>")
+    for index, frame in reversed(list(enumerate(frames, 1))):
+        parts.append(f"<section class=\"frame {frame.status}\">")
+        parts.append(f"<h2>#{index} {html.escape(frame.step)}</h2>")
+        at = datetime.fromtimestamp(frame.at).strftime("%H:%M:%S.%f")[:-3]
+        parts.append(
+            f"<p class=\"meta\">{at} · {frame.status} · "
+            f"<a href=\"{html.escape(frame.url, quote=True)}\">{html.escape(frame.url)}</a></p>"
+        )
+        if frame.error:
+            parts.append(f"<pre class=\"failure\">{html.escape(frame.error)}</pre>")
+        if frame.skipped:
+            parts.append("<p class=\"note\">Previous capture still running: URL only</p>")
+        if frame.capture_error:
+            parts.append(f"<p class=\"note\">Capture failed: {html.escape(frame.capture_error)}</p>")
+        if frame.screenshot:
+            encoded = base64.b64encode(frame.screenshot).decode("ascii")
+            parts.append(f"<img alt=\"screenshot\" src=\"data:image/jpeg;base64,{encoded}\">")
+        if frame.dom_gz:
+            dom = gzip.decompress(frame.dom_gz).decode("utf-8", errors="replace")
+            parts.append(
+                f"<details><summary>DOM snapshot ({len(dom) / 1024:.0f} KB)</summary>"
+                f"<iframe sandbox srcdoc=\"{html.escape(dom, quote=True)}\"></iframe></details>"
+            )
+        parts.append("</section>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+_recorder: ContextVar[Optional[FlightRecorder]] = ContextVar("flight_recorder", default=None)
+
+
+def use_flight_recorder(recorder: Optional[FlightRecorder]) -> None:
+    """Record the current context's agent steps into ``recorder`` (None stops)."""
+    _recorder.set(recorder)
+
+
+def recorder_enabled() -> bool:
+    """False when FLIGHT_RECORDER=0."""
+    return os.getenv("FLIGHT_RECORDER", "1") != "0"
+
+
+def new_recorder() -> Optional[FlightRecorder]:
+    """A recorder sized by FLIGHT_RECORDER_FRAMES, or None when disabled."""
+    if not recorder_enabled():
+        return None
+    return FlightRecorder(capacity=int(os.getenv("FLIGHT_RECORDER_FRAMES", DEFAULT_CAPACITY)))
+
+
+async def record_frame(agent: Agent, step: str, error: Optional[BaseException] = None) -> None:
+    """Add a frame for the agent's current page, if a recorder is active."""
+    recorder = _recorder.get()
+    page = await get_current_page(agent) if recorder is not None else None
+    if page is not None:
+        recorder.record(page, step, error)
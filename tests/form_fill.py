@@ -0,0 +1,256 @@
+"""
+Declarative, batched form filling for browser-use tests.
+
+Instead of one ``agent.run`` (one full LLM planning loop) per form field, a
+form is described as a spec of ``tab label -> {field label: value}`` and each
+tab is filled with a single in-page script. Fields are located
+deterministically (formControlName / name / id, then ``<label>`` text, then
+placeholder). Only the fields that could not be filled that way are handed to
+the agent, batched into one prompt per tab.
+
+Example:
+    await fill_form(agent, {
+        "Datos Básicos": {
+            "Tipo de Propiedad": "Apartamento",
+            "Nombre": "Unidad 101",
+            "Piso": 5,
+            "Orientación": ANY_OPTION,
+        },
+    })
+"""
+from typing import Any, Dict, List, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+from trajectory_cache import run_cached
+from instrumentation import annotate, record, traced
+
+
+# Value meaning "select the first real option of this dropdown"
+ANY_OPTION = "__any_option__"
+
+# Fills every field of one tab inside the page. Fields are processed in order
+# and each one is polled for, because Angular only renders some controls
+# (e.g. 'Piso') after an earlier field changed, and some option lists
+# (e.g. barrios) load asynchronously.
+FILL_FORM_JS = """
+async ({ tab, fields, timeoutMs, disabledGraceMs, anyOption }) => {
+    const norm = (s) => (s || '').replace(/\\*/g, '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const isControl = (el) => el && ['INPUT', 'SELECT', 'TEXTAREA'].includes(el.tagName);
+    const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+    const frame = () => new Promise((r) => requestAnimationFrame(() => r()));
+
+    const byId = (id) => Array.from(document.querySelectorAll(`[id="${CSS.escape(id)}"]`)).find(isControl);
+
+    const resolve = (key) => {
+        const esc = CSS.escape(key);
+        const direct = document.querySelector(
+            `[formcontrolname="${esc}"], [name="${esc}"]`
+        );
+        if (isControl(direct)) return direct;
+        const idMatch = byId(key);
+        if (idMatch) return idMatch;
+        const wanted = norm(key);
+        for (const label of document.querySelectorAll('label')) {
+            if (norm(label.textContent) !== wanted) continue;
+            const target = label.htmlFor ? byId(label.htmlFor) : label.querySelector('input, select, textarea');
+            if (target) return target;
+        }
+        return Array.from(document.querySelectorAll('[placeholder]'))
+            .find((el) => isControl(el) && norm(el.getAttribute('placeholder')) === wanted) || null;
+    };
+
+    const pickOption = (select, value) => {
+        const options = Array.from(select.options);
+        if (value === anyOption) {
+            return options.find((o) => o.value && o.value !== 'null' && !o.value.endsWith(': null')) || null;
+        }
+        const candidates = (Array.isArray(value) ? value : [value]).map(String);
+        for (const c of candidates) {
+            // Angular's NgSelectOption renders values as "<index>: <value>"
+            const hit = options.find((o) =>
+                norm(o.textContent) === norm(c) || o.value === c || o.value.endsWith(`: ${c}`)
+            );
+            if (hit) return hit;
+        }
+        return null;
+    };
+
+    const setNative = (el, value) => {
+        const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+    };
+
+    const apply = (el, value) => {
+        if (el.tagName === 'SELECT') {
+            const option = pickOption(el, value);
+            if (!option) return false;
+            el.value = option.value;
+            el.dispatchEvent(new Event('change', { bubbles: true }));
+            return true;
+        }
+        if (el.type === 'checkbox' || el.type === 'radio') {
+            if (el.checked !== Boolean(value)) el.click();
+            return true;
+        }
+        el.focus();
+        setNative(el, value === null || value === undefined ? '' : String(value));
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.dispatchEvent(new Event('blur'));
+        return true;
+    };
+
+    let tabClicked = !tab;
+    if (tab) {
+        const deadline = Date.now() + timeoutMs;
+        while (!tabClicked && Date.now() < deadline) {
+            const link = Array.from(document.querySelectorAll('.nav-tabs .nav-link, [role="tab"]'))
+                .find((el) => norm(el.textContent) === norm(tab));
+            if (link) {
+                link.click();
+                tabClicked = true;
+            } else {
+                await sleep(50);
+            }
+        }
+        if (!tabClicked) {
+            return { tabClicked, filled: [], skipped: [], missing: fields.map(([label]) => label) };
+        }
+        await frame();
+    }
+
+    const filled = [];
+    const skipped = [];
+    const missing = [];
+    for (const [label, value] of fields) {
+        const deadline = Date.now() + timeoutMs;
+        let disabledSince = null;
+        let done = false;
+        while (!done && Date.now() < deadline) {
+            const el = resolve(label);
+            if (el && el.disabled) {
+                // Locked by the app itself (e.g. ciudad inherited from the proyecto)
+                disabledSince = disabledSince || Date.now();
+                if (Date.now() - disabledSince >= disabledGraceMs) {
+                    skipped.push(label);
+                    done = true;
+                    break;
+                }
+            } else if (el && apply(el, value)) {
+                filled.push(label);
+                done = true;
+                break;
+            }
+            await sleep(50);
+        }
+        if (!done) missing.push(label);
+        await frame();
+    }
+    return { tabClicked, filled, skipped, missing };
+}
+"""
+
+
+def _describe_value(value: Any) -> str:
+    """Render a spec value as an instruction fragment for the agent."""
+    if value == ANY_OPTION:
+        return "select any available option"
+    if isinstance(value, bool):
+        return "check it" if value else "make sure it is unchecked"
+    if isinstance(value, (list, tuple)):
+        first, rest = value[0], ", ".join(f"'{v}'" for v in value[1:])
+        return f"select '{first}'" + (f" (or {rest} if that's the option)" if rest else "")
+    return f"set it to '{value}'"
+
+
+def build_fallback_prompt(tab: str, fields: Dict[str, Any], click_tab: bool) -> str:
+    """
+    Build a single agent prompt covering every field the fast path missed.
+
+    Args:
+        tab: Tab label the fields live in ("" if the form has no tabs)
+        fields: Remaining field label -> value pairs
+        click_tab: Whether the agent must switch to the tab first
+
+    Returns:
+        Natural-language task for ``agent.run``
+    """
+    lines = []
+    if tab and click_tab:
+        lines.append(f"Click on the '{tab}' tab and wait for its content to load.")
+    if fields:
+        where = f"In the '{tab}' tab, f" if tab else "F"
+        lines.append(f"{where}ill in the following fields, in this order:")
+        for label, value in fields.items():
+            lines.append(f"- '{label}': {_describe_value(value)}")
+    return "\n".join(lines)
+
+
+@traced("fill_form", kind="fill")
+async def fill_form(
+    agent: Agent,
+    spec: Dict[str, Dict[str, Any]],
+    field_timeout_ms: int = 3000,
+    disabled_grace_ms: int = 500
+) -> Dict[str, List[str]]:
+    """
+    Fill a (possibly tabbed) form in one batched step per tab.
+
+    Each tab is switched to and filled by a single in-page script. Fields that
+    cannot be located or set within ``field_timeout_ms`` are passed to the
+    agent in one combined prompt for that tab. Fields the app renders as
+    disabled are skipped, since the user could not edit them either.
+
+    Args:
+        agent: The browser-use Agent instance
+        spec: Ordered mapping of tab label -> {field label: value}. Use ""
+            as tab label for forms without tabs. Values may be a string or
+            number, a bool for checkboxes/radios, a list of alternatives for
+            dropdowns, or ANY_OPTION.
+        field_timeout_ms: How long to wait for each field to appear
+        disabled_grace_ms: How long a disabled field may stay disabled
+            before it is skipped
+
+    Returns:
+        Dictionary with the field labels that were 'filled' deterministically,
+        'skipped' because disabled, and handed to the agent as 'fallback'
+    """
+    summary: Dict[str, List[str]] = {"filled": [], "skipped": [], "fallback": []}
+    annotate(tabs=list(spec))
+    page = await get_current_page(agent)
+
+    for tab, fields in spec.items():
+        result: Optional[Dict[str, Any]] = None
+        if page is not None:
+            try:
+                result = await page.evaluate(FILL_FORM_JS, {
+                    "tab": tab,
+                    "fields": [[label, value] for label, value in fields.items()],
+                    "timeoutMs": field_timeout_ms,
+                    "disabledGraceMs": disabled_grace_ms,
+                    "anyOption": ANY_OPTION,
+                })
+            except Exception as e:
+                print(f"  ⚠ Direct form fill failed for '{tab or 'form'}', using agent: {e}")
+
+        if result is None:
+            pending = dict(fields)
+            click_tab = True
+        else:
+            summary["filled"].extend(result["filled"])
+            summary["skipped"].extend(result["skipped"])
+            pending = {label: fields[label] for label in result["missing"]}
+            click_tab = not result["tabClicked"]
+
+        if pending or (tab and click_tab):
+            summary["fallback"].extend(pending)
+            await run_cached(agent, build_fallback_prompt(tab, pending, click_tab))
+
+    annotate(**summary)
+    record(browser_actions=len(summary["filled"]))
+    print(
+        f"  ✓ Form filled: {len(summary['filled'])} direct, "
+        f"{len(summary['fallback'])} via agent, {len(summary['skipped'])} skipped (disabled)"
+    )
+    return summary
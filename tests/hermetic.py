@@ -0,0 +1,130 @@
+"""
+Hermetic mode: run the UnidadCRUDTest scenario with no network dependencies.
+
+With ``HERMETIC=1`` the test harness:
+
+- Starts the in-process PostgREST stand-in (postgrest_standin.py), seeded
+  with the reference data the unidad form needs and the columns/defaults of
+  ``unidades_table_cleaned.sql``, and points the Supabase client at it
+- Replaces the agent with the scripted steps in ``fixtures/hermetic_steps.json``
+  (see trajectory_cache.use_step_script): every prompt is resolved to
+  deterministic page actions, and a prompt without a script entry fails
+- Gives the Agent a ScriptedLLM instead of ChatOpenAI, so an unexpected LLM
+  call fails loudly instead of reaching OpenAI. Build hermetic agents with
+  ``Agent(..., llm=ScriptedLLM(), **SCRIPTED_AGENT_OPTIONS)``; otherwise
+  browser-use probes the model for tool calling in ``Agent()`` and the probe
+  trips the ScriptedLLM
+
+The Angular app must talk to the same stand-in; serve it with the
+``hermetic`` configuration (``npm run start:hermetic``), which points
+``environment.supabase.url`` at http://127.0.0.1:54321.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from postgrest_standin import ANON_KEY, PostgrestStandIn
+from trajectory_cache import use_step_script
+
+
+# Port baked into src/environments/environment.hermetic.ts
+DEFAULT_PORT = 54321
+
+# Scripted agent steps for the UnidadCRUDTest prompts
+DEFAULT_STEP_SCRIPT = Path(__file__).parent / "fixtures" / "hermetic_steps.json"
+
+# Agent kwargs for a ScriptedLLM: with a fixed tool calling method browser-use
+# skips its detection probe, and "raw" sends calls straight to ainvoke()
+SCRIPTED_AGENT_OPTIONS = {"tool_calling_method": "raw"}
+
+
+def is_hermetic() -> bool:
+    """Whether hermetic mode is enabled (HERMETIC=1)."""
+    return os.getenv("HERMETIC", "0") == "1"
+
+
+def load_step_script(path: Path = DEFAULT_STEP_SCRIPT) -> List[Dict[str, Any]]:
+    """Load a step script (list of ``{"match", "actions"}`` entries)."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+class ScriptedLLM(BaseChatModel):
+    """
+    Chat model answering from a fixed list of (regex, reply) pairs.
+
+    The reply of the first pattern found in the last message is returned;
+    any other call raises LookupError. With no responses configured it acts
+    as a tripwire for code paths that would otherwise call a real LLM.
+
+    The model counts as verified for browser-use, so ``Agent()`` does not
+    send it the API key check (which would hit the tripwire).
+    """
+
+    responses: List[Tuple[str, str]] = []
+    # Read by browser-use's Agent before it verifies the model
+    _verified_api_keys: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        content = messages[-1].content if messages else ""
+        text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        for pattern, reply in self.responses:
+            if re.search(pattern, text):
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+        raise LookupError(f"Hermetic mode: no scripted LLM response for: {text[:120]!r}")
+
+
+class HermeticEnvironment:
+    """Stand-in backend plus scripted agent steps for one test process."""
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        step_script: Path = DEFAULT_STEP_SCRIPT,
+        seed: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ):
+        """
+        Args:
+            port: Stand-in port (default: HERMETIC_PORT or 54321, which the
+                Angular ``hermetic`` configuration expects)
+            step_script: JSON file with the scripted agent steps
+            seed: Initial rows per table (default: the stand-in's DEFAULT_SEED)
+        """
+        self.standin = PostgrestStandIn(
+            port=port if port is not None else int(os.getenv("HERMETIC_PORT", DEFAULT_PORT)),
+            seed=seed,
+        )
+        self.step_script = step_script
+
+    @property
+    def supabase_url(self) -> str:
+        return self.standin.url
+
+    @property
+    def supabase_key(self) -> str:
+        return ANON_KEY
+
+    def start(self) -> "HermeticEnvironment":
+        """Start the stand-in and route agent steps through the script."""
+        self.standin.start()
+        use_step_script(load_step_script(self.step_script))
+        return self
+
+    def stop(self) -> None:
+        """Stop the stand-in and give steps back to the agent."""
+        use_step_script(None)
+        self.standin.stop()
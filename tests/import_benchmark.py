@@ -0,0 +1,340 @@
+"""
+End-to-end throughput benchmark of the /importar page.
+
+For each file size, generates an XLSX with synthetic_unidades.py, logs in
+through the regular harness (UnidadCRUDTest setup + login_to_dashboard) and
+drives the importer in the page:
+
+1. parse: file handed to the ``#excelFile`` input until the column mapping
+   table is rendered
+2. validate: 'Validar y Continuar' until 'Validación completada'
+3. import: 'Importar N Unidades' until 'Importación completada'
+
+Phase times are measured inside the page, from the triggering event to the
+expected UI state. Every generated unidad and proyecto nombre starts with
+``Bench <namespace>-<n> ``, so the rows of each size are confirmed with a
+single count query on that prefix (rows written by concurrent runs do not
+count), and everything the run imported is deleted with the harness's
+fixtures at the end, even when it fails. A scaling curve (seconds and rows/s
+per size, plus the log-log slope of time vs. rows) is printed and saved. With
+``--baseline`` the run fails if import throughput dropped by more than
+``--tolerance`` at any size.
+
+Works against the hermetic stand-in too (HERMETIC=1, see hermetic.py).
+
+Usage:
+    python tests/import_benchmark.py --sizes 1000 10000 50000
+    python tests/import_benchmark.py --sizes 1000 10000 --baseline tests/traces/import_benchmark_<ts>.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add tests directory to path for imports
+tests_dir = Path(__file__).parent
+sys.path.insert(0, str(tests_dir))
+
+from test_unidad_crud import UnidadCRUDTest
+from browser_pool import close_shared_pool
+from login_to_dashboard import login_to_dashboard
+from browser_page import get_current_page
+from angular_wait import wait_for_angular
+from synthetic_unidades import DEFAULT_OUT_DIR, generate, template_columns
+from instrumentation import DEFAULT_TRACE_DIR, annotate, record, start_trace, trace_step, write_trace
+
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+
+# Generous per-row budget for the one-request-per-row import loop
+IMPORT_MS_PER_ROW = 250
+
+# Polls the importer's result alert (cleared by the app after 5s) for a message
+_WAIT_FOR_MESSAGE = """
+    const waitFor = async (check, timeoutMs, started) => {
+        while (performance.now() - started < timeoutMs) {
+            const result = check();
+            if (result) return { ...result, elapsedMs: Math.round(performance.now() - started) };
+            await new Promise((r) => setTimeout(r, 50));
+        }
+        return { ok: false, message: 'timeout', elapsedMs: Math.round(performance.now() - started) };
+    };
+    const alertCheck = (expect) => () => {
+        const alerts = Array.from(document.querySelectorAll('.alert')).map((a) => a.textContent.trim());
+        const hit = alerts.find((t) => t.includes(expect));
+        if (hit) return { ok: true, message: hit };
+        const failure = alerts.find((t) => t.startsWith('Error'));
+        return failure ? { ok: false, message: failure } : null;
+    };
+"""
+
+UPLOAD_JS = """
+async ({ name, data, columns, timeoutMs }) => {
+""" + _WAIT_FOR_MESSAGE + """
+    const input = document.querySelector('input#excelFile');
+    if (!input) return { ok: false, message: 'input#excelFile not found', elapsedMs: 0 };
+    const bytes = Uint8Array.from(atob(data), (c) => c.charCodeAt(0));
+    const file = new File([bytes], name, {
+        type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    });
+    const transfer = new DataTransfer();
+    transfer.items.add(file);
+    input.files = transfer.files;
+    const started = performance.now();
+    input.dispatchEvent(new Event('change', { bubbles: true }));
+    return waitFor(() => {
+        const selects = document.querySelectorAll('.mapping-table-container select');
+        return selects.length >= columns ? { ok: true, message: `${selects.length} columns` } : null;
+    }, timeoutMs, started);
+}
+"""
+
+# Maps every Excel column to the system field of the same name (the
+# plantilla headers are the field names); the app has no auto-mapping
+MAP_COLUMNS_JS = """
+() => {
+    let mapped = 0;
+    for (const select of document.querySelectorAll('.mapping-table-container select')) {
+        const column = select.closest('td').previousElementSibling.textContent.trim();
+        if (!Array.from(select.options).some((o) => o.value === column)) continue;
+        select.value = column;
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+        mapped++;
+    }
+    return mapped;
+}
+"""
+
+CLICK_AND_WAIT_JS = """
+async ({ buttonText, expect, timeoutMs }) => {
+""" + _WAIT_FOR_MESSAGE + """
+    const button = Array.from(document.querySelectorAll('.step-actions button'))
+        .find((b) => b.textContent.includes(buttonText));
+    if (!button || button.disabled) {
+        return { ok: false, message: `button '${buttonText}' not found or disabled`, elapsedMs: 0 };
+    }
+    const started = performance.now();
+    button.click();
+    return waitFor(alertCheck(expect), timeoutMs, started);
+}
+"""
+
+
+def name_prefix(namespace: str, index: Optional[int] = None) -> str:
+    """Nombre prefix of the rows imported for size ``index`` (None: any size of the run)."""
+    return f"Bench {namespace}-{'' if index is None else f'{index} '}"
+
+
+async def count_unidades_named(client: Any, prefix: str) -> int:
+    """Number of non-deleted unidades whose nombre starts with ``prefix`` (one query)."""
+    async with trace_step("supabase unidades count", kind="db"):
+        response = await (
+            client.table("unidades")
+            .select("id", count="exact", head=True)
+            .like("nombre", f"{prefix}*")
+            .is_("deleted_at", "null")
+            .execute()
+        )
+        record(db_calls=1)
+    return response.count or 0
+
+
+async def _phase(page: Any, name: str, js: str, arg: Dict[str, Any]) -> float:
+    """Run one in-page phase, returning its duration in seconds."""
+    async with trace_step(name, kind="phase"):
+        result = await page.evaluate(js, arg)
+        annotate(message=result.get("message"), elapsed_ms=result["elapsedMs"])
+        if not result["ok"]:
+            raise RuntimeError(f"{name} failed after {result['elapsedMs']}ms: {result['message']}")
+    return result["elapsedMs"] / 1000
+
+
+async def benchmark_size(
+    harness: UnidadCRUDTest,
+    rows: int,
+    out_dir: Path,
+    seed: int,
+    index: int = 0
+) -> Dict[str, Any]:
+    """Generate, upload, validate and import one file; returns its measurements."""
+    prefix = name_prefix(harness.test_timestamp, index)
+    summary = generate(rows, out_dir, formats=("xlsx",), seed=seed, stem=f"import_bench_{rows}", name_prefix=prefix)
+    path = Path(summary["files"]["xlsx"]["path"])
+
+    page = await get_current_page(harness.agent)
+    if page is None:
+        raise RuntimeError("The import benchmark needs direct page access")
+    await page.goto(f"{harness.base_url}/importar")
+    await wait_for_angular(harness.agent, url_contains="/importar", any_of=["input#excelFile"])
+
+    timeout_ms = max(60000, rows * IMPORT_MS_PER_ROW)
+
+    parse_s = await _phase(page, "parse", UPLOAD_JS, {
+        "name": path.name,
+        "data": base64.b64encode(path.read_bytes()).decode("ascii"),
+        "columns": len(template_columns()),
+        "timeoutMs": timeout_ms,
+    })
+    mapped = await page.evaluate(MAP_COLUMNS_JS)
+    validate_s = await _phase(page, "validate", CLICK_AND_WAIT_JS, {
+        "buttonText": "Validar y Continuar", "expect": "Validación completada", "timeoutMs": timeout_ms,
+    })
+    import_s = await _phase(page, "import", CLICK_AND_WAIT_JS, {
+        "buttonText": "Importar", "expect": "Importación completada", "timeoutMs": timeout_ms,
+    })
+
+    imported = await count_unidades_named(harness.supabase, prefix)
+    return {
+        "rows": rows,
+        "columns_mapped": mapped,
+        "proyectos": summary["proyectos"],
+        "file_bytes": path.stat().st_size,
+        "parse_s": round(parse_s, 3),
+        "validate_s": round(validate_s, 3),
+        "import_s": round(import_s, 3),
+        "rows_in_db": imported,
+        "import_rows_per_s": round(imported / import_s, 2) if import_s else None,
+    }
+
+
+def scaling_slope(results: Sequence[Dict[str, Any]], key: str) -> Optional[float]:
+    """
+    Log-log slope of a phase time vs. rows (least squares).
+
+    ~1.0 is linear scaling; clearly above 1 means the phase gets slower per
+    row as files grow.
+    """
+    points = [(math.log(r["rows"]), math.log(r[key])) for r in results if r.get(key)]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator, 3)
+
+
+def compare_to_baseline(
+    results: Sequence[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """Sizes whose import throughput fell more than ``tolerance`` below the baseline."""
+    previous = {r["rows"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get(result["rows"])
+        if not base or not base.get("import_rows_per_s") or result.get("import_rows_per_s") is None:
+            continue
+        floor = base["import_rows_per_s"] * (1 - tolerance)
+        if result["import_rows_per_s"] < floor:
+            regressions.append(
+                f"{result['rows']} rows: {result['import_rows_per_s']} rows/s "
+                f"< {floor:.2f} (baseline {base['import_rows_per_s']} rows/s)"
+            )
+    return regressions
+
+
+def print_curve(results: Sequence[Dict[str, Any]], slopes: Dict[str, Optional[float]]) -> None:
+    """Print the scaling curve as a table."""
+    print("\n" + "="*60)
+    print("IMPORT SCALING CURVE")
+    print("="*60)
+    print(f"{'rows':>8} {'parse s':>9} {'valid. s':>9} {'import s':>10} {'in DB':>8} {'rows/s':>8}")
+    for r in results:
+        print(
+            f"{r['rows']:>8} {r['parse_s']:>9.2f} {r['validate_s']:>9.2f} {r['import_s']:>10.2f} "
+            f"{r['rows_in_db']:>8} {r['import_rows_per_s'] or 0:>8.1f}"
+        )
+    print("Log-log slope (1.0 = linear): " + ", ".join(
+        f"{phase} {slope if slope is not None else 'n/a'}" for phase, slope in slopes.items()
+    ))
+
+
+async def run_benchmark(
+    sizes: Sequence[int],
+    base_url: str,
+    out_dir: Path = DEFAULT_OUT_DIR,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Run every size in one logged-in session and return the report."""
+    harness = UnidadCRUDTest(base_url=base_url, namespace="import")
+    results: List[Dict[str, Any]] = []
+    try:
+        with start_trace(f"import_benchmark_{harness.test_timestamp}") as trace:
+            await harness.setup()
+            await login_to_dashboard(
+                agent=harness.agent,
+                base_url=base_url,
+                email="testuser@test.com",
+                password="testuser",
+                use_session_cache=not harness.hermetic
+            )
+            # Imported rows are removed by the harness teardown (or a later sweep)
+            prefix = name_prefix(harness.test_timestamp)
+            harness.fixtures.include(name_patterns=[f"{prefix}*"], proyecto_patterns=[f"{prefix}*"])
+            for index, rows in enumerate(sizes):
+                async with trace_step(f"{rows} rows", kind="task"):
+                    result = await benchmark_size(harness, rows, out_dir, seed, index)
+                results.append(result)
+                print(f"✓ {rows} rows: parse {result['parse_s']}s, validate {result['validate_s']}s, "
+                      f"import {result['import_s']}s, {result['rows_in_db']} in DB")
+                if result["rows_in_db"] != rows:
+                    print(f"  ⚠ Expected {rows} new unidades, found {result['rows_in_db']}")
+    finally:
+        await harness.teardown()
+        await close_shared_pool()
+
+    write_trace(trace)
+    return {
+        "base_url": base_url,
+        "hermetic": harness.hermetic,
+        "recorded_at": time.time(),
+        "results": results,
+        "slopes": {phase: scaling_slope(results, f"{phase}_s") for phase in ("parse", "validate", "import")},
+    }
+
+
+async def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the /importar page at increasing file sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR, help="Where generated files go")
+    parser.add_argument("--baseline", type=Path, help="Previous report to compare import throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative drop in rows/s vs. the baseline (default 0.2)")
+    args = parser.parse_args()
+
+    base_url = os.getenv("BASE_URL", "http://localhost:4200")
+    report = await run_benchmark(sorted(args.sizes), base_url, args.out_dir, args.seed)
+    print_curve(report["results"], report["slopes"])
+
+    report_dir = Path(os.getenv("TRACE_DIR", DEFAULT_TRACE_DIR))
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_dir / f"import_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📈 Report saved: {report_path}")
+
+    failed = any(r["rows_in_db"] != r["rows"] for r in report["results"])
+    if args.baseline:
+        regressions = compare_to_baseline(
+            report["results"], json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance
+        )
+        for regression in regressions:
+            print(f"❌ Import throughput regression: {regression}")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,439 @@
+"""
+Preflight validation of unidades import files, outside the browser.
+
+Applies the same rules as ``DataValidatorService`` in the Angular app, read
+straight from ``src/app/core/services/unidades-import.config.ts`` (required,
+dataType, min/max, allowedValues such as tipoUnidad/estadoComercial and the
+Si/No/Extra values of terraza/garage, defaultValue), so a file can be checked
+before it is uploaded to /importar.
+
+Instead of validating row by row, the file is read in chunks (CSV via
+Arrow's streaming reader, XLSX via xlsx_stream) and each rule is applied to a whole column at
+once. Memory is bounded by the chunk size. Outputs:
+
+- ``<file>.errors.csv``: one line per failing field (row, field, label,
+  message, value), rows numbered as in the spreadsheet (header = row 1)
+- ``<file>.clean.csv``: the valid rows, normalized (trimmed strings, parsed
+  numbers, ISO dates, defaults applied) under the target field names
+
+``<file>`` is the input's full name, so the reports of ``x.csv`` and
+``x.xlsx`` don't overwrite each other.
+
+Differences from the browser: impossible ISO dates (e.g. 2025-13-01) are
+reported, since Postgres rejects them on insert; of the free-form date
+formats JavaScript's ``Date`` accepts, only MM/DD/YYYY is recognized.
+
+Usage:
+    python tests/import_preflight.py tests/.generated/unidades_1000000.csv
+"""
+import argparse
+import csv
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from xlsx_stream import iter_xlsx_rows
+
+
+# Import rules used by the Angular importer
+IMPORT_CONFIG_TS = (
+    Path(__file__).parent.parent / "src" / "app" / "core" / "services" / "unidades-import.config.ts"
+)
+
+DEFAULT_CHUNK_SIZE = 100000
+
+ERROR_COLUMNS = ["row", "field", "label", "message", "value"]
+
+# Arrow-backed strings with NaN semantics (pandas' default 'str' dtype;
+# na_value needs pandas >= 2.3)
+_STR_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+_STRING_RE = r"'((?:[^'\\]|\\.)*)'"
+_FIELD_PROPS = {
+    "fieldName": re.compile(r"fieldName:\s*" + _STRING_RE),
+    "label": re.compile(r"label:\s*" + _STRING_RE),
+    "dataType": re.compile(r"dataType:\s*" + _STRING_RE),
+}
+_BOOL_PROPS = {name: re.compile(rf"\b{name}:\s*(true|false)") for name in ("required", "trim")}
+_NUMBER_PROPS = {name: re.compile(rf"\b{name}:\s*(-?\d+(?:\.\d+)?)") for name in ("min", "max")}
+_DEFAULT_RE = re.compile(r"defaultValue:\s*(?:" + _STRING_RE + r"|(-?\d+(?:\.\d+)?))")
+_ALLOWED_RE = re.compile(r"allowedValues:\s*\[(.*?)\]", re.DOTALL)
+_PLAIN_NUMBER_RE = r"-?\d+(?:\.\d+)?"
+_MAPPING_RE = re.compile(r"\{\s*excelColumn:\s*" + _STRING_RE + r",\s*targetField:\s*" + _STRING_RE + r"\s*\}")
+
+
+def _top_level_objects(source: str) -> Iterator[str]:
+    """Yield the ``{...}`` objects at depth 1 of an array literal body."""
+    depth, start = 0, None
+    for i, char in enumerate(source):
+        if char == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0 and start is not None:
+                yield source[start:i + 1]
+
+
+def load_import_config(path: Path = IMPORT_CONFIG_TS) -> Dict[str, Any]:
+    """
+    Read field rules and default column mappings from the TypeScript config.
+
+    Returns:
+        ``{"fields": [rule dict, ...], "mappings": {excel column: field}}``;
+        each rule has fieldName, label, dataType, required, trim, min, max,
+        defaultValue and allowedValues (transform/customValidator are not
+        evaluated)
+    """
+    source = Path(path).read_text(encoding="utf-8")
+    fields_start = source.index("fields:")
+    mappings_start = source.index("defaultColumnMappings:")
+
+    fields = []
+    for body in _top_level_objects(source[fields_start:mappings_start]):
+        rule: Dict[str, Any] = {}
+        for name, pattern in _FIELD_PROPS.items():
+            match = pattern.search(body)
+            rule[name] = match.group(1) if match else None
+        if not rule["fieldName"]:
+            continue
+        for name, pattern in _BOOL_PROPS.items():
+            match = pattern.search(body)
+            rule[name] = (match.group(1) == "true") if match else (name == "trim")
+        for name, pattern in _NUMBER_PROPS.items():
+            match = pattern.search(body)
+            rule[name] = float(match.group(1)) if match else None
+        match = _DEFAULT_RE.search(body)
+        rule["defaultValue"] = None if not match else (
+            match.group(1) if match.group(1) is not None else float(match.group(2))
+        )
+        match = _ALLOWED_RE.search(body)
+        rule["allowedValues"] = re.findall(_STRING_RE, match.group(1)) if match else None
+        fields.append(rule)
+
+    mappings = {column: field for column, field in _MAPPING_RE.findall(source[mappings_start:])}
+    return {"fields": fields, "mappings": mappings}
+
+
+def resolve_columns(headers: List[str], config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Map each configured field to a file column.
+
+    A header equal to the field name wins, then the config's
+    defaultColumnMappings, then case-insensitive matches of either.
+    """
+    by_field: Dict[str, str] = {}
+    lowered = {h.strip().lower(): h for h in reversed(headers)}
+    for rule in config["fields"]:
+        name = rule["fieldName"]
+        aliases = [name] + [c for c, f in config["mappings"].items() if f == name]
+        for alias in aliases:
+            if alias in headers:
+                by_field[name] = alias
+                break
+        else:
+            for alias in aliases:
+                if alias.lower() in lowered:
+                    by_field[name] = lowered[alias.lower()]
+                    break
+    return by_field
+
+
+def parse_numbers(values: pd.Series) -> pd.Series:
+    """
+    Vectorized equivalent of DataValidatorService.parseNumber.
+
+    Plain numbers are cast directly; anything else has every character but
+    digits, '.' and '-' stripped and keeps its leading numeric prefix (like
+    ``parseFloat``). Unparsable values become NaN.
+    """
+    parsed = pd.Series(np.nan, index=values.index, dtype="float64")
+    plain = values.str.fullmatch(_PLAIN_NUMBER_RE)
+    if plain.any():
+        parsed[plain] = values[plain].astype("float64")
+    retry = ~plain & (values != "")
+    if retry.any():
+        cleaned = values[retry].str.replace(r"[^\d.-]", "", regex=True)
+        prefix = cleaned.str.extract(r"^(-?(?:\d+\.?\d*|\.\d+))", expand=False)
+        parsed[retry] = pd.to_numeric(prefix, errors="coerce")
+    return parsed
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Vectorized date parsing to 'YYYY-MM-DD' strings (NaN when invalid).
+
+    Accepts ISO dates (optionally with a time), MM/DD/YYYY and Excel serial
+    numbers (as read from XLSX cells).
+    """
+    result = pd.Series(np.nan, index=values.index, dtype="object")
+    iso = values.str.match(r"^\d{4}-\d{2}-\d{2}")
+    if iso.any():
+        parsed = pd.to_datetime(values[iso].str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+        result[iso] = parsed.dt.strftime("%Y-%m-%d")
+    us = ~iso & values.str.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}")
+    if us.any():
+        parsed = pd.to_datetime(values[us], format="%m/%d/%Y", errors="coerce")
+        result[us] = parsed.dt.strftime("%Y-%m-%d")
+    serial = ~iso & ~us & values.str.fullmatch(r"\d+(?:\.\d+)?")
+    if serial.any():
+        days = pd.to_numeric(values[serial], errors="coerce")
+        parsed = pd.Timestamp("1899-12-30") + pd.to_timedelta(days, unit="D")
+        result[serial] = parsed.dt.strftime("%Y-%m-%d")
+    return result
+
+
+def _number_text(raw: pd.Series, value: pd.Series) -> pd.Series:
+    """Trimmed text of plain numbers; other parsed values re-rendered."""
+    text = raw.str.strip()
+    rewrite = value.notna() & ~text.str.fullmatch(_PLAIN_NUMBER_RE)
+    if rewrite.any():
+        fixed = value[rewrite]
+        text[rewrite] = [f"{v:g}" if v != int(v) else str(int(v)) for v in fixed]
+    return text.where(value.notna(), "")
+
+
+def validate_chunk(
+    chunk: pd.DataFrame,
+    config: Dict[str, Any],
+    columns: Dict[str, str],
+    first_row: int
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Validate a chunk column by column.
+
+    Args:
+        chunk: Raw values as strings ('' for empty cells)
+        config: Output of load_import_config
+        columns: Output of resolve_columns
+        first_row: Spreadsheet row number of the chunk's first row
+
+    Returns:
+        (errors, clean): one error line per failing field, and the valid
+        rows normalized under the target field names
+    """
+    n = len(chunk)
+    row_numbers = np.arange(first_row, first_row + n)
+    invalid = np.zeros(n, dtype=bool)
+    errors: List[pd.DataFrame] = []
+    clean: Dict[str, pd.Series] = {}
+
+    def fail(rule: Dict[str, Any], mask: pd.Series, message: str, raw: pd.Series) -> None:
+        mask = mask.to_numpy()
+        if mask.any():
+            invalid[:] |= mask
+            errors.append(pd.DataFrame({
+                "row": row_numbers[mask],
+                "field": rule["fieldName"],
+                "label": rule["label"],
+                "message": message,
+                "value": raw.to_numpy()[mask],
+            }))
+
+    for rule in config["fields"]:
+        name, label, data_type = rule["fieldName"], rule["label"], rule["dataType"]
+        column = columns.get(name)
+        raw = chunk[column] if column else pd.Series("", index=chunk.index)
+        empty = raw == ""
+        # Every check below only looks at rows not already failed for this field
+        pending = ~empty
+
+        if rule["required"]:
+            fail(rule, empty, f"{label} es obligatorio", raw)
+        if not column:
+            continue
+
+        value: pd.Series = raw
+        if data_type == "string":
+            value = raw.str.strip() if rule["trim"] else raw
+            if rule["required"]:
+                blank = pending & (value == "")
+                fail(rule, blank, f"{label} no puede estar vacío", raw)
+                pending &= ~blank
+        elif data_type == "number":
+            value = parse_numbers(raw)
+            nan = pending & value.isna()
+            fail(rule, nan, f"{label} debe ser un número válido", raw)
+            pending &= ~nan
+        elif data_type == "date":
+            value = parse_dates(raw.str.strip())
+            nan = pending & value.isna()
+            fail(rule, nan, f"{label} debe ser una fecha válida", raw)
+            pending &= ~nan
+
+        if rule["min"] is not None and data_type in ("number", "string"):
+            measured = value if data_type == "number" else value.str.len()
+            low = pending & (measured < rule["min"])
+            message = (f"{label} debe ser al menos {rule['min']:g}" if data_type == "number"
+                       else f"{label} debe tener al menos {rule['min']:g} caracteres")
+            fail(rule, low, message, raw)
+            pending &= ~low
+        if rule["max"] is not None and data_type in ("number", "string"):
+            measured = value if data_type == "number" else value.str.len()
+            high = pending & (measured > rule["max"])
+            message = (f"{label} no puede ser mayor que {rule['max']:g}" if data_type == "number"
+                       else f"{label} no puede tener más de {rule['max']:g} caracteres")
+            fail(rule, high, message, raw)
+            pending &= ~high
+        if rule["allowedValues"]:
+            outside = pending & ~value.isin(rule["allowedValues"])
+            fail(rule, outside, f"{label} debe ser uno de: {', '.join(rule['allowedValues'])}", raw)
+
+        if data_type == "number":
+            rendered = _number_text(raw, value)
+        elif data_type == "date":
+            rendered = value.fillna("")
+        elif data_type == "array":
+            rendered = raw.str.replace(r"\s*(?:,\s*)+", ", ", regex=True).str.strip(", ")
+        else:
+            rendered = value
+        if rule["defaultValue"] is not None and not rule["required"]:
+            default = rule["defaultValue"]
+            rendered = rendered.where(~empty, f"{default:g}" if isinstance(default, float) else default)
+        clean[name] = rendered
+
+    error_frame = (pd.concat(errors, ignore_index=True).sort_values("row", kind="stable")
+                   if errors else pd.DataFrame(columns=ERROR_COLUMNS))
+    clean_frame = pd.DataFrame(clean, index=chunk.index)[~invalid]
+    return error_frame, clean_frame
+
+
+def read_chunks(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or XLSX file as string DataFrames of about ``chunk_size`` rows.
+
+    CSV is parsed by Arrow's streaming reader (multi-threaded, one block of
+    roughly ``chunk_size`` rows at a time); every column is read as text.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            headers = next(csv.reader(f), [])
+        with open(path, "rb") as f:
+            sample = f.read(1 << 20)
+        row_bytes = len(sample) / max(1, sample.count(b"\n"))
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=max(1 << 16, int(chunk_size * row_bytes))),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={h: pa.string() for h in headers},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            yield batch.to_pandas(types_mapper={pa.string(): _STR_DTYPE}.get)
+        return
+    if suffix not in (".xlsx", ".xlsm"):
+        raise ValueError(f"Unsupported file type '{path.suffix}' (expected .csv or .xlsx)")
+    rows = iter_xlsx_rows(path)
+    headers = next(rows, [])
+    batch: List[List[str]] = []
+    for row in rows:
+        batch.append(row[:len(headers)] + [""] * (len(headers) - len(row)))
+        if len(batch) >= chunk_size:
+            yield pd.DataFrame(batch, columns=headers, dtype=_STR_DTYPE)
+            batch = []
+    if batch or not headers:
+        yield pd.DataFrame(batch, columns=headers, dtype=_STR_DTYPE)
+
+
+def preflight(
+    path: Path,
+    out_dir: Optional[Path] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    config_path: Path = IMPORT_CONFIG_TS
+) -> Dict[str, Any]:
+    """
+    Validate a file and write its error report and cleaned copy.
+
+    Args:
+        path: CSV or XLSX in the plantilla-unidades layout
+        out_dir: Where to write the outputs (default: next to the input)
+        chunk_size: Rows per chunk (bounds memory)
+        config_path: TypeScript import config to read the rules from
+
+    Returns:
+        Summary with totalRows, validCount, invalidCount, successRate,
+        errors per field, output paths, seconds and rows/s
+    """
+    path = Path(path)
+    out_dir = Path(out_dir or path.parent)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    errors_path = out_dir / f"{path.name}.errors.csv"
+    clean_path = out_dir / f"{path.name}.clean.csv"
+    config = load_import_config(config_path)
+
+    started = time.perf_counter()
+    total = valid = 0
+    errors_by_field: Dict[str, int] = {}
+    columns: Optional[Dict[str, str]] = None
+    clean_writer: Optional[pa_csv.CSVWriter] = None
+    with open(errors_path, "w", encoding="utf-8", newline="") as errors_file:
+        csv.writer(errors_file).writerow(ERROR_COLUMNS)
+        for chunk in read_chunks(path, chunk_size):
+            if columns is None:
+                columns = resolve_columns(list(chunk.columns), config)
+            error_frame, clean_frame = validate_chunk(chunk, config, columns, first_row=total + 2)
+            error_frame.to_csv(errors_file, header=False, index=False)
+            if clean_writer is None:
+                schema = pa.schema([(name, pa.string()) for name in clean_frame.columns])
+                clean_writer = pa_csv.CSVWriter(
+                    clean_path, schema, write_options=pa_csv.WriteOptions(quoting_style="needed")
+                )
+            table = pa.Table.from_pandas(clean_frame.astype(_STR_DTYPE), preserve_index=False)
+            clean_writer.write_table(table.cast(schema))
+            for field, count in error_frame["field"].value_counts().items():
+                errors_by_field[field] = errors_by_field.get(field, 0) + int(count)
+            total += len(chunk)
+            valid += len(clean_frame)
+    if clean_writer is not None:
+        clean_writer.close()
+    seconds = time.perf_counter() - started
+
+    return {
+        "file": str(path),
+        "totalRows": total,
+        "validCount": valid,
+        "invalidCount": total - valid,
+        "successRate": round(valid / total * 100, 2) if total else 0,
+        "errorsByField": dict(sorted(errors_by_field.items(), key=lambda item: -item[1])),
+        "unmappedFields": sorted(r["fieldName"] for r in config["fields"] if r["fieldName"] not in (columns or {})),
+        "errorsFile": str(errors_path),
+        "cleanFile": str(clean_path),
+        "seconds": round(seconds, 2),
+        "rowsPerSecond": round(total / seconds) if seconds else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate an unidades import file before uploading it.")
+    parser.add_argument("file", type=Path, help="CSV or XLSX in the plantilla-unidades layout")
+    parser.add_argument("--out-dir", type=Path, help="Output directory (default: next to the file)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    summary = preflight(args.file, args.out_dir, args.chunk_size)
+    print(f"✓ {summary['totalRows']} rows validated in {summary['seconds']}s "
+          f"({summary['rowsPerSecond']} rows/s)")
+    print(f"  Válidas: {summary['validCount']}, con errores: {summary['invalidCount']} "
+          f"({summary['successRate']}% válidas)")
+    for field, count in summary["errorsByField"].items():
+        print(f"    {field}: {count}")
+    print(f"  Errors: {summary['errorsFile']}")
+    print(f"  Clean:  {summary['cleanFile']}")
+    if summary["invalidCount"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Per-step timing, token and cost instrumentation for the test harness.
+
+Steps are recorded as a tree of spans: a run contains tasks (TASK 1-4), which
+contain agent steps, form fills, waits and Supabase calls. Each span records
+its wall time and metrics (LLM calls, prompt/completion tokens and their
+estimated cost, browser actions, DB rows). The current span lives in a
+ContextVar, so scenarios running concurrently in separate asyncio tasks keep
+separate traces.
+
+At the end of a run the tree is written as a JSON trace and printed as a
+flame-style summary.
+"""
+import functools
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+# Default location of JSON traces (override with TRACE_DIR)
+DEFAULT_TRACE_DIR = Path(__file__).parent / "traces"
+
+# Metrics summed up the span tree in reports
+METRIC_KEYS = (
+    "llm_calls", "prompt_tokens", "completion_tokens", "browser_actions", "db_calls",
+    "http_requests", "http_bytes",
+)
+
+# Estimated USD of a span's LLM calls, summed like METRIC_KEYS
+COST_KEY = "cost_usd"
+
+# USD per 1M (prompt, completion) tokens, for the cost estimate only;
+# models missing here are reported without a cost
+PRICES = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+class Span:
+    """One timed step of a run."""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_s = 0.0
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.metrics: Dict[str, float] = {}
+        self.attributes: Dict[str, Any] = {}
+        self.children: List["Span"] = []
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.duration_s = time.perf_counter() - self._start
+        self.status = "error" if error else "ok"
+        if error:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def totals(self) -> Dict[str, float]:
+        """Metrics of this span plus all of its descendants."""
+        totals = {key: self.metrics.get(key, 0) for key in METRIC_KEYS + (COST_KEY,)}
+        for child in self.children:
+            for key, value in child.totals().items():
+                totals[key] += value
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration_s, 4),
+            "status": self.status,
+            "error": self.error,
+            "metrics": self.metrics,
+            "totals": self.totals(),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Span]:
+    """
+    Open the root span of a run in the current context.
+
+    Example:
+        with start_trace("UnidadCRUDTest") as root:
+            ...
+        write_trace(root)
+    """
+    root = Span(name, "run")
+    token = _current_span.set(root)
+    error: Optional[BaseException] = None
+    try:
+        yield root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        root.finish(error)
+        _current_span.reset(token)
+
+
+@asynccontextmanager
+async def trace_step(name: str, kind: str = "step") -> AsyncIterator[Optional[Span]]:
+    """
+    Record a child span of the current span. A no-op outside a trace.
+
+    Args:
+        name: Step label shown in the summary
+        kind: Category ('task', 'agent', 'fill', 'wait', 'db', ...)
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(name, kind)
+    parent.children.append(span)
+    token = _current_span.set(span)
+    error: Optional[BaseException] = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        span.finish(error)
+        _current_span.reset(token)
+
+
+def traced(name: Optional[str] = None, kind: str = "step") -> Callable:
+    """Decorator recording every call of an async function as a span."""
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            async with trace_step(label, kind):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(**metrics: float) -> None:
+    """Add metrics to the current span (summed if already present)."""
+    span = _current_span.get()
+    if span is None:
+        return
+    for key, value in metrics.items():
+        span.metrics[key] = span.metrics.get(key, 0) + (value or 0)
+
+
+def annotate(**attributes: Any) -> None:
+    """Attach attributes (e.g. the full prompt) to the current span."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def token_cost(model: Optional[str], prompt_tokens: float, completion_tokens: float) -> Optional[float]:
+    """Estimated USD of the tokens, or None when the model has no price."""
+    price = PRICES.get(model or "")
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+class TokenUsage(BaseCallbackHandler):
+    """
+    LangChain callback summing the tokens a chat model's responses report.
+
+    browser-use 0.2 only keeps an estimate of each step's prompt tokens, so
+    the real prompt and completion tokens are taken from the responses.
+    Attach it with ``count_tokens(llm)`` and pass ``since(before)`` to
+    ``history_metrics``.
+    """
+
+    # Called in the caller's context rather than on a worker thread
+    run_inline = True
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__()
+        self.model = model
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.calls += 1
+        counted = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0) or 0
+                    self.completion_tokens += usage.get("output_tokens", 0) or 0
+                    counted = True
+        if not counted:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            self.completion_tokens += usage.get("completion_tokens", 0) or 0
+
+    def totals(self) -> Dict[str, float]:
+        totals = {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+        cost = token_cost(self.model, self.prompt_tokens, self.completion_tokens)
+        if cost is not None:
+            totals[COST_KEY] = cost
+        return totals
+
+    def since(self, before: Dict[str, float]) -> Dict[str, float]:
+        """Usage since an earlier ``totals()``."""
+        return {key: value - before.get(key, 0) for key, value in self.totals().items()}
+
+
+def count_tokens(llm: Any) -> Optional[TokenUsage]:
+    """
+    The TokenUsage counter of a chat model, attached on first use.
+
+    Returns:
+        The counter, or None if the model takes no LangChain callbacks
+    """
+    callbacks = getattr(llm, "callbacks", None)
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    for handler in handlers:
+        if isinstance(handler, TokenUsage):
+            return handler
+    usage = TokenUsage(getattr(llm, "model_name", None) or getattr(llm, "model", None))
+    try:
+        if hasattr(callbacks, "add_handler"):
+            callbacks.add_handler(usage, inherit=False)
+        else:
+            llm.callbacks = [*handlers, usage]
+    except Exception:
+        return None
+    return usage
+
+
+def history_metrics(history: Any, usage: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Extract LLM/token/action counts from a browser-use AgentHistoryList.
+
+    Handles both the ``usage`` summary of newer releases and the
+    ``total_input_tokens()`` estimate of older ones, which has no completion
+    tokens. ``usage`` (from ``TokenUsage.since``) replaces those counts with
+    the ones the model reported when it saw any call, and still counts when
+    the run raised and left no history.
+    """
+    metrics: Dict[str, float] = {}
+    if history is not None:
+        metrics["llm_calls"] = len(getattr(history, "history", None) or [])
+        if hasattr(history, "model_actions"):
+            metrics["browser_actions"] = len([
+                action for action in history.model_actions()
+                if "done" not in action
+            ])
+        summary = getattr(history, "usage", None)
+        if summary is not None:
+            metrics["prompt_tokens"] = getattr(summary, "total_prompt_tokens", 0) or 0
+            metrics["completion_tokens"] = getattr(summary, "total_completion_tokens", 0) or 0
+        elif hasattr(history, "total_input_tokens"):
+            metrics["prompt_tokens"] = history.total_input_tokens() or 0
+    if usage and usage.get("llm_calls"):
+        metrics.update(usage)
+    return metrics
+
+
+def write_trace(root: Span, name: Optional[str] = None) -> Path:
+    """
+    Write the span tree as JSON.
+
+    Args:
+        root: Root span returned by start_trace
+        name: File name stem (default: root span name)
+
+    Returns:
+        Path of the written trace file
+    """
+    trace_dir = Path(os.getenv("TRACE_DIR", DEFAULT_TRACE_DIR))
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    stem = "".join(c if c.isalnum() or c in "-_" else "_" for c in (name or root.name))
+    path = trace_dir / f"{stem}.json"
+    path.write_text(json.dumps(root.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def _format_tokens(value: float) -> str:
+    return f"{value / 1000:.1f}k" if value >= 1000 else str(int(value))
+
+
+def format_flame(root: Span, width: int = 30, max_name: int = 48) -> str:
+    """
+    Render the span tree as an indented, flame-style text summary.
+
+    Each line shows the step, its wall time, a bar proportional to its share
+    of the run, and the rolled-up LLM calls, tokens, browser actions, harness
+    DB calls, app requests to Supabase and the estimated LLM cost.
+    """
+    total = root.duration_s or 1e-9
+    lines = []
+
+    def walk(span: Span, depth: int) -> None:
+        totals = span.totals()
+        label = ("  " * depth + span.name.replace("\n", " "))[:max_name].ljust(max_name)
+        bar = "█" * max(1, round(width * span.duration_s / total)) if span.duration_s else ""
+        mark = "❌" if span.status == "error" else " "
+        lines.append(
+            f"{mark}{label} {span.duration_s:7.2f}s {bar.ljust(width)} "
+            f"llm {int(totals['llm_calls']):>3}  "
+            f"tok {_format_tokens(totals['prompt_tokens'])}/{_format_tokens(totals['completion_tokens'])}  "
+            f"act {int(totals['browser_actions']):>3}  db {int(totals['db_calls'])}  "
+            f"http {int(totals['http_requests'])}"
+            + (f"  ${totals[COST_KEY]:.4f}" if totals[COST_KEY] else "")
+        )
+        for child in span.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
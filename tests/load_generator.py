@@ -0,0 +1,442 @@
+"""
+Virtual-user load generator replaying the dashboard's Supabase query mix.
+
+Each virtual user (VU) loops: pick a query shape by weight, send it, sleep
+a think time. Shapes are the requests the Angular services issue:
+
+- ``unidades_list``: UnidadService.getUnidades (``select=*`` on the table)
+- ``unidades_by_id``: UnidadService.getUnidadById (single object)
+- ``unidades_filtered``: unidades by tipo/estado/price range, paged
+- ``comparativa_by_token`` / ``comparativa_by_id``: ComparativaService
+  lookups with the nested contactos/items/unidades/ciudades/... select
+- ``evento_insert``: EventMonitorService.persist (insert into ``eventos``)
+
+The number of active VUs follows a ramp profile of ``duration:vus`` stages,
+interpolated linearly like k6 stages (``30s:10,2m:50,30s:0``). All VUs share
+one pooled HTTP client, so connections are reused as in the browser. IDs and
+share tokens are sampled from the database once before the run.
+
+The report has, per shape, request count, errors, throughput and
+p50/p95/p99 latency; it is printed and saved to
+``tests/traces/load_<timestamp>.json``.
+
+Usage:
+    python tests/load_generator.py --stages 30s:10,1m:50,30s:0
+    python tests/load_generator.py --standin --stages 10s:20,20s:20 --mix unidades_by_id=5,evento_insert=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from instrumentation import DEFAULT_TRACE_DIR
+from postgrest_standin import ANON_KEY, PostgrestStandIn
+
+
+load_dotenv()
+
+DEFAULT_STAGES = "30s:10,1m:50,30s:0"
+
+# Relative frequency of each shape while agents work in the dashboard
+DEFAULT_MIX = {
+    "unidades_list": 5,
+    "unidades_by_id": 30,
+    "unidades_filtered": 25,
+    "comparativa_by_token": 10,
+    "comparativa_by_id": 5,
+    "evento_insert": 25,
+}
+
+# Nested select of ComparativaService.getComparativaById/ByToken
+COMPARATIVA_SELECT = re.sub(r"\s+", "", """
+    *,
+    contactos:contacto_id(id,nombre,apellido,telefono,mail),
+    comparativa_items(
+        id,unidad_id,
+        unidades:unidad_id(
+            id,nombre,tipo_unidad,estado_comercial,proyecto_id,ciudad_id,barrio_id,dormitorios,banos,
+            orientacion,distribucion,m2_totales,m2_internos,superficie_edificada,superficie_terreno,piso,
+            plantas,hectareas,altura,precio,responsable,comision,entrega,terraza,garage,tamano_terraza,
+            tamano_garage,precio_garage,amenities,
+            ciudades:ciudad_id(id,nombre),
+            barrios:barrio_id(id,nombre),
+            proyectos:proyecto_id(id,nombre)
+        )
+    )
+""")
+
+_OBJECT = {"Accept": "application/vnd.pgrst.object+json"}
+
+# Rows sampled per table to build requests from
+SAMPLE_SIZE = 500
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+
+
+def parse_duration(text: str) -> float:
+    """'500ms', '30s', '2m', '1h' or plain seconds -> seconds."""
+    match = _DURATION_RE.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid duration '{text}'")
+    value, unit = float(match.group(1)), match.group(2) or "s"
+    return value * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def parse_stages(text: str) -> List[Tuple[float, int]]:
+    """'30s:10,1m:50' -> [(30.0, 10), (60.0, 50)]."""
+    stages = []
+    for part in text.split(","):
+        duration, _, vus = part.partition(":")
+        stages.append((parse_duration(duration), int(vus)))
+    return stages
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    """'unidades_by_id=5,evento_insert=1' -> weights (unknown shapes rejected)."""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SHAPES:
+            raise ValueError(f"Unknown shape '{name}' (known: {', '.join(SHAPES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def target_vus(stages: Sequence[Tuple[float, int]], elapsed: float) -> int:
+    """VUs the ramp profile asks for ``elapsed`` seconds into the run."""
+    previous = 0
+    for duration, vus in stages:
+        if elapsed < duration:
+            return round(previous + (vus - previous) * elapsed / duration) if duration else vus
+        elapsed -= duration
+        previous = vus
+    return 0
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Sample:
+    """IDs and tokens requests are built from."""
+
+    def __init__(self, unidades: List[Dict[str, Any]], comparativas: List[Dict[str, Any]]):
+        self.unidad_ids = [u["id"] for u in unidades]
+        self.tipos = sorted({u["tipo_unidad"] for u in unidades if u.get("tipo_unidad")}) or ["Apartamento"]
+        self.estados = sorted({u["estado_comercial"] for u in unidades if u.get("estado_comercial")}) or ["En venta"]
+        self.comparativa_ids = [c["id"] for c in comparativas]
+        self.share_tokens = [c["share_token"] for c in comparativas if c.get("share_token")]
+
+
+async def load_sample(client: httpx.AsyncClient) -> Sample:
+    """Sample unidad and comparativa IDs/tokens (two queries)."""
+    unidades, comparativas = await asyncio.gather(
+        client.get("/rest/v1/unidades", params={
+            "select": "id,tipo_unidad,estado_comercial", "deleted_at": "is.null", "limit": SAMPLE_SIZE,
+        }),
+        client.get("/rest/v1/comparativas", params={"select": "id,share_token", "limit": SAMPLE_SIZE}),
+    )
+    unidades.raise_for_status()
+    comparativas.raise_for_status()
+    return Sample(unidades.json(), comparativas.json())
+
+
+# A shape builds one request: (method, path, params, headers, json body)
+Request = Tuple[str, str, Dict[str, Any], Dict[str, str], Optional[Dict[str, Any]]]
+
+
+def _unidades_list(rng: random.Random, sample: Sample) -> Request:
+    return "GET", "/rest/v1/unidades", {"select": "*"}, {}, None
+
+
+def _unidades_by_id(rng: random.Random, sample: Sample) -> Request:
+    return "GET", "/rest/v1/unidades", {"select": "*", "id": f"eq.{rng.choice(sample.unidad_ids)}"}, _OBJECT, None
+
+
+def _unidades_filtered(rng: random.Random, sample: Sample) -> Request:
+    low = rng.choice((50000, 100000, 150000, 250000))
+    params = [
+        ("select", "*"),
+        ("deleted_at", "is.null"),
+        ("tipo_unidad", f"eq.{rng.choice(sample.tipos)}"),
+        ("estado_comercial", f"eq.{rng.choice(sample.estados)}"),
+        ("precio", f"gte.{low}"),
+        ("precio", f"lte.{low * 3}"),
+        ("order", "precio.asc"),
+        ("limit", "50"),
+    ]
+    return "GET", "/rest/v1/unidades", params, {}, None
+
+
+def _comparativa_by_token(rng: random.Random, sample: Sample) -> Request:
+    params = {"select": COMPARATIVA_SELECT, "share_token": f"eq.{rng.choice(sample.share_tokens)}"}
+    return "GET", "/rest/v1/comparativas", params, _OBJECT, None
+
+
+def _comparativa_by_id(rng: random.Random, sample: Sample) -> Request:
+    params = {"select": COMPARATIVA_SELECT, "id": f"eq.{rng.choice(sample.comparativa_ids)}"}
+    return "GET", "/rest/v1/comparativas", params, _OBJECT, None
+
+
+def _evento_insert(rng: random.Random, sample: Sample) -> Request:
+    entidad = rng.choice(sample.unidad_ids) if sample.unidad_ids else None
+    body = {
+        "id": str(uuid.uuid4()),
+        "tipo": rng.choice(("Nuevo", "Editado", "Visto")),
+        "categoria": "Unidades",
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "data_json": {"current": {"id": entidad}},
+        "entidad_id": entidad,
+        "usuario_id": None,
+    }
+    return "POST", "/rest/v1/eventos", {}, {"Prefer": "return=minimal"}, body
+
+
+SHAPES: Dict[str, Callable[[random.Random, Sample], Request]] = {
+    "unidades_list": _unidades_list,
+    "unidades_by_id": _unidades_by_id,
+    "unidades_filtered": _unidades_filtered,
+    "comparativa_by_token": _comparativa_by_token,
+    "comparativa_by_id": _comparativa_by_id,
+    "evento_insert": _evento_insert,
+}
+
+# Data each shape needs from the sample
+_REQUIRES = {
+    "unidades_by_id": "unidad_ids",
+    "comparativa_by_token": "share_tokens",
+    "comparativa_by_id": "comparativa_ids",
+}
+
+
+class LoadRun:
+    """One load test: ramp controller, virtual users and their measurements."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        sample: Sample,
+        stages: Sequence[Tuple[float, int]],
+        mix: Dict[str, float],
+        think_s: Tuple[float, float] = (0.5, 2.0),
+        seed: int = 42
+    ):
+        """
+        Args:
+            client: Pooled client with base_url and Supabase headers set
+            sample: IDs/tokens to build requests from
+            stages: Ramp profile as (seconds, target VUs)
+            mix: Shape -> weight; shapes the sample can't serve are dropped
+            think_s: (min, max) think time between a VU's requests
+            seed: Seed of the per-VU random generators
+        """
+        self.client = client
+        self.sample = sample
+        self.stages = list(stages)
+        self.mix = {name: weight for name, weight in mix.items()
+                    if weight > 0 and getattr(sample, _REQUIRES.get(name, ""), True)}
+        if not self.mix:
+            raise ValueError("No query shape can run: the sampled tables are empty")
+        self.think_s = think_s
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.mix}
+        self.errors: Dict[str, int] = {name: 0 for name in self.mix}
+        self.bytes: Dict[str, int] = {name: 0 for name in self.mix}
+        self.error_samples: Dict[str, str] = {}
+        self.peak_vus = 0
+        self._started = 0.0
+        self._target = 0
+
+    async def _vu(self, index: int) -> None:
+        rng = random.Random(self.seed * 100003 + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        # Spread the first requests of VUs started together
+        await asyncio.sleep(rng.uniform(0, self.think_s[1]))
+        while index < self._target:
+            name = rng.choices(names, weights)[0]
+            method, path, params, headers, body = SHAPES[name](rng, self.sample)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, params=params, headers=headers, json=body)
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    self.errors[name] += 1
+                    self.error_samples.setdefault(name, f"{response.status_code} {response.text[:200]}")
+                else:
+                    self.latencies[name].append(elapsed)
+                    self.bytes[name] += len(response.content)
+            except httpx.HTTPError as e:
+                self.errors[name] += 1
+                self.error_samples.setdefault(name, f"{type(e).__name__}: {e}")
+            await asyncio.sleep(rng.uniform(*self.think_s))
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the ramp profile to completion and return the report."""
+        total = sum(duration for duration, _ in self.stages)
+        vus: List[asyncio.Task] = []
+        self._started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - self._started
+            if elapsed >= total:
+                break
+            self._target = target_vus(self.stages, elapsed)
+            self.peak_vus = max(self.peak_vus, self._target)
+            vus = [task for task in vus if not task.done()]
+            running = {task.get_name() for task in vus}
+            for index in range(self._target):
+                if f"vu{index}" not in running:
+                    vus.append(asyncio.create_task(self._vu(index), name=f"vu{index}"))
+            await asyncio.sleep(0.1)
+        self._target = 0
+        if vus:
+            # VUs stop after their current request and think time
+            await asyncio.wait(vus, timeout=self.think_s[1] + 30)
+            for task in vus:
+                task.cancel()
+        return self.report(time.perf_counter() - self._started)
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        shapes = {}
+        for name in self.mix:
+            values = sorted(self.latencies[name])
+            ms = lambda v: round(v * 1000, 1) if v is not None else None
+            shapes[name] = {
+                "requests": len(values) + self.errors[name],
+                "errors": self.errors[name],
+                "rps": round(len(values) / seconds, 2) if seconds else None,
+                "p50_ms": ms(percentile(values, 50)),
+                "p95_ms": ms(percentile(values, 95)),
+                "p99_ms": ms(percentile(values, 99)),
+                "mean_ms": ms(statistics.fmean(values)) if values else None,
+                "avg_bytes": round(self.bytes[name] / len(values)) if values else None,
+            }
+            if name in self.error_samples:
+                shapes[name]["first_error"] = self.error_samples[name]
+        requests = sum(s["requests"] for s in shapes.values())
+        return {
+            "stages": self.stages,
+            "mix": self.mix,
+            "think_s": list(self.think_s),
+            "peak_vus": self.peak_vus,
+            "seconds": round(seconds, 2),
+            "requests": requests,
+            "errors": sum(s["errors"] for s in shapes.values()),
+            "rps": round(requests / seconds, 2) if seconds else None,
+            "shapes": shapes,
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'shape':<22}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KB':>8}")
+    for name, s in report["shapes"].items():
+        fmt = lambda v: "-" if v is None else f"{v:g}"
+        kb = "-" if s["avg_bytes"] is None else f"{s['avg_bytes'] / 1024:.1f}"
+        print(f"{name:<22}{s['requests']:>8}{s['errors']:>6}{fmt(s['rps']):>9}"
+              f"{fmt(s['p50_ms']):>9}{fmt(s['p95_ms']):>9}{fmt(s['p99_ms']):>9}{kb:>8}")
+    print(f"\n{report['requests']} requests in {report['seconds']}s ({report['rps']} req/s), "
+          f"{report['errors']} errors, peak {report['peak_vus']} VUs")
+
+
+async def seed_standin(standin: PostgrestStandIn, unidades: int, comparativas: int, seed: int) -> None:
+    """Fill the stand-in with generated unidades (via bulk_load) and comparativas."""
+    from bulk_load import bulk_load
+    from db_verify import get_async_client
+    from synthetic_unidades import DEFAULT_OUT_DIR, generate
+
+    summary = generate(unidades, DEFAULT_OUT_DIR, formats=("csv",), invalid_fraction=0, seed=seed,
+                       stem=f"load_seed_{unidades}")
+    path = Path(summary["files"]["csv"]["path"])
+    await bulk_load(path, await get_async_client(standin.url, ANON_KEY), fresh=True,
+                    checkpoint_path=path.with_suffix(".checkpoint.json"))
+
+    rng = random.Random(seed)
+    ids = [row["id"] for row in standin.select("unidades")]
+    contactos = [{"id": str(uuid.uuid4()), "nombre": f"Contacto {i}", "apellido": "Load", "mail": f"c{i}@example.com"}
+                 for i in range(max(1, comparativas // 2))]
+    standin.insert("contactos", contactos)
+    rows, items = [], []
+    for i in range(comparativas):
+        comparativa_id = str(uuid.uuid4())
+        rows.append({
+            "id": comparativa_id,
+            "contacto_id": rng.choice(contactos)["id"],
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "share_token": uuid.UUID(int=rng.getrandbits(128)).hex,
+        })
+        items.extend({"id": str(uuid.uuid4()), "comparativa_id": comparativa_id, "unidad_id": unidad_id}
+                     for unidad_id in rng.sample(ids, min(len(ids), rng.randint(2, 6))))
+    standin.insert("comparativas", rows)
+    standin.insert("comparativa_items", items)
+
+
+async def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Replay the dashboard's Supabase query mix with virtual users.")
+    parser.add_argument("--stages", default=DEFAULT_STAGES, help="Ramp profile 'duration:vus,...' (e.g. 30s:10,1m:50)")
+    parser.add_argument("--mix", help="Shape weights 'name=weight,...' (default: dashboard mix)")
+    parser.add_argument("--think", default="0.5s-2s", help="Think time range between requests (e.g. 0.5s-2s)")
+    parser.add_argument("--max-connections", type=int, default=100, help="HTTP connection pool size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--standin", action="store_true",
+                        help="Run against an in-process PostgREST stand-in filled with generated data")
+    parser.add_argument("--standin-unidades", type=int, default=5000)
+    parser.add_argument("--standin-comparativas", type=int, default=200)
+    args = parser.parse_args()
+
+    low, _, high = args.think.partition("-")
+    think_s = (parse_duration(low), parse_duration(high or low))
+    stages, mix = parse_stages(args.stages), parse_mix(args.mix)
+
+    standin = None
+    if args.standin:
+        standin = PostgrestStandIn().start()
+        print(f"Seeding stand-in with {args.standin_unidades} unidades and {args.standin_comparativas} comparativas...")
+        await seed_standin(standin, args.standin_unidades, args.standin_comparativas, args.seed)
+        url, key = standin.url, ANON_KEY
+    else:
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            print("❌ SUPABASE_URL and SUPABASE_KEY must be set (or use --standin)")
+            sys.exit(2)
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+    try:
+        async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30) as client:
+            sample = await load_sample(client)
+            run = LoadRun(client, sample, stages, mix, think_s, args.seed)
+            print(f"Running {args.stages} with {', '.join(run.mix)}...")
+            report = await run.run()
+    finally:
+        if standin is not None:
+            standin.stop()
+
+    report["target"] = "standin" if standin else url
+    print_report(report)
+    report_dir = Path(os.getenv("TRACE_DIR", DEFAULT_TRACE_DIR))
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_dir / f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📈 Report saved: {report_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,13 +4,20 @@ Reusable async function for logging into the Angular dashboard using browser-use
 import asyncio
 from browser_use import Agent
 
+from session_cache import restore_session, save_session
+from trajectory_cache import run_cached
+from angular_wait import wait_for_angular
+from instrumentation import traced
 
+
+@traced(kind="login")
 async def login_to_dashboard(
     agent: Agent,
     base_url: str = "http://localhost:4200",
     email: str = "testuser@test.com",
     password: str = "testuser",
-    login_path: str = "/login"
+    login_path: str = "/login",
+    use_session_cache: bool = True
 ) -> None:
     """
     Logs into the Angular dashboard using browser-use Agent.
@@ -21,59 +28,72 @@ async def login_to_dashboard(
     3. Clicks the login button
     4. Waits for Angular navigation to complete and dashboard to render
     
+    When ``use_session_cache`` is set, a cached Supabase session for
+    base_url + email is restored first and the login steps are skipped
+    unless it is missing or expired. A fresh login refreshes the cache.
+    
     Args:
         agent: The browser-use Agent instance
         base_url: Base URL of the application (default: http://localhost:4200)
         email: Email for login (default: testuser@test.com)
         password: Password for login (default: testuser)
         login_path: Path to login page (default: /login)
+        use_session_cache: Reuse/save the auth session snapshot (default: True)
     
     Raises:
         Exception: If login fails or dashboard doesn't load
     """
+    if use_session_cache and await restore_session(agent, base_url, email):
+        print("✓ Restored cached session, skipped login")
+        return
+    
     login_url = f"{base_url}{login_path}"
     
     # Step 1: Navigate to login page
-    await agent.run(f"Navigate to {login_url}")
+    await run_cached(agent, "Navigate to {login_url}", params={"login_url": login_url})
     
     # Step 2: Wait for login form to be visible and fill email
-    await agent.run(
-        f"Find the email input field (look for input[type='email'] or input[formControlName='email'] "
-        f"or input with placeholder containing 'Email') and type '{email}' into it"
+    await run_cached(
+        agent,
+        "Find the email input field (look for input[type='email'] or input[formControlName='email'] "
+        "or input with placeholder containing 'Email') and type '{email}' into it",
+        params={"email": email}
     )
     
     # Step 3: Fill password field
-    await agent.run(
-        f"Find the password input field (look for input[type='password'] or input[formControlName='password'] "
-        f"or input with placeholder containing 'Password') and type '{password}' into it"
+    await run_cached(
+        agent,
+        "Find the password input field (look for input[type='password'] or input[formControlName='password'] "
+        "or input with placeholder containing 'Password') and type '{password}' into it",
+        params={"password": password}
     )
     
     # Step 4: Click the login button
-    await agent.run(
+    await run_cached(
+        agent,
         "Find and click the login button. Look for button[type='submit'] or a button with text 'Entrar', "
         "'Login', or 'Sign In'"
     )
     
-    # Step 5: Critical Angular handling - Wait for navigation and dashboard to render
+    # Step 5: Critical Angular handling - Wait for navigation and dashboard to render.
+    # Evaluated in the page: URL, Angular stability, no pending Supabase
+    # requests and the sidebar or dashboard cards visible (also verifies login).
     dashboard_url = f"{base_url}/dashboard"
     
-    await agent.run(
-        f"Wait until the dashboard page has fully loaded. This means:\n"
-        f"- The URL has changed to '{dashboard_url}' or contains '/dashboard', AND\n"
-        f"- At least one of these dashboard elements is visible:\n"
-        f"  * An element with class 'app-sidebar' (the sidebar navigation)\n"
-        f"  * An element containing the text 'GestorApp' (sidebar title)\n"
-        f"  * An element with class 'cards-container-4' (dashboard cards)\n"
-        f"  * An element with class 'app-content' (main content area)\n"
-        f"Do not proceed until the dashboard is fully rendered. Angular apps need time to complete "
-        f"navigation and render components."
+    await wait_for_angular(
+        agent,
+        fallback_prompt=(
+            f"Wait until the URL contains '/dashboard' ({dashboard_url}) and the sidebar "
+            f"navigation (class 'app-sidebar') or dashboard cards (class 'cards-container-4') "
+            f"are visible."
+        ),
+        url_contains="/dashboard",
+        any_of=[".app-sidebar", ".cards-container-4"],
+        timeout_ms=15000
     )
     
-    # Step 6: Final verification
-    await agent.run(
-        "Verify the dashboard loaded successfully by confirming you can see dashboard content "
-        "like cards showing statistics or a sidebar navigation menu"
-    )
+    if use_session_cache:
+        await save_session(agent, base_url, email)
 
 
 # Example usage:
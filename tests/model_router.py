@@ -0,0 +1,472 @@
+"""
+Model tiering for agent steps: each step goes to the cheapest model that can do it.
+
+Every prompt sent through trajectory_cache.run_cached is classified by rules
+on its text:
+
+    trivial     one click, type or navigation on an element named in the prompt
+                ("Find and click the 'Nuevo' button")
+    navigation  locating something on the page first, waits and multi-field
+                form fallbacks ("Find the unidad with name ... and click edit")
+    reasoning   steps that need judgement ("select the first available
+                proyecto. If no proyectos exist, ...")
+
+Each class starts on its own rung of a ladder and climbs it on failure:
+
+    deterministic -> trivial model -> navigation model -> reasoning model
+
+The deterministic rung needs no model at all: trivial prompts that name
+their target (a quoted label, a CSS selector, a URL) are turned into a
+direct action and applied in the page. Clicks by label only fire when
+exactly one visible element has that text, so an ambiguous page falls
+through to a model instead of clicking the wrong thing. A model attempt
+fails when ``agent.run`` raises or the history reports the task as not done
+or unsuccessful; the step then moves to the next model up.
+
+Tokens of every model call count towards a per-run budget
+(AGENT_TOKEN_BUDGET); once it is spent further model calls raise
+TokenBudgetExceeded. The router keeps calls, tokens, latency and estimated
+cost per tier for the end-of-run report.
+
+Scenarios install a router for their agent steps with:
+
+    router = ModelRouter(lambda model: ChatOpenAI(model=model, temperature=0))
+    use_model_router(router)
+    ...
+    print(router.format_report())
+
+Models per tier: AGENT_MODEL_TRIVIAL, AGENT_MODEL_NAVIGATION (default
+OPENAI_MODEL) and AGENT_MODEL_REASONING. Set MODEL_ROUTER=0 to send every
+step to OPENAI_MODEL as before.
+"""
+import os
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from browser_use import Agent
+
+from instrumentation import annotate, count_tokens, history_metrics, record, token_cost
+
+
+# Ladder rungs, cheapest first; the step classes are the last three
+DETERMINISTIC = "deterministic"
+TIERS = (DETERMINISTIC, "trivial", "navigation", "reasoning")
+STEP_CLASSES = TIERS[1:]
+
+# Model per tier when the AGENT_MODEL_<TIER> variables are not set
+DEFAULT_MODELS = {
+    "trivial": "gpt-4.1-nano",
+    "navigation": "gpt-4o-mini",
+    "reasoning": "gpt-4o",
+}
+
+# Phrases that mean the agent has to decide something
+_REASONING = re.compile(r"\b(if|otherwise|unless|choose|decide|first available)\b", re.IGNORECASE)
+# Steps that search the page before acting, or only observe it
+_LOOKUP = re.compile(r"\b(with name|table/list|in the table|in the list|row)\b|^\s*wait\b", re.IGNORECASE)
+# form_fill fallback prompts list one field per line
+_FIELD_LIST = re.compile(r"^- '", re.MULTILINE)
+_ACTION = re.compile(r"\b(click|type|navigate to)\b", re.IGNORECASE)
+_CSS = re.compile(r"\b(?:input|button|textarea|a)\[[^\]]+\]")
+_QUOTED = re.compile(r"'([^'{}]+)'")
+_TYPE_VALUE = re.compile(r"\btype '([^']*)' into\b", re.IGNORECASE)
+_NAVIGATE = re.compile(r"^\s*navigate to (\S+)\s*$", re.IGNORECASE)
+_PARAM = re.compile(r"^\{(\w+)\}$")
+
+# Clicks the only visible clickable element whose text is one of ``labels``
+# (tried in order), inside the topmost open dialog if there is one. Returns
+# the label clicked, or null when every label is missing or ambiguous.
+CLICK_LABEL_JS = """
+async ({ labels, timeoutMs }) => {
+    const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const clickable = 'a, button, [role="button"], [role="tab"], .nav-link';
+    const find = () => {
+        const dialogs = Array.from(document.querySelectorAll('ngb-modal-window, [role="dialog"], .modal.show'))
+            .filter((el) => el.getClientRects().length > 0);
+        const scope = dialogs.length ? dialogs[dialogs.length - 1] : document;
+        const visible = Array.from(scope.querySelectorAll(clickable))
+            .filter((el) => el.getClientRects().length > 0 && !el.disabled);
+        for (const label of labels) {
+            const matches = visible.filter((el) => norm(el.textContent) === norm(label));
+            if (matches.length === 1) return [label, matches[0]];
+        }
+        return null;
+    };
+    const deadline = Date.now() + timeoutMs;
+    let found = find();
+    while (!found && Date.now() < deadline) {
+        await new Promise((r) => setTimeout(r, 50));
+        found = find();
+    }
+    if (!found) return null;
+    found[1].click();
+    return found[0];
+}
+"""
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """The run used up its token budget."""
+
+
+def classify(prompt: str) -> str:
+    """
+    Step class of an agent prompt: 'trivial', 'navigation' or 'reasoning'.
+
+    Args:
+        prompt: The prompt template (placeholders unformatted)
+    """
+    text = " ".join(prompt.split())
+    if _FIELD_LIST.search(prompt) or _LOOKUP.search(text):
+        return "navigation"
+    if _REASONING.search(text):
+        return "reasoning"
+    words = _CSS.sub("", text)
+    names_target = _NAVIGATE.match(text) or _CSS.search(text) or _QUOTED.search(words)
+    if names_target and len(_ACTION.findall(words)) == 1:
+        return "trivial"
+    return "navigation"
+
+
+def _value(raw: str) -> Any:
+    """Prompt value as an action value ('{name}' becomes a param reference)."""
+    match = _PARAM.match(raw)
+    return {"param": match.group(1)} if match else raw
+
+
+def plan_actions(prompt: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Direct page actions for a trivial prompt, or None when it needs a model.
+
+    Actions use the replay format of trajectory_cache.replay_actions, plus
+    ``{"op": "click", "labels": [...]}`` for clicks by visible text.
+
+    Args:
+        prompt: The prompt template (placeholders unformatted)
+    """
+    text = " ".join(prompt.split())
+    navigate = _NAVIGATE.match(text)
+    if navigate:
+        return [{"op": "goto", "value": _value(navigate.group(1))}]
+
+    selectors = _CSS.findall(text)
+    # Quoted labels, without the quotes inside CSS selectors
+    labels = _QUOTED.findall(_CSS.sub("", text))
+    typed = _TYPE_VALUE.search(text)
+    if typed:
+        fields = [s for s in selectors if not s.startswith(("button", "a["))]
+        if not fields:
+            return None
+        return [{"op": "fill", "selector": ", ".join(fields), "value": _value(typed.group(1))}]
+    if re.search(r"\bclick\b", text, re.IGNORECASE):
+        buttons = [s for s in selectors if s.startswith(("button", "a["))]
+        if buttons:
+            return [{"op": "click", "selector": ", ".join(buttons)}]
+        if labels:
+            return [{"op": "click", "labels": labels}]
+    return None
+
+
+async def apply_plan(page: Any, plan: List[Dict[str, Any]], params: Dict[str, Any], timeout_ms: int = 2000) -> bool:
+    """
+    Apply a plan from plan_actions in the page.
+
+    Returns:
+        True if every action was applied, False on the first failure
+    """
+    # trajectory_cache routes its agent steps through this module
+    from trajectory_cache import replay_actions
+
+    for action in plan:
+        if "labels" in action:
+            try:
+                clicked = await page.evaluate(CLICK_LABEL_JS, {"labels": action["labels"], "timeoutMs": timeout_ms})
+            except Exception:
+                return False
+            if not clicked:
+                return False
+        elif not await replay_actions(page, [action], params, timeout_ms=timeout_ms):
+            return False
+    return True
+
+
+def step_succeeded(history: Any) -> bool:
+    """False when a browser-use history reports the task as not done or unsuccessful."""
+    if history is None:
+        return False
+    is_done = getattr(history, "is_done", None)
+    if callable(is_done) and not is_done():
+        return False
+    is_successful = getattr(history, "is_successful", None)
+    return not (callable(is_successful) and is_successful() is False)
+
+
+@dataclass
+class TierStats:
+    """Calls made on one rung of the ladder."""
+
+    model: str
+    attempts: int = 0
+    # Attempts that completed the step (the rest escalated or raised)
+    served: int = 0
+    prompt_tokens: float = 0
+    completion_tokens: float = 0
+    seconds: float = 0.0
+
+    @property
+    def cost(self) -> Optional[float]:
+        """Estimated USD, or None when the model has no price."""
+        if self.model == DETERMINISTIC:
+            return 0.0
+        return token_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+
+class ModelRouter:
+    """Sends each agent step to the cheapest tier that completes it."""
+
+    def __init__(
+        self,
+        llm_factory: Callable[[str], Any],
+        models: Optional[Dict[str, str]] = None,
+        token_budget: int = 0,
+        deterministic: bool = True
+    ):
+        """
+        Args:
+            llm_factory: Builds the chat model for a model name
+            models: Model name per step class (default: DEFAULT_MODELS)
+            token_budget: Prompt + completion tokens the run may use (0: unlimited)
+            deterministic: Try direct page actions for trivial steps first
+        """
+        self.llm_factory = llm_factory
+        self.models = {**DEFAULT_MODELS, **(models or {})}
+        self.token_budget = token_budget
+        self.deterministic = deterministic
+        self.tokens_used = 0.0
+        self.escalations = 0
+        self.steps: Dict[str, int] = {name: 0 for name in STEP_CLASSES}
+        self.tiers: Dict[str, TierStats] = {
+            tier: TierStats(DETERMINISTIC if tier == DETERMINISTIC else self.models[tier]) for tier in TIERS
+        }
+        self._llms: Dict[str, Any] = {}
+
+    def llm(self, tier: str) -> Any:
+        """Chat model of a tier (built once per model name)."""
+        model = self.models[tier]
+        if model not in self._llms:
+            self._llms[model] = self.llm_factory(model)
+        return self._llms[model]
+
+    def ladder(self, step_class: str) -> List[str]:
+        """Tiers tried for a step class, skipping rungs that repeat the previous model."""
+        start = TIERS.index(step_class)
+        rungs = [DETERMINISTIC] if step_class == "trivial" and self.deterministic else []
+        for tier in TIERS[start:]:
+            if not rungs or rungs[-1] == DETERMINISTIC or self.models[tier] != self.models[rungs[-1]]:
+                rungs.append(tier)
+        return rungs
+
+    def _check_budget(self) -> None:
+        if self.token_budget and self.tokens_used >= self.token_budget:
+            raise TokenBudgetExceeded(
+                f"Token budget of {self.token_budget:,} spent ({self.tokens_used:,.0f} used); "
+                "raise AGENT_TOKEN_BUDGET or check for a step looping"
+            )
+
+    async def run(
+        self,
+        agent: Agent,
+        prompt: str,
+        task: str,
+        params: Dict[str, Any],
+        page: Optional[Any] = None
+    ) -> Any:
+        """
+        Run one step up the ladder of its class.
+
+        Args:
+            agent: The browser-use Agent instance
+            prompt: Prompt template (classified and planned)
+            task: Formatted prompt sent to the models
+            params: Values for the placeholders in ``prompt``
+            page: The agent's page, needed for the deterministic rung
+
+        Returns:
+            The agent history, or None when a deterministic action did the step
+
+        Raises:
+            TokenBudgetExceeded: If the run's token budget is spent
+            Exception: What the last model attempt raised
+        """
+        step_class = classify(prompt)
+        self.steps[step_class] += 1
+        annotate(tier=step_class)
+        history: Any = None
+        error: Optional[BaseException] = None
+        tried: List[str] = []
+
+        for tier in self.ladder(step_class):
+            stats = self.tiers[tier]
+            if tier == DETERMINISTIC:
+                plan = plan_actions(prompt) if page is not None else None
+                if plan is None:
+                    continue
+                tried.append(tier)
+                started = time.perf_counter()
+                applied = await apply_plan(page, plan, params)
+                stats.attempts += 1
+                stats.seconds += time.perf_counter() - started
+                if applied:
+                    stats.served += 1
+                    annotate(model=DETERMINISTIC, escalations=len(tried) - 1)
+                    record(browser_actions=len(plan))
+                    return None
+                continue
+
+            if tried:
+                self.escalations += 1
+                print(f"  ↻ Escalating step to {tier} tier ({self.models[tier]})")
+            self._check_budget()
+            tried.append(tier)
+            llm = self.llm(tier)
+            usage = count_tokens(llm)
+            before = usage.totals() if usage else {}
+            previous = _swap_llm(agent, llm)
+            started = time.perf_counter()
+            error = None
+            try:
+                history = await run_task(agent, task)
+            except Exception as e:
+                error, history = e, None
+            finally:
+                _swap_llm(agent, previous)
+                stats.attempts += 1
+                stats.seconds += time.perf_counter() - started
+
+            metrics = history_metrics(history, usage.since(before) if usage else None)
+            record(**metrics)
+            tokens = (metrics.get("prompt_tokens", 0), metrics.get("completion_tokens", 0))
+            stats.prompt_tokens += tokens[0]
+            stats.completion_tokens += tokens[1]
+            self.tokens_used += sum(tokens)
+            if error is None and step_succeeded(history):
+                stats.served += 1
+                break
+
+        annotate(model=self.models.get(tried[-1], DETERMINISTIC) if tried else None,
+                 escalations=max(0, len(tried) - 1))
+        if error is not None:
+            raise error
+        # Every model reported failure: hand back the last history, the
+        # scenario's own waits and checks decide whether the step happened
+        return history
+
+    def format_report(self) -> str:
+        """Per-tier calls, tokens, latency and estimated cost."""
+        lines = [f"{'tier':<14} {'model':<14} {'calls':>5} {'served':>6} {'tokens in/out':>15} "
+                 f"{'total s':>8} {'mean s':>7} {'cost $':>8}"]
+        total_cost = 0.0
+        for tier, stats in self.tiers.items():
+            if not stats.attempts:
+                continue
+            cost = stats.cost
+            total_cost += cost or 0
+            tokens = "-" if tier == DETERMINISTIC else f"{stats.prompt_tokens:,.0f}/{stats.completion_tokens:,.0f}"
+            lines.append(
+                f"{tier:<14} {stats.model:<14} {stats.attempts:>5} {stats.served:>6} {tokens:>15} "
+                f"{stats.seconds:>8.2f} {stats.seconds / stats.attempts:>7.2f} "
+                f"{'?' if cost is None else f'{cost:.4f}':>8}"
+            )
+        classes = ", ".join(f"{count} {name}" for name, count in self.steps.items() if count)
+        budget = f" of {self.token_budget:,}" if self.token_budget else ""
+        lines.append(f"Steps: {classes or 'none'} · {self.escalations} escalation(s) · "
+                     f"{self.tokens_used:,.0f}{budget} tokens · ~${total_cost:.4f}")
+        return "\n".join(lines)
+
+
+async def run_task(agent: Agent, task: str) -> Any:
+    """
+    Run one task on the agent and return the history of that task only.
+
+    browser-use 0.2 takes follow-up tasks through ``add_new_task()`` and
+    returns its whole history from every ``run()``, so the steps of earlier
+    tasks are cut off (token counts and recorded trajectories are per step).
+    """
+    if not hasattr(agent, "add_new_task"):
+        return await agent.run(task)
+    state = getattr(agent, "state", None)
+    before = len(getattr(getattr(state, "history", None), "history", None) or [])
+    agent.add_new_task(task)
+    history = await agent.run()
+    if before and history is not None and hasattr(history, "history"):
+        history = history.model_copy(update={"history": history.history[before:]})
+    return history
+
+
+def _swap_llm(agent: Agent, llm: Any) -> Any:
+    """Point the agent at another chat model; returns the previous one."""
+    previous = agent.llm
+    agent.llm = llm
+    # Some browser-use releases cache the model name for prompts and telemetry
+    if hasattr(agent, "model_name"):
+        agent.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", agent.model_name)
+    return previous
+
+
+_router: ContextVar[Optional[ModelRouter]] = ContextVar("model_router", default=None)
+
+
+def use_model_router(router: Optional[ModelRouter]) -> None:
+    """Route the current context's agent steps through ``router`` (None stops)."""
+    _router.set(router)
+
+
+def router_enabled() -> bool:
+    """False when MODEL_ROUTER=0."""
+    return os.getenv("MODEL_ROUTER", "1") != "0"
+
+
+def new_router(llm_factory: Callable[[str], Any]) -> Optional[ModelRouter]:
+    """A router configured from the environment, or None when disabled."""
+    if not router_enabled():
+        return None
+    models = {
+        "trivial": os.getenv("AGENT_MODEL_TRIVIAL", DEFAULT_MODELS["trivial"]),
+        "navigation": os.getenv("AGENT_MODEL_NAVIGATION", os.getenv("OPENAI_MODEL", DEFAULT_MODELS["navigation"])),
+        "reasoning": os.getenv("AGENT_MODEL_REASONING", DEFAULT_MODELS["reasoning"]),
+    }
+    return ModelRouter(
+        llm_factory,
+        models=models,
+        token_budget=int(os.getenv("AGENT_TOKEN_BUDGET", "0")),
+        deterministic=os.getenv("MODEL_ROUTER_DETERMINISTIC", "1") != "0",
+    )
+
+
+async def run_agent(
+    agent: Agent,
+    prompt: str,
+    task: str,
+    params: Optional[Dict[str, Any]] = None,
+    page: Optional[Any] = None
+) -> Any:
+    """
+    Run an agent step through the active router, or straight on the agent's model.
+
+    Returns:
+        The agent history, or None when a deterministic action did the step
+    """
+    router = _router.get()
+    if router is None:
+        usage = count_tokens(agent.llm)
+        before = usage.totals() if usage else {}
+        history = None
+        try:
+            history = await run_task(agent, task)
+            return history
+        finally:
+            # Tokens of a step that raised were spent too
+            record(**history_metrics(history, usage.since(before) if usage else None))
+    return await router.run(agent, prompt, task, params or {}, page)
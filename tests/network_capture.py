@@ -0,0 +1,298 @@
+"""
+Capture of the Supabase traffic the Angular app sends during a run.
+
+A fetch wrapper installed in the page (and as an init script, so it survives
+navigations) logs every request to Supabase: method, table (or auth/storage
+route), query string, status, response bytes and latency. The log is drained
+into Python after every agent step and, at the end of the run, each request
+is attributed to the innermost trace span (see instrumentation.py) that was
+running when it started, which is the UI step that triggered it. Spans of
+kind 'db' (the harness's own Supabase calls) are skipped.
+
+Per step the report shows request count, response bytes and repeated
+identical reads (same method, table and query, e.g. an N+1 loop or a
+component fetching the same list twice). Budgets from
+``tests/fixtures/network_budgets.json`` (or NETWORK_BUDGETS) fail the run
+when a step exceeds them:
+
+    {
+      "default": {"max_requests": 40, "max_bytes": 2000000, "max_repeated": 2},
+      "steps": {"TASK 2*": {"max_requests": 60}}
+    }
+
+Step patterns are fnmatch globs on the step path ('TASK 2* > fill_form') or
+the span name; the first match is merged over ``default``. Every task span
+must also see at least ``min_requests`` (default 1) requests: a task with
+no Supabase traffic means the capture was installed after the app booted,
+and a run that captured nothing must not pass its budgets. Set
+NETWORK_CAPTURE=0 to disable capturing.
+"""
+import fnmatch
+import json
+import os
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+from instrumentation import Span
+
+
+# Budget file used when NETWORK_BUDGETS is not set
+DEFAULT_BUDGETS = Path(__file__).parent / "fixtures" / "network_budgets.json"
+
+# Span kinds that are not UI steps (requests are never attributed to them)
+_NON_UI_KINDS = {"db", "run"}
+
+# Logs Supabase fetches into window.__crmNet.log; the log is kept in
+# sessionStorage across full page loads until Python drains it.
+INSTALL_CAPTURE_JS = """
+(() => {
+    if (window.__crmNet) return;
+    const STORAGE_KEY = '__crmNetLog';
+    const net = window.__crmNet = { log: [] };
+    try {
+        net.log = JSON.parse(sessionStorage.getItem(STORAGE_KEY) || '[]');
+        sessionStorage.removeItem(STORAGE_KEY);
+    } catch (e) {}
+    addEventListener('pagehide', () => {
+        try { sessionStorage.setItem(STORAGE_KEY, JSON.stringify(net.log)); } catch (e) {}
+    });
+    const route = /\\/(rest|auth|storage|functions)\\/v1\\/([^?#]*)/;
+    const originalFetch = window.fetch;
+    window.fetch = function (input, init) {
+        const url = typeof input === 'string' ? input : (input && input.url) || String(input);
+        const match = route.exec(url);
+        if (!match) return originalFetch.apply(this, arguments);
+        const method = ((init && init.method) || (input && input.method) || 'GET').toUpperCase();
+        const query = url.includes('?') ? url.slice(url.indexOf('?') + 1) : '';
+        const entry = {
+            method,
+            api: match[1],
+            table: decodeURIComponent(match[2]).replace(/\\/$/, ''),
+            query: decodeURIComponent(query),
+            startedAt: Date.now(),
+            status: null,
+            bytes: 0,
+            ms: null,
+        };
+        const started = performance.now();
+        net.log.push(entry);
+        return originalFetch.apply(this, arguments).then((response) => {
+            entry.status = response.status;
+            response.clone().arrayBuffer()
+                .then((body) => { entry.bytes = body.byteLength; })
+                .catch(() => {})
+                .finally(() => { entry.ms = Math.round(performance.now() - started); });
+            return response;
+        }, (error) => {
+            entry.status = 0;
+            entry.ms = Math.round(performance.now() - started);
+            throw error;
+        });
+    };
+})()
+"""
+
+DRAIN_JS = """
+() => {
+    if (!window.__crmNet) return [];
+    // Keep requests whose body is still downloading for the next drain
+    const done = window.__crmNet.log.filter((e) => e.ms !== null);
+    window.__crmNet.log = window.__crmNet.log.filter((e) => e.ms === null);
+    return done;
+}
+"""
+
+
+# Pages that already have the capture registered as an init script
+_initialised_pages: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def load_budgets(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Read the budget file (NETWORK_BUDGETS overrides the default path)."""
+    path = Path(path or os.getenv("NETWORK_BUDGETS") or DEFAULT_BUDGETS)
+    if not path.exists():
+        return {"default": {}, "steps": {}}
+    budgets = json.loads(path.read_text(encoding="utf-8"))
+    return {"default": budgets.get("default", {}), "steps": budgets.get("steps", {})}
+
+
+def budget_for(step: str, budgets: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Default budget merged with the first pattern matching the step.
+
+    ``step`` is a span path ('TASK 2: Create New Unidad > fill_form');
+    patterns may match the whole path or just the last span's name.
+    """
+    leaf = step.rsplit(" > ", 1)[-1]
+    for pattern, override in budgets["steps"].items():
+        if fnmatch.fnmatchcase(step, pattern) or fnmatch.fnmatchcase(leaf, pattern):
+            return {**budgets["default"], **override}
+    return dict(budgets["default"])
+
+
+def summarize(requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Request count, bytes, latency and repeated reads of one step."""
+    reads = Counter(
+        f"{r['method']} {r['table']}{'?' + r['query'] if r['query'] else ''}"
+        for r in requests if r["method"] in ("GET", "HEAD")
+    )
+    return {
+        "requests": len(requests),
+        "bytes": sum(r["bytes"] for r in requests),
+        "ms": sum(r["ms"] or 0 for r in requests),
+        "repeated": {query: count for query, count in reads.most_common() if count > 1},
+    }
+
+
+class NetworkCapture:
+    """Supabase requests of one run, attributed to trace spans."""
+
+    def __init__(self, budgets: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            budgets: Parsed budgets (default: load_budgets())
+        """
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.requests: List[Dict[str, Any]] = []
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        # Paths of the task spans, checked for missing traffic
+        self.tasks: List[str] = []
+
+    async def attach(self, page: Any) -> None:
+        """Install the capture in the page and for its future navigations."""
+        try:
+            if page not in _initialised_pages and hasattr(page, "add_init_script"):
+                await page.add_init_script(INSTALL_CAPTURE_JS)
+                _initialised_pages.add(page)
+        except TypeError:
+            pass
+        await page.evaluate(f"() => {INSTALL_CAPTURE_JS}")
+
+    async def drain(self, page: Any) -> None:
+        """Move completed requests from the page into this capture."""
+        try:
+            self.requests.extend(await page.evaluate(DRAIN_JS) or [])
+        except Exception:
+            pass
+
+    def attribute(self, root: Span) -> Dict[str, Dict[str, Any]]:
+        """
+        Assign every captured request to the innermost UI span running when it started.
+
+        Adds ``http_requests``/``http_bytes`` metrics and a ``network``
+        attribute to those spans, and returns the per-step summaries keyed
+        by span path ('TASK 2: Create New Unidad > fill_form').
+        """
+        candidates: List[tuple] = []
+
+        def walk(span: Span, path: List[str]) -> None:
+            here = path + [span.name] if span.kind != "run" else path
+            if span.kind == "task":
+                self.tasks.append(" > ".join(here))
+            if span.kind not in _NON_UI_KINDS:
+                start = span.started_at
+                candidates.append((start, start + span.duration_s, len(here), " > ".join(here), span))
+            for child in span.children:
+                walk(child, here)
+
+        self.tasks = []
+        walk(root, [])
+        by_step: Dict[str, List[Dict[str, Any]]] = {}
+        owners: Dict[str, Span] = {}
+        for request in self.requests:
+            at = request["startedAt"] / 1000
+            matching = [c for c in candidates if c[0] <= at <= c[1]]
+            name = max(matching, key=lambda c: c[2])[3] if matching else "(outside steps)"
+            by_step.setdefault(name, []).append(request)
+            if matching:
+                owners[name] = max(matching, key=lambda c: c[2])[4]
+
+        self.steps = {name: summarize(requests) for name, requests in by_step.items()}
+        for name, span in owners.items():
+            summary = self.steps[name]
+            span.metrics["http_requests"] = summary["requests"]
+            span.metrics["http_bytes"] = summary["bytes"]
+            span.attributes["network"] = summary
+        return self.steps
+
+    def violations(self) -> List[str]:
+        """Budget violations of the attributed steps (call attribute() first)."""
+        problems = []
+        for task in self.tasks:
+            minimum = budget_for(task, self.budgets).get("min_requests", 1)
+            seen = sum(
+                summary["requests"] for step, summary in self.steps.items()
+                if step == task or step.startswith(task + " > ")
+            )
+            if seen < minimum:
+                problems.append(f"{task}: {seen} requests captured (at least {minimum} expected; "
+                                "was the capture installed before the app loaded?)")
+        for step, summary in self.steps.items():
+            budget = budget_for(step, self.budgets)
+            repeated = max(summary["repeated"].values(), default=1) - 1
+            checks = [
+                ("max_requests", summary["requests"], "requests"),
+                ("max_bytes", summary["bytes"], "bytes"),
+                ("max_repeated", repeated, "repeats of one query"),
+            ]
+            for key, value, label in checks:
+                if key in budget and value > budget[key]:
+                    problems.append(f"{step}: {value} {label} (budget {budget[key]})")
+        return problems
+
+    def format_report(self) -> str:
+        """One line per step with traffic, plus its repeated reads."""
+        lines = []
+        for step, summary in self.steps.items():
+            lines.append(f"  {step[:70]:<70} {summary['requests']:>4} req  "
+                         f"{summary['bytes'] / 1024:>8.1f} KB  {summary['ms']:>6} ms")
+            for query, count in summary["repeated"].items():
+                lines.append(f"      ↻ {count}× {query[:100]}")
+        return "\n".join(lines)
+
+
+_capture: ContextVar[Optional[NetworkCapture]] = ContextVar("network_capture", default=None)
+
+
+def use_network_capture(capture: Optional[NetworkCapture]) -> None:
+    """Capture the current context's agent steps into ``capture`` (None stops)."""
+    _capture.set(capture)
+
+
+def capture_enabled() -> bool:
+    """False when NETWORK_CAPTURE=0."""
+    return os.getenv("NETWORK_CAPTURE", "1") != "0"
+
+
+async def attach_capture(agent: Agent, start: bool = False) -> None:
+    """
+    Install the capture in the agent's page, if a capture is active.
+
+    supabase-js binds ``fetch`` when the app creates its client, so only
+    page loads after this call are captured: scenarios call it with
+    ``start=True`` right after creating the Agent, before any navigation.
+
+    Args:
+        agent: The browser-use Agent instance
+        start: Launch the agent's browser if it has not been started yet
+    """
+    capture = _capture.get()
+    page = await get_current_page(agent, start=start) if capture is not None else None
+    if page is not None:
+        try:
+            await capture.attach(page)
+        except Exception:
+            pass
+
+
+async def drain_capture(agent: Agent) -> None:
+    """Collect the requests logged in the agent's page, if a capture is active."""
+    capture = _capture.get()
+    page = await get_current_page(agent) if capture is not None else None
+    if page is not None:
+        await capture.drain(page)
@@ -0,0 +1,146 @@
+"""
+Parallel runner for UnidadCRUDTest scenarios.
+
+Schedules N independent scenario instances across a bounded pool of asyncio
+workers. Every scenario is a separate UnidadCRUDTest, so it gets its own
+Agent (with its own incognito context leased from the shared warm browser
+pool, see browser_pool.py), its own Supabase client and its own
+``test_timestamp`` namespace. Results are aggregated per worker.
+
+Usage:
+    python tests/parallel_runner.py --scenarios 20 --workers 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add tests directory to path for imports
+tests_dir = Path(__file__).parent
+sys.path.insert(0, str(tests_dir))
+
+from test_unidad_crud import UnidadCRUDTest
+from browser_pool import close_shared_pool
+
+
+async def _worker(
+    worker_id: int,
+    queue: "asyncio.Queue[int]",
+    base_url: str,
+    scenario_factory: Callable[..., UnidadCRUDTest],
+    results: List[Dict[str, Any]]
+) -> None:
+    """Pull scenario indices from the queue until it is empty."""
+    while True:
+        try:
+            scenario = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        namespace = f"w{worker_id}s{scenario}"
+        test = scenario_factory(base_url=base_url, namespace=namespace)
+        started = time.perf_counter()
+        error = None
+        try:
+            await test.run_all_tests()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            queue.task_done()
+
+        results.append({
+            "scenario": scenario,
+            "namespace": namespace,
+            "unidad_nombre": test.created_unidad_nombre,
+            "passed": error is None,
+            "duration_s": round(time.perf_counter() - started, 2),
+            "error": error,
+        })
+
+
+async def run_scenarios(
+    scenarios: int,
+    workers: int,
+    base_url: str = "http://localhost:4200",
+    scenario_factory: Callable[..., UnidadCRUDTest] = UnidadCRUDTest
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Run ``scenarios`` CRUD scenarios on at most ``workers`` concurrent workers.
+
+    Args:
+        scenarios: Number of scenario instances to run
+        workers: Maximum number of scenarios running at the same time
+        base_url: Base URL of the application
+        scenario_factory: Callable building a scenario from base_url and
+            namespace (default: UnidadCRUDTest)
+
+    Returns:
+        Dictionary mapping worker id -> list of scenario results
+    """
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for scenario in range(scenarios):
+        queue.put_nowait(scenario)
+
+    worker_count = max(1, min(workers, scenarios))
+    per_worker: Dict[int, List[Dict[str, Any]]] = {i: [] for i in range(worker_count)}
+    await asyncio.gather(*(
+        _worker(i, queue, base_url, scenario_factory, per_worker[i])
+        for i in range(worker_count)
+    ))
+    return per_worker
+
+
+def print_summary(per_worker: Dict[int, List[Dict[str, Any]]], wall_time_s: float) -> bool:
+    """
+    Print the per-worker results table.
+
+    Returns:
+        True if every scenario passed
+    """
+    print("\n" + "="*60)
+    print("PARALLEL RUN SUMMARY")
+    print("="*60)
+    all_results = [r for results in per_worker.values() for r in results]
+    for worker_id, results in per_worker.items():
+        busy = sum(r["duration_s"] for r in results)
+        passed = sum(r["passed"] for r in results)
+        print(f"Worker {worker_id}: {passed}/{len(results)} passed, busy {busy:.1f}s")
+        for r in sorted(results, key=lambda r: r["scenario"]):
+            mark = "✓" if r["passed"] else "❌"
+            line = f"  {mark} scenario {r['scenario']} ({r['namespace']}) {r['duration_s']:.1f}s"
+            if r["error"]:
+                line += f" - {r['error']}"
+            print(line)
+
+    failed = [r for r in all_results if not r["passed"]]
+    slowest = max((r["duration_s"] for r in all_results), default=0.0)
+    print("-"*60)
+    print(
+        f"{len(all_results) - len(failed)}/{len(all_results)} scenarios passed in "
+        f"{wall_time_s:.1f}s wall time (slowest scenario {slowest:.1f}s)"
+    )
+    return not failed
+
+
+async def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Run UnidadCRUDTest scenarios in parallel")
+    parser.add_argument("--scenarios", type=int, default=int(os.getenv("TEST_SCENARIOS", "4")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TEST_WORKERS", "4")))
+    args = parser.parse_args()
+
+    base_url = os.getenv("BASE_URL", "http://localhost:4200")
+    started = time.perf_counter()
+    try:
+        per_worker = await run_scenarios(args.scenarios, args.workers, base_url=base_url)
+    finally:
+        await close_shared_pool()
+    if not print_summary(per_worker, time.perf_counter() - started):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,654 @@
+"""
+Performance history of the scenario runs, kept in a local SQLite database.
+
+Every ``UnidadCRUDTest`` run records its span tree (see instrumentation.py)
+here: one row per run and one row per step with its duration, token counts
+and outcome. From that history the store answers two questions a single
+pass/fail cannot:
+
+- Did a step get slower? Each step is compared with a rolling baseline, its
+  last ``BASELINE_RUNS`` passing runs in the same mode (agent, replayed from
+  the trajectory cache, or scripted) and environment (hermetic or not).
+  Durations are compared in log space: a single run is flagged when it falls
+  above the one-sided 95% prediction interval of the baseline, a repeated
+  batch when Welch's t-test says its mean is higher. Either way the slowdown
+  must also be at least ``MIN_RATIO`` times the baseline to count.
+- Which prompts flake? A prompt fails when its agent step raised or when it
+  was the last prompt before a failing check. A failure is flaky when the
+  same prompt also passed on the same commit, so the app did not change.
+
+Repeating a scenario N times gives each step a mean with a 95% confidence
+interval, which separates a real regression in the Angular app from the
+noise of a single LLM-driven run.
+
+Usage:
+    python tests/perf_store.py repeat 5            # run the scenario 5 times, compare the batch
+    python tests/perf_store.py report              # compare the latest run (or batch)
+    python tests/perf_store.py report --batch B    # compare a given batch
+    python tests/perf_store.py flakes --last 100   # flake rate per prompt
+    python tests/perf_store.py import tests/traces/unidad_crud_*.json
+
+``report`` and ``repeat`` exit with status 1 when a step slowed down
+significantly. Runs are recorded automatically unless PERF_STORE=0;
+PERF_DB moves the database.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from instrumentation import METRIC_KEYS, Span
+
+
+DEFAULT_DB_PATH = Path(__file__).parent / ".perf" / "results.sqlite"
+
+# Passing runs per step in the rolling baseline
+BASELINE_RUNS = 20
+
+# Fewer baseline runs than this and a step is not judged
+MIN_BASELINE = 5
+
+# Slowdowns smaller than this ratio are never flagged, however significant
+MIN_RATIO = 1.2
+
+# Runs considered when computing flake rates
+FLAKE_WINDOW = 50
+
+# Step kinds listed by `report` (flagged steps of other kinds are always listed)
+REPORT_KINDS = ("task", "agent")
+
+# Student's t quantiles by degrees of freedom: (0.95, 0.975). Degrees of
+# freedom between rows use the row below, which errs on the wide side.
+_T_TABLE = (
+    (1, 6.314, 12.706), (2, 2.920, 4.303), (3, 2.353, 3.182), (4, 2.132, 2.776),
+    (5, 2.015, 2.571), (6, 1.943, 2.447), (7, 1.895, 2.365), (8, 1.860, 2.306),
+    (9, 1.833, 2.262), (10, 1.812, 2.228), (12, 1.782, 2.179), (15, 1.753, 2.131),
+    (20, 1.725, 2.086), (30, 1.697, 2.042), (60, 1.671, 2.000), (120, 1.658, 1.980),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    scenario TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    batch TEXT,
+    started_at REAL NOT NULL,
+    duration_s REAL NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    commit_sha TEXT,
+    hermetic INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_by_scenario ON runs (scenario, started_at);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    prompt TEXT,
+    duration_s REAL NOT NULL,
+    status TEXT NOT NULL,
+    blamed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    browser_actions INTEGER NOT NULL DEFAULT 0,
+    db_calls INTEGER NOT NULL DEFAULT 0,
+    http_requests INTEGER NOT NULL DEFAULT 0,
+    http_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, path)
+);
+CREATE INDEX IF NOT EXISTS steps_by_path ON steps (path, mode);
+"""
+
+
+def t_quantile(df: float, two_sided: bool = False) -> float:
+    """95% quantile of Student's t (one-sided, or two-sided for intervals)."""
+    column = 2 if two_sided else 1
+    if df >= 1000:
+        return 1.960 if two_sided else 1.645
+    row = _T_TABLE[0]
+    for candidate in _T_TABLE:
+        if candidate[0] <= df:
+            row = candidate
+    return row[column]
+
+
+def mean_ci(values: Sequence[float]) -> Tuple[float, float]:
+    """Mean and the half-width of its 95% confidence interval (0 for one value)."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, t_quantile(len(values) - 1, two_sided=True) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def wilson_interval(failures: int, attempts: int) -> Tuple[float, float]:
+    """95% Wilson score interval of a rate (sound for small counts and rates near 0)."""
+    if attempts == 0:
+        return 0.0, 0.0
+    z = 1.96
+    rate = failures / attempts
+    center = (rate + z * z / (2 * attempts)) / (1 + z * z / attempts)
+    spread = z * math.sqrt(rate * (1 - rate) / attempts + z * z / (4 * attempts * attempts)) / (1 + z * z / attempts)
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+def is_slowdown(baseline: Sequence[float], current: Sequence[float], min_ratio: float = MIN_RATIO) -> Tuple[bool, float]:
+    """
+    Whether ``current`` durations are significantly slower than ``baseline``.
+
+    Args:
+        baseline: Durations of the baseline runs (at least two)
+        current: Durations of the run, or of the repeated batch, under test
+        min_ratio: Smallest ratio of geometric means worth flagging
+
+    Returns:
+        (significant, ratio of geometric means current/baseline)
+    """
+    logs_b = [math.log(max(v, 1e-6)) for v in baseline]
+    logs_c = [math.log(max(v, 1e-6)) for v in current]
+    mean_b, mean_c = statistics.fmean(logs_b), statistics.fmean(logs_c)
+    ratio = math.exp(mean_c - mean_b)
+    if ratio < min_ratio:
+        return False, ratio
+    var_b = statistics.variance(logs_b)
+    if len(logs_c) == 1:
+        # One-sided prediction interval for a single new observation
+        limit = mean_b + t_quantile(len(logs_b) - 1) * math.sqrt(var_b * (1 + 1 / len(logs_b)))
+        return mean_c > limit, ratio
+    var_c = statistics.variance(logs_c)
+    se2_b, se2_c = var_b / len(logs_b), var_c / len(logs_c)
+    if se2_b + se2_c == 0:
+        return True, ratio
+    t = (mean_c - mean_b) / math.sqrt(se2_b + se2_c)
+    df = (se2_b + se2_c) ** 2 / (
+        (se2_b ** 2 / (len(logs_b) - 1) if se2_b else 0) + (se2_c ** 2 / (len(logs_c) - 1) if se2_c else 0)
+    )
+    return t > t_quantile(df), ratio
+
+
+def _span_mode(span: Span) -> str:
+    if span.kind != "agent":
+        return ""
+    if span.attributes.get("scripted"):
+        return "scripted"
+    return "replayed" if span.attributes.get("replayed") else "agent"
+
+
+def _has_agent(span: Span) -> bool:
+    return any(child.kind == "agent" or _has_agent(child) for child in span.children)
+
+
+def _last_agent(span: Span) -> Optional[Span]:
+    for child in reversed(span.children):
+        if child.kind == "agent":
+            return child
+        found = _last_agent(child)
+        if found is not None:
+            return found
+    return None
+
+
+def _blamed_spans(root: Span) -> List[Span]:
+    """
+    Agent spans blamed for a failure they did not raise themselves.
+
+    browser-use rarely raises when the agent does the wrong thing; the check
+    after it fails instead. The innermost failed span (below the root) that
+    ran agent steps blames the last of them.
+    """
+    blamed = []
+
+    def walk(span: Span) -> None:
+        failed_children = [child for child in span.children if child.status == "error" and _has_agent(child)]
+        if span is not root and span.status == "error" and span.kind != "agent" and not failed_children:
+            last = _last_agent(span)
+            if last is not None and last.status != "error":
+                blamed.append(last)
+        for child in span.children:
+            walk(child)
+
+    walk(root)
+    return blamed
+
+
+def flatten(root: Span) -> Iterator[Tuple[str, Span]]:
+    """
+    Steps of a trace below its root, keyed by their path of span names.
+
+    Sibling spans with the same name (the same prompt run twice in a task)
+    are told apart by a ``#n`` suffix.
+    """
+    def walk(span: Span, prefix: str) -> Iterator[Tuple[str, Span]]:
+        seen: Dict[str, int] = defaultdict(int)
+        for child in span.children:
+            name = " ".join(child.name.split())
+            seen[name] += 1
+            path = f"{prefix}{name}" + (f" #{seen[name]}" if seen[name] > 1 else "")
+            yield path, child
+            yield from walk(child, path + " / ")
+
+    yield from walk(root, "")
+
+
+def span_from_dict(data: Dict[str, Any]) -> Span:
+    """Rebuild a span tree from a trace JSON written by write_trace."""
+    span = Span(data["name"], data["kind"])
+    span.started_at = data["started_at"]
+    span.duration_s = data["duration_s"]
+    span.status = data["status"]
+    span.error = data.get("error")
+    span.metrics = data.get("metrics", {})
+    span.attributes = data.get("attributes", {})
+    span.children = [span_from_dict(child) for child in data.get("children", [])]
+    return span
+
+
+def current_commit() -> Optional[str]:
+    """Short SHA of the checked-out commit (the app version under test), if known."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+@dataclass
+class StepComparison:
+    """One step of the run (or batch) under test against its baseline."""
+
+    path: str
+    kind: str
+    mode: str
+    current: List[float]
+    baseline: List[float]
+    tokens: float
+    baseline_tokens: float
+    significant: bool
+    ratio: float
+
+    @property
+    def judged(self) -> bool:
+        return len(self.baseline) >= MIN_BASELINE
+
+
+@dataclass
+class FlakeRate:
+    """Failure and flake counts of one prompt in one mode."""
+
+    prompt: str
+    mode: str
+    attempts: int
+    failures: int
+    flaky: int
+
+    @property
+    def flake_rate(self) -> float:
+        return self.flaky / self.attempts if self.attempts else 0.0
+
+
+class PerfStore:
+    """SQLite history of scenario runs."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Database file (default: PERF_DB env var or tests/.perf/results.sqlite)
+        """
+        self.path = Path(path or os.getenv("PERF_DB") or DEFAULT_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Parallel scenarios in other processes may be writing too
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "PerfStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def record_run(
+        self,
+        root: Span,
+        scenario: str,
+        namespace: str,
+        batch: Optional[str] = None,
+        hermetic: bool = False,
+        commit: Optional[str] = None
+    ) -> int:
+        """
+        Store a finished run and all its steps.
+
+        Args:
+            root: Root span of the run's trace
+            scenario: Scenario name, e.g. 'unidad_crud'
+            namespace: Run namespace (UnidadCRUDTest.test_timestamp)
+            batch: Id shared by the runs of one repetition batch
+            hermetic: Whether the run used the stand-in
+            commit: Commit of the app under test (default: the checked-out one)
+
+        Returns:
+            Id of the stored run
+        """
+        blamed = {id(span) for span in _blamed_spans(root)}
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (scenario, namespace, batch, started_at, duration_s, status, error, commit_sha, hermetic)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scenario, namespace, batch, root.started_at, root.duration_s, root.status, root.error,
+                 commit or current_commit(), int(hermetic))
+            )
+            run_id = cursor.lastrowid
+            rows = []
+            for path, span in flatten(root):
+                totals = span.totals()
+                rows.append((
+                    run_id, path, span.kind, _span_mode(span), span.attributes.get("prompt"),
+                    span.duration_s, span.status, int(id(span) in blamed), span.error,
+                    *(int(totals[key]) for key in METRIC_KEYS),
+                ))
+            self.conn.executemany(
+                "INSERT INTO steps (run_id, path, kind, mode, prompt, duration_s, status, blamed, error, "
+                + ", ".join(METRIC_KEYS) + ") VALUES (" + ", ".join("?" * (9 + len(METRIC_KEYS))) + ")",
+                rows
+            )
+        return run_id
+
+    def latest_runs(self, scenario: str) -> List[int]:
+        """The latest run of ``scenario``, or every run of its batch if it had one."""
+        row = self.conn.execute(
+            "SELECT id, batch FROM runs WHERE scenario = ? ORDER BY started_at DESC LIMIT 1", (scenario,)
+        ).fetchone()
+        if row is None:
+            return []
+        run_id, batch = row
+        return self.batch_runs(batch) if batch else [run_id]
+
+    def batch_runs(self, batch: str) -> List[int]:
+        return [r[0] for r in self.conn.execute("SELECT id FROM runs WHERE batch = ? ORDER BY started_at", (batch,))]
+
+    def compare(
+        self,
+        run_ids: Sequence[int],
+        window: int = BASELINE_RUNS,
+        min_ratio: float = MIN_RATIO
+    ) -> List[StepComparison]:
+        """
+        Compare the passing steps of ``run_ids`` with their rolling baselines.
+
+        The baseline of a step is its last ``window`` passing occurrences in
+        earlier runs of the same scenario, mode and environment.
+
+        Args:
+            run_ids: One run, or the runs of a repetition batch
+            window: Baseline size
+            min_ratio: Smallest slowdown ratio worth flagging
+
+        Returns:
+            One comparison per step, in execution order
+        """
+        if not run_ids:
+            return []
+        marks = ", ".join("?" * len(run_ids))
+        scenario, hermetic, first_started = self.conn.execute(
+            f"SELECT scenario, hermetic, MIN(started_at) FROM runs WHERE id IN ({marks})", list(run_ids)
+        ).fetchone()
+        current: Dict[Tuple[str, str], List[Tuple[float, int]]] = defaultdict(list)
+        kinds: Dict[Tuple[str, str], str] = {}
+        for path, kind, mode, duration, tokens in self.conn.execute(
+            "SELECT s.path, s.kind, s.mode, s.duration_s, s.prompt_tokens + s.completion_tokens"
+            f" FROM steps s JOIN runs r ON r.id = s.run_id WHERE s.run_id IN ({marks}) AND s.status = 'ok'"
+            " ORDER BY r.started_at, s.rowid",
+            list(run_ids)
+        ):
+            current[(path, mode)].append((duration, tokens))
+            kinds[(path, mode)] = kind
+
+        comparisons = []
+        for (path, mode), samples in current.items():
+            baseline = self.conn.execute(
+                "SELECT s.duration_s, s.prompt_tokens + s.completion_tokens FROM steps s JOIN runs r ON r.id = s.run_id"
+                f" WHERE s.path = ? AND s.mode = ? AND s.status = 'ok' AND r.scenario = ? AND r.hermetic = ?"
+                f" AND r.started_at < ? AND r.id NOT IN ({marks})"
+                " ORDER BY r.started_at DESC LIMIT ?",
+                [path, mode, scenario, hermetic, first_started, *run_ids, window]
+            ).fetchall()
+            durations = [d for d, _ in samples]
+            baseline_durations = [d for d, _ in baseline]
+            significant, ratio = False, 1.0
+            if len(baseline) >= max(2, MIN_BASELINE):
+                significant, ratio = is_slowdown(baseline_durations, durations, min_ratio)
+            comparisons.append(StepComparison(
+                path=path,
+                kind=kinds[(path, mode)],
+                mode=mode,
+                current=durations,
+                baseline=baseline_durations,
+                tokens=statistics.fmean(t for _, t in samples),
+                baseline_tokens=statistics.fmean(t for _, t in baseline) if baseline else 0.0,
+                significant=significant,
+                ratio=ratio,
+            ))
+        return comparisons
+
+    def flake_rates(self, scenario: str, last: int = FLAKE_WINDOW) -> List[FlakeRate]:
+        """
+        Failure and flake counts per prompt over the last ``last`` runs.
+
+        Returns:
+            One entry per (prompt, mode), most flaky first
+        """
+        rows = self.conn.execute(
+            "SELECT s.prompt, s.mode, COALESCE(r.commit_sha, ''), s.status = 'error' OR s.blamed"
+            " FROM steps s JOIN runs r ON r.id = s.run_id"
+            " WHERE s.prompt IS NOT NULL AND r.id IN ("
+            "   SELECT id FROM runs WHERE scenario = ? ORDER BY started_at DESC LIMIT ?)",
+            (scenario, last)
+        ).fetchall()
+        passed_on = {(prompt, mode, commit) for prompt, mode, commit, failed in rows if not failed}
+        rates: Dict[Tuple[str, str], FlakeRate] = {}
+        for prompt, mode, commit, failed in rows:
+            rate = rates.setdefault((prompt, mode), FlakeRate(prompt, mode, 0, 0, 0))
+            rate.attempts += 1
+            if failed:
+                rate.failures += 1
+                rate.flaky += (prompt, mode, commit) in passed_on
+        return sorted(rates.values(), key=lambda r: (-r.flake_rate, -r.failures, r.prompt))
+
+
+def _short(text: str, width: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def format_comparison(comparisons: Sequence[StepComparison], show_all: bool = False) -> str:
+    """
+    Table of steps against their baselines: mean ± 95% CI of the run or batch,
+    baseline median, ratio, tokens, and ⚠ on significant slowdowns.
+    """
+    lines = [f"  {'step':<56} {'mode':<8} {'now (95% CI)':>18} {'baseline':>14} {'ratio':>6} {'tokens':>14}"]
+    for c in comparisons:
+        if not (show_all or c.significant or c.kind in REPORT_KINDS):
+            continue
+        mean, half = mean_ci(c.current)
+        now = f"{mean:.2f}s ±{half:.2f}" if len(c.current) > 1 else f"{mean:.2f}s"
+        if c.judged:
+            baseline = f"{statistics.median(c.baseline):.2f}s n={len(c.baseline)}"
+            ratio = f"{c.ratio:.2f}x"
+        else:
+            baseline, ratio = f"n={len(c.baseline)}", "-"
+        tokens = f"{c.tokens:.0f}/{c.baseline_tokens:.0f}" if c.tokens or c.baseline_tokens else ""
+        mark = "⚠" if c.significant else " "
+        lines.append(f"{mark} {_short(c.path, 56):<56} {c.mode:<8} {now:>18} {baseline:>14} {ratio:>6} {tokens:>14}")
+    return "\n".join(lines)
+
+
+def format_flakes(rates: Sequence[FlakeRate]) -> str:
+    """Table of prompts with their failure counts and flake rate (95% Wilson interval)."""
+    lines = [f"  {'prompt':<60} {'mode':<8} {'runs':>5} {'fail':>5} {'flaky':>5} {'flake rate (95% CI)':>22}"]
+    for r in rates:
+        low, high = wilson_interval(r.flaky, r.attempts)
+        rate = f"{r.flake_rate:.0%} [{low:.0%}-{high:.0%}]"
+        lines.append(f"  {_short(r.prompt, 60):<60} {r.mode:<8} {r.attempts:>5} {r.failures:>5} {r.flaky:>5} {rate:>22}")
+    return "\n".join(lines)
+
+
+def store_enabled() -> bool:
+    """False when PERF_STORE=0."""
+    return os.getenv("PERF_STORE", "1") != "0"
+
+
+def record_scenario_run(
+    root: Span,
+    scenario: str,
+    namespace: str,
+    batch: Optional[str] = None,
+    hermetic: bool = False
+) -> List[StepComparison]:
+    """
+    Record a run in the default store and compare it with its baseline.
+
+    Returns:
+        The significant slowdowns of this run (empty for runs in a batch,
+        which are judged together once the batch is done)
+    """
+    with PerfStore() as store:
+        run_id = store.record_run(root, scenario, namespace, batch=batch, hermetic=hermetic)
+        if batch:
+            return []
+        return [c for c in store.compare([run_id]) if c.significant]
+
+
+def _print_report(store: PerfStore, run_ids: Sequence[int], window: int, show_all: bool) -> bool:
+    """Print the comparison of ``run_ids``; True when no step slowed down significantly."""
+    comparisons = store.compare(run_ids, window=window)
+    print("\n" + "="*60)
+    print(f"STEP DURATIONS VS BASELINE ({len(run_ids)} run{'s' if len(run_ids) != 1 else ''}, last {window} passing runs)")
+    print("="*60)
+    print(format_comparison(comparisons, show_all=show_all))
+    slower = [c for c in comparisons if c.significant]
+    unjudged = sum(not c.judged for c in comparisons)
+    if unjudged:
+        print(f"\n  {unjudged} step(s) have fewer than {MIN_BASELINE} baseline runs and were not judged")
+    if slower:
+        print(f"\n⚠ {len(slower)} step(s) significantly slower than baseline")
+    else:
+        print("\n✓ No significant slowdowns")
+    return not slower
+
+
+async def repeat_scenario(times: int, base_url: str) -> Tuple[str, int]:
+    """
+    Run UnidadCRUDTest ``times`` times in a row as one batch.
+
+    Returns:
+        (batch id, number of failed runs)
+    """
+    from test_unidad_crud import UnidadCRUDTest
+    from browser_pool import close_shared_pool
+
+    batch = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    failures = 0
+    try:
+        for i in range(times):
+            print(f"\n▶ Run {i + 1}/{times} of batch {batch}")
+            test = UnidadCRUDTest(base_url=base_url)
+            test.perf_batch = batch
+            try:
+                await test.run_all_tests()
+            except Exception:
+                failures += 1
+    finally:
+        await close_shared_pool()
+    return batch, failures
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Track scenario performance across runs")
+    parser.add_argument("--scenario", default="unidad_crud")
+    parser.add_argument("--db", type=Path, help="Database file (default: PERF_DB or tests/.perf/results.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    repeat = commands.add_parser("repeat", help="Run the scenario N times and compare the batch with the baseline")
+    repeat.add_argument("times", type=int)
+    repeat.add_argument("--window", type=int, default=BASELINE_RUNS)
+
+    report = commands.add_parser("report", help="Compare the latest run (or a batch/run) with the baseline")
+    report.add_argument("--batch")
+    report.add_argument("--run", type=int)
+    report.add_argument("--window", type=int, default=BASELINE_RUNS)
+    report.add_argument("--all", action="store_true", help="List every step, not only tasks and agent steps")
+
+    flakes = commands.add_parser("flakes", help="Flake rate per prompt")
+    flakes.add_argument("--last", type=int, default=FLAKE_WINDOW)
+
+    backfill = commands.add_parser("import", help="Record trace JSON files written by earlier runs")
+    backfill.add_argument("traces", nargs="+", type=Path)
+
+    args = parser.parse_args()
+    if args.db:
+        os.environ["PERF_DB"] = str(args.db)
+
+    if args.command == "repeat":
+        if args.times < 2:
+            parser.error("repeat needs at least 2 runs for a confidence interval")
+        from dotenv import load_dotenv
+        load_dotenv()
+        batch, failures = asyncio.run(repeat_scenario(args.times, os.getenv("BASE_URL", "http://localhost:4200")))
+        with PerfStore() as store:
+            ok = _print_report(store, store.batch_runs(batch), args.window, show_all=False)
+            print(f"{args.times - failures}/{args.times} runs passed (batch {batch})")
+        sys.exit(0 if ok else 1)
+
+    with PerfStore() as store:
+        if args.command == "report":
+            if args.run:
+                run_ids = [args.run]
+            elif args.batch:
+                run_ids = store.batch_runs(args.batch)
+            else:
+                run_ids = store.latest_runs(args.scenario)
+            if not run_ids:
+                print("❌ No runs recorded")
+                sys.exit(2)
+            sys.exit(0 if _print_report(store, run_ids, args.window, args.all) else 1)
+
+        if args.command == "flakes":
+            rates = store.flake_rates(args.scenario, last=args.last)
+            if not rates:
+                print("❌ No prompts recorded")
+                sys.exit(2)
+            print(format_flakes(rates))
+            return
+
+        for path in args.traces:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            root = span_from_dict(data)
+            prefix = f"{args.scenario}_"
+            namespace = root.name[len(prefix):] if root.name.startswith(prefix) else root.name
+            run_id = store.record_run(root, args.scenario, namespace)
+            print(f"✓ Recorded {path.name} as run {run_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,593 @@
+"""
+In-process stand-in for the Supabase REST (PostgREST) and auth endpoints.
+
+Serves the subset of the API the Angular app and the test harness use, from
+in-memory tables, so the suite can run without network access:
+
+- ``/rest/v1/<table>``: GET/HEAD/POST/PATCH/DELETE with ``select``, ``order``,
+  ``limit``/``offset``, ``on_conflict``, embedded resources in ``select``
+  (``alias:fk_column(...)`` and ``child_table(...)``), the filters ``eq,
+  neq, gt, gte, lt, lte, like, ilike, is, in`` (optionally negated with
+  ``not.``), the
+  ``Prefer`` options ``return=representation``, ``count=exact`` and
+  ``resolution=merge-duplicates`` (upsert), and single-object responses
+- ``/auth/v1/token`` (password and refresh_token grants), ``/auth/v1/user``
+  and ``/auth/v1/logout``
+
+Column names and defaults of the tables defined in
+``unidades_table_cleaned.sql`` are loaded from the file, so inserted rows
+look like the real ones.
+
+Usage:
+    standin = PostgrestStandIn(port=54321)
+    standin.start()
+    ...
+    standin.stop()
+"""
+import base64
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+
+# Schema file shipped at the repository root
+SCHEMA_SQL = Path(__file__).parent.parent / "unidades_table_cleaned.sql"
+
+# Fixed, JWT-shaped key accepted by supabase-py/supabase-js (never validated)
+ANON_KEY = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJyb2xlIjoiYW5vbiIsImlzcyI6Imhlcm1ldGljIn0."
+    "aGVybWV0aWM"
+)
+
+# Reference data the unidad form needs (ciudad/barrio options, a proyecto)
+DEFAULT_SEED: Dict[str, List[Dict[str, Any]]] = {
+    "ciudades": [
+        {"id": 1, "nombre": "Montevideo"},
+        {"id": 2, "nombre": "Canelones"},
+        {"id": 3, "nombre": "Maldonado"},
+    ],
+    "barrios": [
+        {"id": 1, "ciudad_id": 1, "nombre": "Pocitos"},
+        {"id": 2, "ciudad_id": 1, "nombre": "Punta Carretas"},
+        {"id": 3, "ciudad_id": 1, "nombre": "Cordón"},
+        {"id": 4, "ciudad_id": 2, "nombre": "Ciudad de la Costa"},
+        {"id": 5, "ciudad_id": 3, "nombre": "Punta del Este"},
+    ],
+    "proyectos": [
+        {
+            "id": "proyecto-hermetic-1",
+            "nombre": "Proyecto Hermetic",
+            "ciudad_id": 1,
+            "barrio_id": 1,
+            "deleted_at": None,
+        },
+    ],
+    "usuarios": [
+        {"id": "user-hermetic-1", "email": "testuser@test.com", "nombre": "Test User", "rol": "admin"},
+    ],
+}
+
+_COLUMN_RE = re.compile(r"^\s*([a-z_][a-z0-9_]*)\s+[a-z]", re.IGNORECASE)
+_DEFAULT_RE = re.compile(r"DEFAULT\s+'((?:[^']|'')*)'::(\w+)|DEFAULT\s+(-?\d+(?:\.\d+)?|true|false)", re.IGNORECASE)
+_TABLE_RE = re.compile(r"CREATE TABLE IF NOT EXISTS\s+(?:public\.)?(\w+)\s*\((.*?)\n\)", re.IGNORECASE | re.DOTALL)
+
+
+def load_table_schemas(sql_path: Path = SCHEMA_SQL) -> Dict[str, Dict[str, Any]]:
+    """
+    Read column names and literal defaults from CREATE TABLE statements.
+
+    Returns:
+        Table name -> {column name: default value (None if no default)}
+    """
+    schemas: Dict[str, Dict[str, Any]] = {}
+    if not sql_path.exists():
+        return schemas
+    for table, body in _TABLE_RE.findall(sql_path.read_text(encoding="utf-8")):
+        columns: Dict[str, Any] = {}
+        for line in body.splitlines():
+            line = line.split("--")[0]
+            match = _COLUMN_RE.match(line)
+            if not match or match.group(1).upper() == "CONSTRAINT":
+                continue
+            default = None
+            found = _DEFAULT_RE.search(line)
+            if found and found.group(1) is not None:
+                literal, cast = found.group(1).replace("''", "'"), found.group(2).lower()
+                default = json.loads(literal) if cast in ("json", "jsonb") else literal
+            elif found and found.group(3) is not None:
+                raw = found.group(3).lower()
+                default = raw == "true" if raw in ("true", "false") else json.loads(raw)
+            columns[match.group(1)] = default
+        schemas[table] = columns
+    return schemas
+
+
+def _fake_jwt(payload: Dict[str, Any]) -> str:
+    """Unsigned JWT-shaped token (the stand-in never checks signatures)."""
+    def encode(data: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode(payload)}.aGVybWV0aWM"
+
+
+def _coerce(raw: str) -> Any:
+    """Best-effort conversion of a filter literal for ordered comparisons."""
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    if value is None:
+        return (2, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value))
+
+
+def _like(pattern: str, value: Any, ignore_case: bool) -> bool:
+    regex = "^" + ".*".join(re.escape(part) for part in pattern.replace("*", "%").split("%")) + "$"
+    return re.match(regex, str(value), re.IGNORECASE if ignore_case else 0) is not None
+
+
+def _matches(row: Dict[str, Any], column: str, expression: str) -> bool:
+    """Evaluate one PostgREST filter expression (e.g. 'eq.5', 'not.is.null')."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    value = row.get(column)
+
+    if op == "is":
+        result = value is None if raw == "null" else value is (raw == "true")
+    elif op == "in":
+        options = [o.strip('"') for o in raw.strip("()").split(",") if o != ""]
+        result = value is not None and str(value) in options
+    elif op in ("eq", "neq"):
+        if value is None:
+            equal = False
+        elif isinstance(value, bool):
+            equal = str(value).lower() == raw.lower()
+        elif isinstance(value, (int, float)):
+            equal = _coerce(raw) == value
+        else:
+            equal = str(value) == raw
+        result = equal if op == "eq" else not equal
+    elif op in ("gt", "gte", "lt", "lte"):
+        if value is None:
+            result = False
+        else:
+            left, right = _sort_key(value), _sort_key(_coerce(raw))
+            if left[0] != right[0]:
+                left, right = (1, str(value)), (1, raw)
+            result = {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+    elif op in ("like", "ilike"):
+        result = value is not None and _like(raw, value, op == "ilike")
+    else:
+        raise ValueError(f"Unsupported filter operator '{op}'")
+    return not result if negate else result
+
+
+class _StandInServer(ThreadingHTTPServer):
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients dropping a connection mid-request (e.g. cancelled tasks) is not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class PostgrestStandIn:
+    """Threaded HTTP server emulating the Supabase REST and auth APIs."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        sql_path: Path = SCHEMA_SQL
+    ):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            seed: Initial rows per table (default: DEFAULT_SEED)
+            sql_path: SQL file providing column names and defaults
+        """
+        self.host = host
+        self.port = port
+        self.schemas = load_table_schemas(sql_path)
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        # (table, key columns) -> {key values: row}, kept up to date by insert
+        self._indexes: Dict[Tuple[str, Tuple[str, ...]], Dict[Tuple[Any, ...], Dict[str, Any]]] = {}
+        self.lock = threading.RLock()
+        self.request_count = 0
+        self._server: Optional[_StandInServer] = None
+        self._thread: Optional[threading.Thread] = None
+        for table, rows in (DEFAULT_SEED if seed is None else seed).items():
+            self.insert(table, [dict(row) for row in rows])
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as SUPABASE_URL."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "PostgrestStandIn":
+        """Start serving in a daemon thread."""
+        handler = type("Handler", (_StandInHandler,), {"standin": self})
+        self._server = _StandInServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # Table operations (also usable directly from tests)
+
+    def _new_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = self.schemas.get(table, {})
+        full = {column: (json.loads(json.dumps(default)) if default is not None else None)
+                for column, default in defaults.items()}
+        full.update(row)
+        if full.get("id") is None:
+            existing = self.tables.get(table, [])
+            if existing and all(isinstance(r.get("id"), int) for r in existing):
+                full["id"] = max(r["id"] for r in existing) + 1
+            else:
+                full["id"] = str(uuid.uuid4())
+        return full
+
+    def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: Optional[List[str]] = None,
+        merge: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Insert rows (or upsert on ``on_conflict`` columns when ``merge``)."""
+        keys = on_conflict or ["id"]
+        with self.lock:
+            stored = self.tables.setdefault(table, [])
+            index = self._index(table, tuple(keys))
+            others = {columns: other for (name, columns), other in self._indexes.items()
+                      if name == table and other is not index}
+            result, merged = [], False
+            for row in rows:
+                key = tuple(row.get(k) for k in keys)
+                if None not in key and key in index:
+                    if not merge:
+                        raise KeyError(f"duplicate key value violates unique constraint on {table}({', '.join(keys)})")
+                    index[key].update(row)
+                    result.append(index[key])
+                    merged = True
+                    continue
+                new = self._new_row(table, row)
+                stored.append(new)
+                index[tuple(new.get(k) for k in keys)] = new
+                for columns, other in others.items():
+                    other[tuple(new.get(k) for k in columns)] = new
+                result.append(new)
+            if merged:
+                # Merged rows may have changed other indexes' key columns
+                for columns in others:
+                    del self._indexes[(table, columns)]
+            return [dict(r) for r in result]
+
+    def select(self, table: str, filters: List[Tuple[str, str]] = ()) -> List[Dict[str, Any]]:
+        """Rows of a table matching all filters (copies)."""
+        with self.lock:
+            return [dict(r) for r in self.tables.get(table, [])
+                    if all(_matches(r, column, expr) for column, expr in filters)]
+
+    def update(self, table: str, filters: List[Tuple[str, str]], changes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self.lock:
+            hits = [r for r in self.tables.get(table, [])
+                    if all(_matches(r, column, expr) for column, expr in filters)]
+            for row in hits:
+                row.update(changes)
+            self._drop_indexes(table)
+            return [dict(r) for r in hits]
+
+    def delete(self, table: str, filters: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.tables.get(table, [])
+            hits = [r for r in rows if all(_matches(r, column, expr) for column, expr in filters)]
+            hit_ids = {id(r) for r in hits}
+            self.tables[table] = [r for r in rows if id(r) not in hit_ids]
+            self._drop_indexes(table)
+            return [dict(r) for r in hits]
+
+    def _index(self, table: str, keys: Tuple[str, ...]) -> Dict[Tuple[Any, ...], Dict[str, Any]]:
+        """Rows of ``table`` by their ``keys`` values, built once and kept up to date by insert."""
+        index = self._indexes.get((table, keys))
+        if index is None:
+            index = {tuple(r.get(k) for k in keys): r for r in self.tables.get(table, [])}
+            self._indexes[(table, keys)] = index
+        return index
+
+    def embed(
+        self,
+        table: str,
+        row: Dict[str, Any],
+        alias: str,
+        name: str,
+        select: str,
+        project: Callable[[str, Dict[str, Any], str], Dict[str, Any]]
+    ) -> Any:
+        """
+        Resolve one embedded resource of ``row`` (there are no FK definitions,
+        so relationships are inferred from column names):
+
+        - ``alias:fk_column(...)``, e.g. ``contactos:contacto_id(id,nombre)``:
+          the row of table ``alias`` whose id is ``row[fk_column]`` (or None)
+        - ``child_table(...)``, e.g. ``comparativa_items(id)``: the rows of
+          ``child_table`` whose ``<singular table>_id`` equals ``row['id']``
+        """
+        with self.lock:
+            if name in row:
+                target = alias if alias in self.tables else name[:-len("_id")] + "s"
+                match = self._index(target, ("id",)).get((row.get(name),))
+                return project(target, dict(match), select) if match is not None else None
+            children = self.tables.get(name, [])
+            # comparativas -> comparativa_id, ciudades -> ciudad_id
+            candidates = [f"{table[:-1]}_id", f"{table[:-2]}_id"]
+            fk = next((c for c in candidates if children and c in children[0]), candidates[0])
+            return [project(name, dict(r), select) for r in children if r.get(fk) == row.get("id")]
+
+    def _drop_indexes(self, table: str) -> None:
+        for key in [key for key in self._indexes if key[0] == table]:
+            del self._indexes[key]
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Request handler bound to a PostgrestStandIn via the ``standin`` attribute."""
+
+    standin: PostgrestStandIn
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    # Response helpers
+
+    def _send(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = b"" if body is None else json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+        self.send_header("Access-Control-Allow-Credentials", "true")
+        self.send_header("Access-Control-Expose-Headers", "Content-Range, Content-Location")
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _error(self, status: int, message: str, code: str = "PGRST000") -> None:
+        self._send(status, {"code": code, "message": message, "details": None, "hint": None})
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw else None
+
+    def _prefer(self) -> Dict[str, str]:
+        prefer = {}
+        for part in (self.headers.get("Prefer") or "").split(","):
+            name, _, value = part.strip().partition("=")
+            if name:
+                prefer[name] = value
+        return prefer
+
+    # Routing
+
+    def do_OPTIONS(self) -> None:
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+        self.send_header("Access-Control-Allow-Credentials", "true")
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, POST, PATCH, PUT, DELETE, OPTIONS")
+        self.send_header(
+            "Access-Control-Allow-Headers",
+            self.headers.get("Access-Control-Request-Headers") or "*"
+        )
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self._dispatch()
+
+    def do_HEAD(self) -> None:
+        self._dispatch()
+
+    def do_POST(self) -> None:
+        self._dispatch()
+
+    def do_PATCH(self) -> None:
+        self._dispatch()
+
+    def do_DELETE(self) -> None:
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        self.standin.request_count += 1
+        parts = urlsplit(self.path)
+        try:
+            if parts.path.startswith("/rest/v1/"):
+                self._rest(parts.path[len("/rest/v1/"):].strip("/"), parse_qsl(parts.query, keep_blank_values=True))
+            elif parts.path.startswith("/auth/v1/"):
+                self._auth(parts.path[len("/auth/v1/"):].strip("/"), dict(parse_qsl(parts.query)))
+            else:
+                self._error(404, f"Unknown path {parts.path}")
+        except KeyError as e:
+            self._error(409, str(e).strip("'\""), code="23505")
+        except (ValueError, TypeError) as e:
+            self._error(400, str(e))
+
+    # Auth
+
+    def _session(self, email: str) -> Dict[str, Any]:
+        now = int(time.time())
+        user = {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, email)),
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "app_metadata": {"provider": "email"},
+            "user_metadata": {},
+            "created_at": "2024-01-01T00:00:00Z",
+        }
+        return {
+            "access_token": _fake_jwt({"sub": user["id"], "email": email, "role": "authenticated",
+                                       "aud": "authenticated", "exp": now + 3600, "iat": now}),
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "expires_at": now + 3600,
+            "refresh_token": _fake_jwt({"sub": user["id"], "email": email, "type": "refresh"}),
+            "user": user,
+        }
+
+    def _email_from_token(self, token: str) -> Optional[str]:
+        try:
+            payload = token.split(".")[1]
+            return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))).get("email")
+        except (IndexError, ValueError):
+            return None
+
+    def _auth(self, route: str, query: Dict[str, str]) -> None:
+        if route == "token" and self.command == "POST":
+            body = self._body() or {}
+            if query.get("grant_type") == "refresh_token":
+                email = self._email_from_token(body.get("refresh_token", ""))
+            else:
+                email = body.get("email")
+            if not email:
+                return self._error(400, "Invalid login credentials", code="invalid_grant")
+            return self._send(200, self._session(email))
+        if route == "user":
+            token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+            email = self._email_from_token(token)
+            if not email:
+                return self._error(401, "Invalid JWT", code="bad_jwt")
+            return self._send(200, self._session(email)["user"])
+        if route == "logout":
+            return self._send(204)
+        self._error(404, f"Unknown auth route {route}")
+
+    # REST
+
+    def _rest(self, table: str, query: List[Tuple[str, str]]) -> None:
+        prefer = self._prefer()
+        select, order, limit, offset, on_conflict = "*", None, None, 0, None
+        filters: List[Tuple[str, str]] = []
+        for key, value in query:
+            if key == "select":
+                select = value
+            elif key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key == "on_conflict":
+                on_conflict = value.split(",")
+            elif key == "columns":
+                continue
+            elif key in ("or", "and"):
+                raise ValueError(f"'{key}' filters are not supported by the stand-in")
+            else:
+                filters.append((key, value))
+
+        range_header = self.headers.get("Range")
+        if range_header and "-" in range_header:
+            start, _, end = range_header.partition("-")
+            offset, limit = int(start), int(end) - int(start) + 1
+
+        if self.command in ("GET", "HEAD"):
+            rows = self.standin.select(table, filters)
+        elif self.command == "POST":
+            body = self._body()
+            rows = self.standin.insert(
+                table, body if isinstance(body, list) else [body],
+                on_conflict=on_conflict,
+                merge=prefer.get("resolution") == "merge-duplicates"
+            )
+        elif self.command == "PATCH":
+            rows = self.standin.update(table, filters, self._body() or {})
+        else:
+            # Clients may send a body with DELETE; it must be consumed on keep-alive connections
+            self._body()
+            rows = self.standin.delete(table, filters)
+
+        total = len(rows)
+        if order:
+            for term in reversed(order.split(",")):
+                column, *modifiers = term.split(".")
+                rows.sort(key=lambda r: _sort_key(r.get(column)), reverse="desc" in modifiers)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        rows = [self._project(table, row, select) for row in rows]
+
+        headers = {}
+        count = f"{total}" if prefer.get("count") == "exact" else "*"
+        headers["Content-Range"] = f"{offset}-{offset + len(rows) - 1}/{count}" if rows else f"*/{count}"
+
+        if self.command not in ("GET", "HEAD") and prefer.get("return") != "representation":
+            return self._send(201 if self.command == "POST" else 204, None, headers)
+
+        if "vnd.pgrst.object" in (self.headers.get("Accept") or ""):
+            if len(rows) != 1:
+                return self._send(406, {
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(rows)} rows", "hint": None,
+                })
+            return self._send(200 if self.command != "POST" else 201, rows[0], headers)
+        self._send(200 if self.command != "POST" else 201, rows, headers)
+
+    def _project(self, table: str, row: Dict[str, Any], select: str) -> Dict[str, Any]:
+        """Apply a ``select`` list, expanding embedded resources (see PostgrestStandIn.embed)."""
+        items = _split_select(select)
+        if not items:
+            return row
+        projected: Dict[str, Any] = {}
+        for item in items:
+            head, paren, inner = item.partition("(")
+            alias, _, name = head.rpartition(":")
+            name = name.split("!")[0].strip()
+            if not paren:
+                if name == "*":
+                    projected.update(row)
+                else:
+                    projected[alias or name] = row.get(name)
+                continue
+            projected[alias or name] = self.standin.embed(
+                table, row, alias or name, name, inner[:inner.rindex(")")], self._project
+            )
+        return projected
+
+
+def _split_select(select: str) -> List[str]:
+    """Split a select list on its top-level commas (embedded selects stay whole)."""
+    items, depth, current = [], 0, []
+    for char in select:
+        if char == "," and depth == 0:
+            items.append("".join(current))
+            current = []
+            continue
+        depth += (char == "(") - (char == ")")
+        current.append(char)
+    items.append("".join(current))
+    return [re.sub(r"\s+", "", item) for item in items if item.strip()]
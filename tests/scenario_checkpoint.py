@@ -0,0 +1,142 @@
+"""
+Checkpoint/resume for multi-step scenarios.
+
+A scenario declares its steps with the test attributes each one reads
+(``inputs``) and sets (``outputs``):
+
+    STEPS = (
+        ScenarioStep("login", "test_login_and_navigate", replay=True),
+        ScenarioStep("create", "test_create_unidad", outputs=("created_unidad_id", "created_unidad_nombre")),
+        ScenarioStep("edit", "test_edit_unidad", inputs=("created_unidad_id", "created_unidad_nombre")),
+    )
+
+After every step the checkpoint file records the completed steps, the
+outputs so far and a snapshot of the database rows the scenario owns (taken
+by the scenario itself). When a step fails, the file keeps the failed step
+and error. Resuming restores the outputs and the rows, skips the completed
+steps and continues from the failed one; ``replay`` steps (login, which
+rebuilds the browser session from the session cache) run again anyway.
+
+Checkpoints live in ``tests/.checkpoints/<scenario>_<namespace>.json`` and
+are deleted when the scenario passes.
+"""
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# Checkpoints of failed scenario runs
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parent / ".checkpoints"
+
+
+@dataclass(frozen=True)
+class ScenarioStep:
+    """One step of a scenario: a test method and the state it reads and writes."""
+
+    name: str
+    method: str
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    # Run again on resume even when completed (steps rebuilding browser state)
+    replay: bool = False
+
+
+class ScenarioCheckpoint:
+    """Progress of one scenario run, persisted after every step."""
+
+    def __init__(
+        self,
+        scenario: str,
+        namespace: str,
+        base_url: str = "",
+        hermetic: bool = False,
+        checkpoint_dir: Path = DEFAULT_CHECKPOINT_DIR
+    ):
+        """
+        Args:
+            scenario: Scenario name, e.g. 'unidad_crud'
+            namespace: Run namespace (UnidadCRUDTest.test_timestamp), kept on
+                resume so test data names and fixtures still match
+            base_url: Base URL the run used
+            hermetic: Whether the run used the stand-in
+            checkpoint_dir: Where checkpoint files are written
+        """
+        self.scenario = scenario
+        self.namespace = namespace
+        self.base_url = base_url
+        self.hermetic = hermetic
+        self.path = Path(checkpoint_dir) / f"{scenario}_{namespace}.json"
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.completed: List[str] = []
+        self.values: Dict[str, Any] = {}
+        self.db_state: Dict[str, Any] = {}
+        self.failed_step: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "ScenarioCheckpoint":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        checkpoint = cls(data["scenario"], data["namespace"], data["base_url"], data["hermetic"], Path(path).parent)
+        checkpoint.path = Path(path)
+        checkpoint.created_at = data["created_at"]
+        checkpoint.completed = data["completed"]
+        checkpoint.values = data["values"]
+        checkpoint.db_state = data["db_state"]
+        checkpoint.failed_step = data.get("failed_step")
+        checkpoint.error = data.get("error")
+        return checkpoint
+
+    def save(self) -> None:
+        """Write atomically (a crash mid-write keeps the previous state)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "scenario": self.scenario,
+            "namespace": self.namespace,
+            "base_url": self.base_url,
+            "hermetic": self.hermetic,
+            "created_at": self.created_at,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "completed": self.completed,
+            "values": self.values,
+            "db_state": self.db_state,
+            "failed_step": self.failed_step,
+            "error": self.error,
+        }, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def complete(self, step: ScenarioStep, values: Dict[str, Any], db_state: Dict[str, Any]) -> None:
+        """Record a passed step with its outputs and the rows as they are now."""
+        if step.name not in self.completed:
+            self.completed.append(step.name)
+        self.values.update(values)
+        self.db_state = db_state
+        self.failed_step = None
+        self.error = None
+        self.save()
+
+    def fail(self, step: ScenarioStep, error: BaseException) -> None:
+        self.failed_step = step.name
+        self.error = f"{type(error).__name__}: {error}"
+        self.save()
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def pending(self, steps: Sequence[ScenarioStep]) -> List[ScenarioStep]:
+        """Steps still to run when resuming: replay steps plus everything not completed."""
+        return [step for step in steps if step.replay or step.name not in self.completed]
+
+
+def latest_checkpoint(scenario: str, checkpoint_dir: Path = DEFAULT_CHECKPOINT_DIR) -> Optional[Path]:
+    """Most recently written checkpoint of ``scenario``, if any."""
+    paths = sorted(Path(checkpoint_dir).glob(f"{scenario}_*.json"), key=lambda p: p.stat().st_mtime)
+    return paths[-1] if paths else None
+
+
+def missing_inputs(test: Any, step: ScenarioStep) -> List[str]:
+    """Inputs of ``step`` that are not set on ``test``."""
+    return [name for name in step.inputs if getattr(test, name, None) is None]
@@ -0,0 +1,196 @@
+"""
+Authenticated session snapshot/restore for the Angular dashboard.
+
+After a successful login the Supabase auth state (the ``sb-*`` localStorage
+entries written by supabase-js, plus any cookies) is saved to disk, keyed by
+base_url + email. Later runs inject that state and open ``/dashboard``
+directly, skipping the agent-driven login until the token expires.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+from angular_wait import probe_page
+from instrumentation import traced
+
+
+# Default location of the snapshots (override with SESSION_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".session_cache"
+
+# Treat tokens expiring within this many seconds as already expired
+EXPIRY_MARGIN_SECONDS = 60
+
+DUMP_AUTH_STORAGE_JS = """
+() => {
+    const entries = {};
+    for (let i = 0; i < localStorage.length; i++) {
+        const key = localStorage.key(i);
+        if (key.startsWith('sb-')) entries[key] = localStorage.getItem(key);
+    }
+    return entries;
+}
+"""
+
+LOAD_AUTH_STORAGE_JS = """
+(entries) => {
+    for (const [key, value] of Object.entries(entries)) localStorage.setItem(key, value);
+}
+"""
+
+
+def _cache_path(base_url: str, email: str) -> Path:
+    """Return the snapshot file for a base_url + email pair."""
+    cache_dir = Path(os.getenv("SESSION_CACHE_DIR", DEFAULT_CACHE_DIR))
+    key = hashlib.sha256(f"{base_url.rstrip('/')}|{email}".encode("utf-8")).hexdigest()[:16]
+    return cache_dir / f"session_{key}.json"
+
+
+def _token_expires_at(local_storage: Dict[str, str]) -> Optional[float]:
+    """Extract the earliest ``expires_at`` (epoch seconds) from the auth entries."""
+    expiries = []
+    for value in local_storage.values():
+        try:
+            data = json.loads(value)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(data, dict):
+            # supabase-js v2 stores the session itself, older versions nest it
+            session = data.get("currentSession", data)
+            if isinstance(session, dict) and session.get("expires_at"):
+                expiries.append(float(session["expires_at"]))
+    return min(expiries) if expiries else None
+
+
+def load_session(base_url: str, email: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a still-valid session snapshot from disk.
+
+    Expired or unreadable snapshots are deleted.
+
+    Args:
+        base_url: Base URL of the application
+        email: Email the session belongs to
+
+    Returns:
+        The snapshot dictionary, or None if there is no usable snapshot
+    """
+    path = _cache_path(base_url, email)
+    if not path.exists():
+        return None
+    try:
+        snapshot = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        path.unlink(missing_ok=True)
+        return None
+
+    expires_at = _token_expires_at(snapshot.get("local_storage", {}))
+    if expires_at is None or expires_at - EXPIRY_MARGIN_SECONDS <= time.time():
+        path.unlink(missing_ok=True)
+        return None
+    return snapshot
+
+
+def invalidate_session(base_url: str, email: str) -> None:
+    """Delete the cached session for base_url + email, if any."""
+    _cache_path(base_url, email).unlink(missing_ok=True)
+
+
+@traced(kind="session")
+async def save_session(agent: Agent, base_url: str, email: str) -> bool:
+    """
+    Snapshot the current authenticated browser state to disk.
+
+    Args:
+        agent: The browser-use Agent instance (must be logged in)
+        base_url: Base URL of the application
+        email: Email the session belongs to
+
+    Returns:
+        True if a snapshot containing an auth token was written
+    """
+    page = await get_current_page(agent)
+    if page is None:
+        return False
+    try:
+        local_storage = await page.evaluate(DUMP_AUTH_STORAGE_JS)
+        cookies = []
+        context = getattr(page, "context", None)
+        if context is not None and hasattr(context, "cookies"):
+            cookies = await context.cookies()
+    except Exception as e:
+        print(f"⚠ Could not snapshot session: {e}")
+        return False
+
+    if not local_storage or _token_expires_at(local_storage) is None:
+        return False
+
+    path = _cache_path(base_url, email)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so concurrent workers never read a partial file
+    tmp_path = path.with_suffix(f".{os.getpid()}.{id(agent)}.tmp")
+    tmp_path.write_text(json.dumps({
+        "base_url": base_url,
+        "email": email,
+        "saved_at": time.time(),
+        "local_storage": local_storage,
+        "cookies": cookies,
+    }), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return True
+
+
+@traced(kind="session")
+async def restore_session(
+    agent: Agent,
+    base_url: str,
+    email: str,
+    timeout_ms: int = 10000
+) -> bool:
+    """
+    Inject a cached session and open the dashboard directly.
+
+    Args:
+        agent: The browser-use Agent instance
+        base_url: Base URL of the application
+        email: Email the session belongs to
+        timeout_ms: How long to wait for the dashboard to render
+
+    Returns:
+        True if the dashboard loaded with the restored session. On False the
+        snapshot has been discarded and a normal login is required.
+    """
+    snapshot = load_session(base_url, email)
+    if snapshot is None:
+        return False
+    page = await get_current_page(agent)
+    if page is None:
+        return False
+
+    try:
+        # localStorage is per origin, so the app must be open before injecting
+        await page.goto(base_url)
+        await page.evaluate(LOAD_AUTH_STORAGE_JS, snapshot["local_storage"])
+        context = getattr(page, "context", None)
+        if snapshot.get("cookies") and context is not None and hasattr(context, "add_cookies"):
+            await context.add_cookies(snapshot["cookies"])
+        await page.goto(f"{base_url}/dashboard")
+        result = await probe_page(
+            page,
+            url_contains="/dashboard",
+            any_of=[".app-sidebar", ".app-content"],
+            abort_url_contains="/login",
+            timeout_ms=timeout_ms
+        )
+        restored = result["ok"]
+    except Exception as e:
+        print(f"⚠ Could not restore session: {e}")
+        restored = False
+
+    if not restored:
+        invalidate_session(base_url, email)
+    return bool(restored)
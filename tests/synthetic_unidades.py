@@ -0,0 +1,468 @@
+"""
+Streaming generator of synthetic unidades import files.
+
+Writes rows in the exact column layout of ``plantilla-unidades.csv`` to CSV
+and/or XLSX, one row at a time, so memory stays constant from a hundred rows
+to a million. Rows follow realistic distributions:
+
+- Proyectos are spread over real ciudad/barrio pairs, hold a skewed number of
+  unidades each and have a dominant tipoUnidad (buildings of apartamentos,
+  casas, chacras, campos)
+- Type-specific columns are filled as the importer expects: piso/m² for
+  Apartamento, superficie/plantas for Casa, hectáreas for Chacra/Campo
+- Prices are log-normal per tipo, scaled by size and by ciudad
+- A configurable fraction of rows is made invalid (missing required values,
+  values outside allowedValues, non-numeric numbers, negative numbers, bad
+  dates), mirroring the rules in ``unidades-import.config.ts``
+
+Usage:
+    python tests/synthetic_unidades.py --rows 1000000 --format csv xlsx \\
+        --invalid-fraction 0.02 --seed 42
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import time
+import zipfile
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+
+# Column layout of plantilla-unidades.csv
+TEMPLATE_CSV = Path(__file__).parent.parent / "plantilla-unidades.csv"
+
+# Default location of generated files
+DEFAULT_OUT_DIR = Path(__file__).parent / ".generated"
+
+COLUMNS = [
+    "nombreProyecto", "ciudad", "barrio", "nombre", "tipoUnidad", "piso", "dormitorios", "banos",
+    "m2Internos", "m2Totales", "superficieEdificada", "superficieTerreno", "plantas", "hectareas",
+    "altura", "orientacion", "distribucion", "estadoComercial", "precioUSD", "responsable",
+    "comision", "fechaEntrega", "terraza", "tamanoTerraza", "garage", "tamanoGarage",
+    "precioGarage", "amenities",
+]
+
+# Ciudad -> (weight, price factor, barrios)
+GEOGRAPHY: Dict[str, Tuple[float, float, List[str]]] = {
+    "Montevideo": (0.55, 1.0, [
+        "Pocitos", "Punta Carretas", "Cordón", "Centro", "Carrasco", "Malvín", "Buceo",
+        "Parque Rodó", "Prado", "Ciudad Vieja", "Tres Cruces", "La Blanqueada", "Punta Gorda",
+    ]),
+    "Canelones": (0.2, 0.75, [
+        "Ciudad de la Costa", "Solymar", "Lagomar", "Atlántida", "Pando", "Las Piedras",
+    ]),
+    "Maldonado": (0.18, 1.4, [
+        "Punta del Este", "La Barra", "Manantiales", "Piriápolis", "San Carlos", "José Ignacio",
+    ]),
+    "Rocha": (0.04, 0.8, ["La Paloma", "La Pedrera", "Punta del Diablo"]),
+    "Colonia": (0.03, 0.9, ["Colonia del Sacramento", "Carmelo", "Nueva Helvecia"]),
+}
+
+# tipoUnidad -> (weight of proyectos, median price USD, log-sigma)
+TIPOS: Dict[str, Tuple[float, float, float]] = {
+    "Apartamento": (0.7, 185000, 0.35),
+    "Casa": (0.2, 290000, 0.4),
+    "Chacra": (0.06, 240000, 0.45),
+    "Campo": (0.04, 900000, 0.6),
+}
+
+ORIENTACIONES = ["Norte", "Noreste", "Este", "Sudeste", "Sur", "Suroeste", "Oeste", "Noroeste"]
+DISTRIBUCIONES = [
+    "Frente/Esquinero", "Frente/Central", "Contrafrente/Esquinero", "Contrafrente/Central",
+    "Lateral", "Inferior",
+]
+ESTADOS = ["En venta", "Pre-venta", "En Pozo", "Reservada", "Vendida", "En alquiler"]
+ESTADOS_CUM_WEIGHTS = list(accumulate([0.55, 0.12, 0.1, 0.08, 0.1, 0.05]))
+SI_NO = ["Si", "No", "Extra"]
+TERRAZA_CUM_WEIGHTS = list(accumulate([0.5, 0.42, 0.08]))
+GARAGE_CUM_WEIGHTS = list(accumulate([0.45, 0.4, 0.15]))
+AMENITIES = {
+    "Apartamento": ["Piscina", "Ascensor", "Gimnasio", "Barbacoa", "Sauna", "Cowork", "Laundry", "Seguridad 24h"],
+    "Casa": ["Parrillero", "Jardín", "Quincho", "Piscina", "Garage", "Barbacoa"],
+    "Chacra": ["Piscina", "Quincho", "Monte frutal", "Galpón", "Pozo de agua"],
+    "Campo": ["Galpón", "Pozo de agua", "Alambrado", "Tajamar", "Casa principal"],
+}
+PROYECTO_PREFIXES = {
+    "Apartamento": ["Torre", "Edificio", "Residencial", "Nostrum", "Ocean", "Quartier"],
+    "Casa": ["Barrio", "Jardines de", "Lomas de", "Altos de"],
+    "Chacra": ["Chacras de", "Pueblo", "Haras"],
+    "Campo": ["Estancia", "Campo", "Establecimiento"],
+}
+RESPONSABLES = [
+    "Agente Juan Pérez", "Agente María González", "Agente Carlos Rodríguez", "Agente Lucía Fernández",
+    "Agente Diego Martínez", "Agente Sofía López", "Agente Martín Silva", "Agente Valentina Sosa",
+]
+
+# Ways a row can be made invalid, with the column each one breaks
+INVALID_KINDS = [
+    ("missing_required", "nombre"),
+    ("missing_required", "precioUSD"),
+    ("missing_required", "responsable"),
+    ("bad_enum", "tipoUnidad"),
+    ("bad_enum", "estadoComercial"),
+    ("bad_enum", "terraza"),
+    ("bad_enum", "garage"),
+    ("not_a_number", "dormitorios"),
+    ("not_a_number", "precioUSD"),
+    ("below_min", "banos"),
+    ("below_min", "comision"),
+    ("bad_date", "fechaEntrega"),
+]
+
+
+def template_columns(path: Path = TEMPLATE_CSV) -> List[str]:
+    """Header of plantilla-unidades.csv (falls back to COLUMNS)."""
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            return next(csv.reader(f))
+    except (OSError, StopIteration):
+        return list(COLUMNS)
+
+
+class _Proyecto:
+    """A generated proyecto and the running numbering of its unidades."""
+
+    def __init__(self, nombre: str, ciudad: str, barrio: str, tipo: str, price_factor: float,
+                 pisos: int, entrega: date, responsable: str, remaining: int):
+        self.nombre = nombre
+        self.ciudad = ciudad
+        self.barrio = barrio
+        self.tipo = tipo
+        self.price_factor = price_factor
+        self.pisos = pisos
+        self.entrega = entrega
+        self.responsable = responsable
+        self.remaining = remaining
+        self.count = 0
+
+
+class UnidadRowGenerator:
+    """Deterministic (seeded) stream of plantilla rows."""
+
+    def __init__(self, seed: int = 42, invalid_fraction: float = 0.0, mean_units_per_proyecto: int = 40,
+                 name_prefix: str = ""):
+        """
+        Args:
+            seed: Random seed; the same seed yields the same file
+            invalid_fraction: Fraction of rows (0-1) made invalid on purpose
+            mean_units_per_proyecto: Average size of a proyecto
+            name_prefix: Prepended to every unidad and proyecto nombre, so
+                the rows of one import can be found (and removed) later
+        """
+        if not 0 <= invalid_fraction <= 1:
+            raise ValueError("invalid_fraction must be between 0 and 1")
+        self.rng = random.Random(seed)
+        self.invalid_fraction = invalid_fraction
+        self.mean_units = max(1, mean_units_per_proyecto)
+        self.name_prefix = name_prefix
+        self.columns = template_columns()
+        self.invalid_counts: Dict[str, int] = {}
+        self._proyecto_seq = 0
+        self._open: List[_Proyecto] = []
+        self._ciudades = list(GEOGRAPHY)
+        self._ciudad_weights = [GEOGRAPHY[c][0] for c in self._ciudades]
+        self._tipos = list(TIPOS)
+        self._tipo_weights = [TIPOS[t][0] for t in self._tipos]
+
+    def _new_proyecto(self) -> _Proyecto:
+        rng = self.rng
+        self._proyecto_seq += 1
+        ciudad = rng.choices(self._ciudades, self._ciudad_weights)[0]
+        _, price_factor, barrios = GEOGRAPHY[ciudad]
+        barrio = rng.choice(barrios)
+        tipo = rng.choices(self._tipos, self._tipo_weights)[0]
+        # Skewed sizes: most proyectos are small, a few towers are large
+        size = max(1, int(rng.paretovariate(1.5) * self.mean_units / 3))
+        if tipo != "Apartamento":
+            size = max(1, size // 4)
+        nombre = f"{self.name_prefix}{rng.choice(PROYECTO_PREFIXES[tipo])} {barrio} {self._proyecto_seq}"
+        entrega = date(2024, 1, 1) + timedelta(days=rng.randint(0, 365 * 4))
+        pisos = rng.randint(3, 25) if tipo == "Apartamento" else 1
+        return _Proyecto(nombre, ciudad, barrio, tipo, price_factor, pisos, entrega,
+                         rng.choice(RESPONSABLES), size)
+
+    def _next_proyecto(self) -> _Proyecto:
+        # A few proyectos are open at once so rows of a proyecto are not
+        # always contiguous, as in real exports
+        while len(self._open) < 4:
+            self._open.append(self._new_proyecto())
+        proyecto = self.rng.choice(self._open)
+        proyecto.remaining -= 1
+        if proyecto.remaining <= 0:
+            self._open.remove(proyecto)
+        return proyecto
+
+    def _valid_row(self) -> Dict[str, Any]:
+        rng = self.rng
+        p = self._next_proyecto()
+        p.count += 1
+        row: Dict[str, Any] = dict.fromkeys(self.columns, "")
+        tipo = p.tipo
+        dormitorios = min(6, max(0, int(rng.gauss(2 if tipo == "Apartamento" else 3, 1))))
+        row.update({
+            "nombreProyecto": p.nombre,
+            "ciudad": p.ciudad,
+            "barrio": p.barrio,
+            "tipoUnidad": tipo,
+            "dormitorios": dormitorios,
+            "banos": max(1, min(4, dormitorios - rng.randint(0, 1))),
+            "orientacion": rng.choice(ORIENTACIONES),
+            "estadoComercial": rng.choices(ESTADOS, cum_weights=ESTADOS_CUM_WEIGHTS)[0],
+            "responsable": p.responsable,
+            "comision": rng.choice([2, 2.5, 3, 3, 3, 3.5, 4]),
+            "fechaEntrega": p.entrega.isoformat(),
+        })
+        median, sigma = TIPOS[tipo][1], TIPOS[tipo][2]
+        size_factor = 1.0
+        if tipo == "Apartamento":
+            piso = rng.randint(0, p.pisos)
+            m2_internos = max(28, int(rng.gauss(40 + 22 * dormitorios, 10)))
+            size_factor = m2_internos / 70
+            row.update({
+                "nombre": f"Apto {piso}{p.count % 100:02d}",
+                "piso": piso,
+                "m2Internos": m2_internos,
+                "m2Totales": m2_internos + rng.randint(0, 25),
+                "altura": p.pisos,
+                "distribucion": rng.choice(DISTRIBUCIONES),
+            })
+        elif tipo == "Casa":
+            edificada = max(50, int(rng.gauss(60 + 30 * dormitorios, 25)))
+            size_factor = edificada / 140
+            row.update({
+                "nombre": f"Casa {p.count}",
+                "superficieEdificada": edificada,
+                "superficieTerreno": edificada + rng.randint(60, 900),
+                "plantas": rng.choice([1, 1, 2, 2, 3]),
+                "altura": rng.choice([1, 2]),
+            })
+        else:
+            hectareas = round(rng.lognormvariate(math.log(3 if tipo == "Chacra" else 150), 0.7), 2)
+            size_factor = hectareas ** 0.35 / (3 if tipo == "Chacra" else 150) ** 0.35
+            row.update({
+                "nombre": f"{tipo} {p.count}",
+                "hectareas": hectareas,
+                "superficieEdificada": rng.randint(0, 400),
+            })
+        row["nombre"] = f"{self.name_prefix}{row['nombre']}"
+        precio = rng.lognormvariate(math.log(median), sigma) * size_factor * p.price_factor
+        row["precioUSD"] = int(round(precio, -3)) or 1000
+
+        terraza = rng.choices(SI_NO, cum_weights=TERRAZA_CUM_WEIGHTS)[0]
+        garage = rng.choices(SI_NO, cum_weights=GARAGE_CUM_WEIGHTS)[0]
+        row.update({
+            "terraza": terraza,
+            "tamanoTerraza": rng.randint(4, 40) if terraza != "No" else 0,
+            "garage": garage,
+            "tamanoGarage": rng.choice([12, 15, 18, 25]) if garage != "No" else 0,
+            "precioGarage": rng.choice([12000, 15000, 20000, 25000]) if garage == "Extra" else 0,
+        })
+        amenities = rng.sample(AMENITIES[tipo], rng.randint(0, min(4, len(AMENITIES[tipo]))))
+        if terraza == "Si":
+            amenities.append("Terraza")
+        if garage == "Si" and "Garage" not in amenities:
+            amenities.append("Garage")
+        row["amenities"] = ", ".join(amenities)
+        return row
+
+    def _corrupt(self, row: Dict[str, Any]) -> None:
+        kind, column = self.rng.choice(INVALID_KINDS)
+        if kind == "missing_required":
+            row[column] = ""
+        elif kind == "bad_enum":
+            row[column] = {"tipoUnidad": "Oficina", "estadoComercial": "Vendido?"}.get(column, "Tal vez")
+        elif kind == "not_a_number":
+            row[column] = self.rng.choice(["abc", "dos", "n/a"])
+        elif kind == "below_min":
+            row[column] = -1 if column == "comision" else 0
+        elif kind == "bad_date":
+            row[column] = self.rng.choice(["31/31/2025", "mañana", "2025-13-01"])
+        label = f"{kind}:{column}"
+        self.invalid_counts[label] = self.invalid_counts.get(label, 0) + 1
+
+    def rows(self, count: int) -> Iterator[List[Any]]:
+        """Yield ``count`` rows as lists in column order."""
+        for _ in range(count):
+            row = self._valid_row()
+            if self.invalid_fraction and self.rng.random() < self.invalid_fraction:
+                self._corrupt(row)
+            yield [row[c] for c in self.columns]
+
+    @property
+    def invalid_total(self) -> int:
+        return sum(self.invalid_counts.values())
+
+    @property
+    def proyectos_created(self) -> int:
+        return self._proyecto_seq
+
+
+def write_csv(path: Path, columns: Sequence[str], rows: Iterator[List[Any]]) -> int:
+    """Stream rows to a CSV file; returns the number of rows written."""
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(out: TextIO, number: int, values: Sequence[Any]) -> None:
+    cells = []
+    for i, value in enumerate(values):
+        if value == "" or value is None:
+            continue
+        ref = f"{_column_letter(i)}{number}"
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    out.write(f'<row r="{number}">{"".join(cells)}</row>')
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Unidades" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def write_xlsx(path: Path, columns: Sequence[str], rows: Iterator[List[Any]]) -> int:
+    """
+    Stream rows to a single-sheet XLSX file; returns the number of rows written.
+
+    The sheet XML is written straight into the zip entry with inline strings,
+    so nothing is buffered per row (unlike shared-string writers).
+    """
+    written = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_STATIC.items():
+            zf.writestr(name, content)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as raw:
+            out = io.TextIOWrapper(raw, encoding="utf-8")
+            out.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            _xlsx_row(out, 1, columns)
+            for row in rows:
+                written += 1
+                _xlsx_row(out, written + 1, row)
+            out.write("</sheetData></worksheet>")
+            out.flush()
+            out.detach()
+    return written
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+def generate(
+    rows: int,
+    out_dir: Path = DEFAULT_OUT_DIR,
+    formats: Sequence[str] = ("csv",),
+    invalid_fraction: float = 0.0,
+    seed: int = 42,
+    stem: Optional[str] = None,
+    name_prefix: str = ""
+) -> Dict[str, Any]:
+    """
+    Generate one file per format with the same (seeded) rows.
+
+    Args:
+        rows: Number of data rows
+        out_dir: Output directory (created if needed)
+        formats: Any of 'csv', 'xlsx'
+        invalid_fraction: Fraction of rows made invalid on purpose
+        seed: Random seed
+        stem: File name stem (default: unidades_<rows>)
+        name_prefix: Prepended to every unidad and proyecto nombre
+
+    Returns:
+        Summary with the written paths, row/invalid counts per kind, number of
+        proyectos and generation time per format
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = stem or f"unidades_{rows}"
+    summary: Dict[str, Any] = {"rows": rows, "seed": seed, "invalid_fraction": invalid_fraction, "files": {}}
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unsupported format '{fmt}' (expected one of {', '.join(WRITERS)})")
+        generator = UnidadRowGenerator(seed=seed, invalid_fraction=invalid_fraction, name_prefix=name_prefix)
+        path = out_dir / f"{stem}.{fmt}"
+        started = time.perf_counter()
+        WRITERS[fmt](path, generator.columns, generator.rows(rows))
+        summary["files"][fmt] = {"path": str(path), "seconds": round(time.perf_counter() - started, 2)}
+        # Same seed -> same rows for every format
+        summary["invalid_rows"] = generator.invalid_total
+        summary["invalid_by_kind"] = dict(sorted(generator.invalid_counts.items()))
+        summary["proyectos"] = generator.proyectos_created
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic unidades import files.")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of data rows")
+    parser.add_argument("--format", nargs="+", default=["csv"], choices=sorted(WRITERS), dest="formats")
+    parser.add_argument("--invalid-fraction", type=float, default=0.0,
+                        help="Fraction of rows made invalid on purpose (0-1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR)
+    parser.add_argument("--stem", help="File name stem (default: unidades_<rows>)")
+    args = parser.parse_args()
+
+    summary = generate(args.rows, args.out_dir, args.formats, args.invalid_fraction, args.seed, args.stem)
+    for fmt, info in summary["files"].items():
+        print(f"✓ {fmt.upper()}: {info['path']} ({summary['rows']} rows, {info['seconds']}s)")
+    print(f"  Proyectos: {summary['proyectos']}, invalid rows: {summary['invalid_rows']}")
+    for kind, count in summary["invalid_by_kind"].items():
+        print(f"    {kind}: {count}")
+
+
+if __name__ == "__main__":
+    main()
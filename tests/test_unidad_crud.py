@@ -4,23 +4,39 @@ Automated test for CRUD operations on Unidades (Real Estate Units) in Angular Da
 This test verifies that UI actions correctly persist data in Supabase database.
 Test Scenario: Create, edit, and delete a unidad inside a Proyecto.
 """
+import argparse
 import asyncio
 import os
 import sys
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from browser_use import Agent
+from supabase import AsyncClient
+from browser_use import Agent, BrowserSession
 from langchain_openai import ChatOpenAI
 
 # Add tests directory to path for imports
 tests_dir = Path(__file__).parent
 sys.path.insert(0, str(tests_dir))
 
-# Import login function
+# Import test helpers
 from login_to_dashboard import login_to_dashboard
+from form_fill import fill_form, ANY_OPTION
+from trajectory_cache import run_cached
+from db_verify import get_async_client, UnidadVerifier
+from db_fixtures import FixtureSet, sweep_orphans
+from angular_wait import wait_for_angular
+from instrumentation import annotate, format_flame, record, start_trace, trace_step, traced, write_trace, Span
+from network_capture import NetworkCapture, attach_capture, capture_enabled, drain_capture, use_network_capture
+from hermetic import SCRIPTED_AGENT_OPTIONS, HermeticEnvironment, ScriptedLLM, is_hermetic
+from browser_pool import BrowserPool, Lease, close_shared_pool, pool_enabled, shared_pool
+from scenario_checkpoint import ScenarioCheckpoint, ScenarioStep, latest_checkpoint, missing_inputs
+from perf_store import record_scenario_run, store_enabled
+from flight_recorder import FlightRecorder, new_recorder, use_flight_recorder
+from model_router import ModelRouter, new_router, use_model_router
+from browser_page import get_current_page
 
 # Load environment variables
 load_dotenv()
@@ -29,16 +45,77 @@ load_dotenv()
 class UnidadCRUDTest:
     """Test class for Unidad CRUD operations with database verification."""
     
-    def __init__(self, base_url: str = "http://localhost:4200"):
+    SCENARIO = "unidad_crud"
+    
+    # Steps of run_all_tests, with the state each one needs and produces
+    STEPS = (
+        ScenarioStep("login", "test_login_and_navigate", replay=True),
+        ScenarioStep("create", "test_create_unidad", outputs=("created_unidad_id", "created_unidad_nombre")),
+        ScenarioStep("edit", "test_edit_unidad", inputs=("created_unidad_id", "created_unidad_nombre")),
+        ScenarioStep("delete", "test_delete_unidad", inputs=("created_unidad_id", "created_unidad_nombre")),
+    )
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:4200",
+        namespace: Optional[str] = None,
+        hermetic: Optional[bool] = None,
+        resume: Optional[ScenarioCheckpoint] = None
+    ):
+        """
+        Args:
+            base_url: Base URL of the application
+            namespace: Optional label (e.g. worker/scenario id) added to the
+                test data names, useful when several instances run at once
+            hermetic: Run against the local stand-in with scripted agent
+                steps (default: HERMETIC env var, see hermetic.py)
+            resume: Checkpoint of a failed run to continue from its failed
+                step (its namespace, base_url and hermetic mode are reused)
+        """
+        if resume is not None:
+            base_url, hermetic = resume.base_url or base_url, resume.hermetic
         self.base_url = base_url
+        self.hermetic = is_hermetic() if hermetic is None else hermetic
+        self.hermetic_env: Optional[HermeticEnvironment] = None
         self.agent: Optional[Agent] = None
-        self.supabase: Optional[Client] = None
+        self.browser_pool: Optional[BrowserPool] = None
+        self.browser_lease: Optional[Lease] = None
+        # Own browser of the agent when the pool is off (BROWSER_POOL=0)
+        self.browser_session: Optional[BrowserSession] = None
+        self.supabase: Optional[AsyncClient] = None
+        self.db: Optional[UnidadVerifier] = None
+        self.fixtures: Optional[FixtureSet] = None
+        self.network: Optional[NetworkCapture] = None
+        self.recorder: Optional[FlightRecorder] = None
+        self.router: Optional[ModelRouter] = None
+        self.trace: Optional[Span] = None
+        # Repetition batch this run belongs to (see perf_store.py)
+        self.perf_batch: Optional[str] = None
         self.created_unidad_id: Optional[str] = None
         self.created_unidad_nombre: Optional[str] = None
-        self.test_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
+        # Second-resolution timestamps collide between concurrent runs, so a
+        # random suffix keeps 'Test Unidad {timestamp}' unique
+        self.test_timestamp = "_".join(filter(None, [
+            datetime.now().strftime("%Y%m%d_%H%M%S"),
+            namespace,
+            uuid.uuid4().hex[:8],
+        ]))
+        self.resume = resume
+        if resume is not None:
+            self.test_timestamp = resume.namespace
+            for name, value in resume.values.items():
+                setattr(self, name, value)
+        self.checkpoint = resume or ScenarioCheckpoint(
+            self.SCENARIO, self.test_timestamp, self.base_url, self.hermetic
+        )
+        
+    @traced(kind="setup")
     async def setup(self):
         """Initialize BrowserUse Agent and Supabase client."""
+        if self.hermetic:
+            await self._setup_hermetic()
+            return
+        
         # Initialize Supabase client
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_KEY")
@@ -49,7 +126,13 @@ class UnidadCRUDTest:
                 "See tests/env.example for reference."
             )
         
-        self.supabase = create_client(supabase_url, supabase_key)
+        self.supabase = await get_async_client(supabase_url, supabase_key)
+        self.db = UnidadVerifier(self.supabase)
+        # Claim this run's namespace first: a resumed run's data must not be swept
+        self._open_fixtures(supabase_url)
+        swept = await sweep_orphans(self.supabase, supabase_url)
+        if swept:
+            print(f"✓ Removed test data left by {len(swept)} crashed run(s)")
         
         # Initialize BrowserUse Agent with LLM
         openai_key = os.getenv("OPENAI_API_KEY")
@@ -59,93 +142,172 @@ class UnidadCRUDTest:
                 "See tests/env.example for reference."
             )
         
-        llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            temperature=0,
-            api_key=openai_key
-        )
+        # Steps are routed to a model per tier (see model_router.py); the
+        # agent's own model is the navigation tier's
+        self.router = new_router(lambda model: ChatOpenAI(model=model, temperature=0, api_key=openai_key))
+        use_model_router(self.router)
+        if self.router:
+            llm = self.router.llm("navigation")
+        else:
+            llm = ChatOpenAI(
+                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                temperature=0,
+                api_key=openai_key
+            )
         
         self.agent = Agent(
             task="Test Unidad CRUD operations",
-            llm=llm
+            llm=llm,
+            **await self._browser_options()
         )
+        # Before any navigation, so the app boots with the capture in place
+        await attach_capture(self.agent, start=True)
         
         print("✓ Setup complete: Agent and Supabase client initialized")
     
+    async def _setup_hermetic(self):
+        """Start the PostgREST stand-in and use scripted agent steps."""
+        self.hermetic_env = HermeticEnvironment().start()
+        self.supabase = await get_async_client(
+            self.hermetic_env.supabase_url, self.hermetic_env.supabase_key
+        )
+        self.db = UnidadVerifier(self.supabase)
+        self._open_fixtures(self.hermetic_env.supabase_url)
+        
+        # Steps are scripted; the LLM only guards against unscripted calls
+        self.agent = Agent(
+            task="Test Unidad CRUD operations",
+            llm=ScriptedLLM(),
+            **SCRIPTED_AGENT_OPTIONS,
+            **await self._browser_options()
+        )
+        await attach_capture(self.agent, start=True)
+        
+        print(f"✓ Setup complete (hermetic): stand-in at {self.hermetic_env.supabase_url}")
+    
+    async def _browser_options(self) -> Dict[str, Any]:
+        """Agent kwargs using a context leased from the warm browser pool, or the agent's own browser with BROWSER_POOL=0."""
+        if not pool_enabled():
+            # Agent.run() closes a browser it launched itself at the end of
+            # every step, so the session is kept alive until teardown
+            self.browser_session = await BrowserSession(keep_alive=True).start()
+            return {"browser_session": self.browser_session}
+        self.browser_pool = await shared_pool(self.base_url)
+        self.browser_lease = await self.browser_pool.acquire()
+        annotate(browser_lease_ms=round(self.browser_lease.wait_ms, 1), browser_warm=self.browser_lease.warm)
+        print(f"✓ Browser context leased in {self.browser_lease.wait_ms:.0f} ms"
+              + ("" if self.browser_lease.warm else " (cold)"))
+        return {"browser_session": await self.browser_lease.browser_session()}
+    
+    def _open_fixtures(self, supabase_url: str):
+        """Register this run's namespace, covering the unidad created through the UI."""
+        self.fixtures = FixtureSet(
+            self.supabase,
+            namespace=self.test_timestamp,
+            url=supabase_url,
+            name_patterns=[f"Test Unidad {self.test_timestamp}*"]
+        )
+        self.fixtures.register()
+    
+    async def seed_fixtures(self, spec: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bulk-insert scenario data in this run's namespace (see db_fixtures.py).
+        
+        Returns:
+            Seeded rows by key, including their IDs
+        """
+        return await self.fixtures.seed(spec)
+    
     async def teardown(self):
         """Clean up resources."""
+        if self.network and self.agent:
+            # Requests after the last agent step are still in the page
+            await drain_capture(self.agent)
+        if self.fixtures and self.checkpoint.failed_step:
+            # The failed run's data is what --resume continues from
+            print(f"⚠ Keeping test data of {self.test_timestamp} for --resume "
+                  f"(checkpoint: {self.checkpoint.path})")
+        elif self.fixtures:
+            try:
+                deleted = await self.fixtures.teardown()
+                print(f"✓ Test data removed: {deleted}")
+            except Exception as e:
+                # Stays registered; the next run's sweep retries it
+                print(f"⚠ Could not remove test data: {e}")
         if self.agent:
             await self.agent.close()
+        if self.browser_lease:
+            await self.browser_pool.release(self.browser_lease)
+            self.browser_lease = None
+        if self.browser_session:
+            await self.browser_session.kill()
+            self.browser_session = None
+        if self.hermetic_env:
+            self.hermetic_env.stop()
+        if self.recorder:
+            self.recorder.close()
         print("✓ Teardown complete")
     
-    async def take_screenshot(self, name: str):
-        """Take a screenshot for debugging."""
+    async def take_screenshot(self, name: str, error: Optional[BaseException] = None):
+        """
+        Write the flight recorder's last steps and the current page to an HTML report.
+        
+        Args:
+            name: Report name, e.g. 'test_failure'
+            error: The failure, shown at the top of the report
+        """
+        if not self.recorder:
+            return
         try:
-            if self.agent and hasattr(self.agent, 'browser'):
-                screenshot_path = f"tests/screenshots/{name}_{self.test_timestamp}.png"
-                os.makedirs("tests/screenshots", exist_ok=True)
-                # Note: Actual screenshot implementation depends on browser-use API
-                print(f"📸 Screenshot saved: {screenshot_path}")
+            page = await get_current_page(self.agent) if self.agent else None
+            path = await self.recorder.dump(page, f"{name}_{self.test_timestamp}", error)
+            print(f"📸 Failure report saved: {path}")
         except Exception as e:
-            print(f"⚠ Could not take screenshot: {e}")
+            print(f"⚠ Could not write the failure report: {e}")
     
+    @traced(kind="verify")
     async def verify_unidad_in_db(
         self, 
         nombre: str, 
         expected_precio: Optional[float] = None,
-        should_exist: bool = True
+        should_exist: bool = True,
+        unidad_id: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Verify unidad exists in Supabase database.
         
+        Polls with exponential backoff until the UI's save is visible (or the
+        timeout is reached), reading only the asserted columns. Looks the
+        unidad up by primary key when ``unidad_id`` is given.
+        
         Args:
             nombre: Name of the unidad to search for
             expected_precio: Expected price value (optional)
             should_exist: Whether the unidad should exist in DB
+            unidad_id: Primary key of the unidad, if already known
             
         Returns:
             Dictionary with unidad data if found, None otherwise
         """
+        lookup = {"unidad_id": unidad_id} if unidad_id else {"nombre": nombre}
         try:
-            response = self.supabase.table("unidades")\
-                .select("*")\
-                .eq("nombre", nombre)\
-                .is_("deleted_at", "null")\
-                .execute()
-            
-            unidades = response.data if response.data else []
-            
             if should_exist:
-                assert len(unidades) == 1, (
-                    f"Expected 1 unidad with nombre '{nombre}', "
-                    f"found {len(unidades)}. Data: {unidades}"
-                )
-                
-                unidad = unidades[0]
-                
+                expected: Dict[str, Any] = {"nombre": nombre}
                 if expected_precio is not None:
-                    precio_db = unidad.get("precio")
-                    assert precio_db == expected_precio, (
-                        f"Price mismatch. Expected: {expected_precio}, "
-                        f"Found in DB: {precio_db}"
-                    )
-                
+                    expected["precio"] = expected_precio
+                unidad = await self.db.assert_exists(expected, **lookup)
                 print(f"✓ Database verification passed for unidad '{nombre}'")
                 return unidad
             else:
-                assert len(unidades) == 0, (
-                    f"Expected 0 unidades with nombre '{nombre}', "
-                    f"found {len(unidades)}. Data: {unidades}"
-                )
+                await self.db.assert_deleted(**lookup)
                 print(f"✓ Database verification passed: unidad '{nombre}' deleted")
                 return None
                 
         except Exception as e:
             print(f"❌ Database verification failed: {e}")
-            if response and hasattr(response, 'data'):
-                print(f"   Found data: {response.data}")
             raise
     
+    @traced("TASK 1: Login and Navigate", kind="task")
     async def test_login_and_navigate(self):
         """Task 1: Login and navigate to Unidades page."""
         print("\n" + "="*60)
@@ -157,33 +319,44 @@ class UnidadCRUDTest:
             agent=self.agent,
             base_url=self.base_url,
             email="testuser@test.com",
-            password="testuser"
+            password="testuser",
+            # Stand-in sessions must not be restored against the real backend
+            use_session_cache=not self.hermetic
         )
         
         # Wait for dashboard to be fully loaded
-        await self.agent.run(
-            "Wait for the dashboard to be fully loaded. Look for elements like "
-            "cards showing statistics or the sidebar navigation menu. "
-            "Wait until Angular has finished rendering all components."
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt=(
+                "Wait for the dashboard to be fully loaded. Look for elements like "
+                "cards showing statistics or the sidebar navigation menu."
+            ),
+            url_contains="/dashboard",
+            any_of=[".cards-container-4", ".app-sidebar"]
         )
         
         # Navigate to Unidades page via sidebar
-        await self.agent.run(
+        await run_cached(
+            self.agent,
             "Click on the sidebar navigation item labeled 'Proyectos' "
-            "(which links to /unidades). Wait for the page to load completely."
+            "(which links to /unidades)."
         )
         
-        # Wait for Unidades table/list to appear
-        await self.agent.run(
-            "Wait for the Unidades page to fully load. Look for:\n"
-            "- A table or list showing unidades\n"
-            "- A button labeled 'Nuevo' (New) button\n"
-            "- The page title showing 'Unidades' or 'Proyectos'\n"
-            "Do not proceed until these elements are visible and Angular has finished rendering."
+        # Wait for Unidades table/list and the 'Nuevo' button to appear
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt=(
+                "Wait for the Unidades page to fully load: a table or list showing unidades "
+                "and a button labeled 'Nuevo' must be visible."
+            ),
+            url_contains="/unidades",
+            any_of=[".unidades-table", ".clickable-cards-container"],
+            text="Nuevo"
         )
         
         print("✓ Successfully logged in and navigated to Unidades page")
     
+    @traced("TASK 2: Create New Unidad", kind="task")
     async def test_create_unidad(self):
         """Task 2: Create a new unidad inside a proyecto."""
         print("\n" + "="*60)
@@ -195,128 +368,78 @@ class UnidadCRUDTest:
         test_precio = 500000
         
         # Click "Nuevo" button to open form modal
-        await self.agent.run(
-            "Find and click the 'Nuevo' button to open the new unidad form modal. "
-            "Wait for the modal to appear and be fully rendered."
+        await run_cached(
+            self.agent,
+            "Find and click the 'Nuevo' button to open the new unidad form modal."
         )
         
         # Wait for modal to be visible
-        await self.agent.run(
-            "Wait for the unidad form modal to be visible. Look for:\n"
-            "- Modal title 'Nueva Unidad'\n"
-            "- Tabs: 'Datos Básicos', 'Proyecto / Ubicación', 'Extras y Equipamiento'\n"
-            "- Form fields in the 'Datos Básicos' tab\n"
-            "Do not proceed until the modal is fully rendered."
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt="Wait for the 'Nueva Unidad' form modal and its tabs to be visible.",
+            any_of=["ngb-modal-window .nav-tabs"],
+            text="Nueva Unidad"
         )
         
-        # Fill Tab 1: Datos Básicos
+        # Fill Tab 1: Datos Básicos (one batched step, agent only for leftovers)
         print("  Filling 'Datos Básicos' tab...")
-        
-        # Select Tipo de Propiedad (Type)
-        await self.agent.run(
-            "In the 'Datos Básicos' tab, find the 'Tipo de Propiedad' dropdown "
-            "and select 'Apartamento'"
-        )
-        
-        # Fill Nombre (Name)
-        await self.agent.run(
-            f"Find the 'Nombre' text input field and type '{self.created_unidad_nombre}'"
-        )
-        
-        # Fill Piso (Floor) - required for Apartamento
-        await self.agent.run(
-            "Find the 'Piso' number input field and type '5'"
-        )
-        
-        # Fill Dormitorios (Bedrooms)
-        await self.agent.run(
-            "Find the 'Dormitorios' number input field and type '2'"
-        )
-        
-        # Fill Baños (Bathrooms)
-        await self.agent.run(
-            "Find the 'Baños' number input field and type '1'"
-        )
-        
-        # Fill m2Internos (Internal m²)
-        await self.agent.run(
-            "Find the 'Tamaño Interior (m²)' number input field and type '75'"
-        )
-        
-        # Fill m2Totales (Total m²)
-        await self.agent.run(
-            "Find the 'Tamaño Total (m²)' number input field and type '90'"
-        )
-        
-        # Fill Orientación (Orientation)
-        await self.agent.run(
-            "Find the 'Orientación' dropdown and select any available option "
-            "(e.g., 'Norte', 'Sur', 'Este', 'Oeste')"
-        )
-        
-        # Fill Distribución (Layout)
-        await self.agent.run(
-            "Find the 'Distribución' dropdown and select any available option"
-        )
-        
-        # Fill Altura (Height)
-        await self.agent.run(
-            "Find the 'Altura' text input field and type '3.5'"
-        )
-        
-        # Fill Responsable (Agent/Responsible)
-        await self.agent.run(
-            "Find the 'Responsable' text input field and type 'Test Agent'"
-        )
-        
-        # Fill Precio (Price)
-        await self.agent.run(
-            f"Find the 'Precio (USD)' number input field and type '{test_precio}'"
-        )
-        
-        # Fill Comisión (Commission)
-        await self.agent.run(
-            "Find the 'Comisión (%)' number input field and type '3'"
-        )
+        await fill_form(self.agent, {
+            "Datos Básicos": {
+                "Tipo de Propiedad": "Apartamento",
+                "Nombre": self.created_unidad_nombre,
+                "Piso": 5,  # required for Apartamento
+                "Dormitorios": 2,
+                "Baños": 1,
+                "Tamaño Interior (m²)": 75,
+                "Tamaño Total (m²)": 90,
+                "Orientación": ANY_OPTION,
+                "Distribución": ANY_OPTION,
+                "Altura": "3.5",
+                "Responsable": "Test Agent",
+                "Precio (USD)": test_precio,
+                "Comisión (%)": 3,
+            },
+        })
         
         # Navigate to Tab 2: Proyecto / Ubicación
         print("  Filling 'Proyecto / Ubicación' tab...")
-        await self.agent.run(
-            "Click on the 'Proyecto / Ubicación' tab to switch to that tab. "
-            "Wait for the tab content to load."
-        )
-        
-        # Select or create proyecto
-        await self.agent.run(
-            "In the 'Proyecto / Ubicación' tab, select 'Proyecto Existente' radio button "
-            "if not already selected. Then find the proyecto dropdown and select the first "
+        await fill_form(self.agent, {
+            "Proyecto / Ubicación": {"Proyecto Existente": True},
+        })
+        
+        # Select or create proyecto (needs judgement, stays with the agent)
+        await run_cached(
+            self.agent,
+            "In the 'Proyecto / Ubicación' tab, find the proyecto dropdown and select the first "
             "available proyecto from the list. If no proyectos exist, select 'Nuevo Proyecto' "
             "and fill in a proyecto name like 'Test Proyecto'."
         )
         
-        # Fill Ciudad (City) - if not auto-filled by proyecto
-        await self.agent.run(
-            "Find the 'Ciudad' dropdown and select 'Montevideo' (or 'norte' if that's the option). "
-            "Wait for barrios to load."
-        )
-        
-        # Fill Barrio (Neighborhood)
-        await self.agent.run(
-            "Find the 'Barrio' dropdown and select any available barrio option"
-        )
+        # Fill Ciudad/Barrio - skipped automatically if inherited from the proyecto
+        await fill_form(self.agent, {
+            "Proyecto / Ubicación": {
+                "Ciudad": ["Montevideo", "norte"],
+                "Barrio": ANY_OPTION,
+            },
+        })
         
         # Save the unidad
         print("  Saving unidad...")
-        await self.agent.run(
-            "Find and click the 'Guardar' or 'Save' button to save the unidad. "
-            "Wait for the success notification or toast message to appear."
+        await run_cached(
+            self.agent,
+            "Find and click the 'Guardar' or 'Save' button to save the unidad."
         )
         
-        # Wait for success notification
-        await self.agent.run(
-            "Wait for a success toast notification or message indicating the unidad "
-            "was saved successfully. Also wait for the modal to close and the unidades "
-            "list/table to refresh showing the new unidad."
+        # Wait for success toast, modal closed and list refreshed
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt=(
+                "Wait for a success toast notification indicating the unidad was saved, "
+                "and for the modal to close."
+            ),
+            any_of=[".toast-success"],
+            absent=["ngb-modal-window"],
+            timeout_ms=15000
         )
         
         # Verify in database
@@ -333,6 +456,7 @@ class UnidadCRUDTest:
         
         print("✓ CREATE test passed")
     
+    @traced("TASK 3: Edit Unidad", kind="task")
     async def test_edit_unidad(self):
         """Task 3: Edit the created unidad."""
         print("\n" + "="*60)
@@ -345,37 +469,44 @@ class UnidadCRUDTest:
         new_precio = 550000
         
         # Find and click edit button for the unidad
-        await self.agent.run(
-            f"Find the unidad with name '{self.created_unidad_nombre}' in the table/list. "
-            "Look for the edit button (usually a pencil icon or 'Editar' link) and click it. "
-            "Wait for the edit modal to open."
+        await run_cached(
+            self.agent,
+            "Find the unidad with name '{nombre}' in the table/list. "
+            "Look for the edit button (usually a pencil icon or 'Editar' link) and click it.",
+            params={"nombre": self.created_unidad_nombre}
         )
         
-        # Wait for edit modal
-        await self.agent.run(
-            "Wait for the unidad edit form modal to be visible. Look for:\n"
-            "- Modal title 'Editar Unidad'\n"
-            "- Form fields pre-filled with the unidad data\n"
-            "Do not proceed until the modal is fully rendered."
+        # Wait for edit modal (pre-filled once the unidad has loaded)
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt="Wait for the 'Editar Unidad' form modal to be visible and pre-filled.",
+            any_of=["ngb-modal-window .nav-tabs"],
+            text="Editar Unidad"
         )
         
         # Update price
         print("  Updating precio...")
-        await self.agent.run(
-            f"Find the 'Precio (USD)' number input field, clear it, and type '{new_precio}'"
-        )
+        await fill_form(self.agent, {
+            "Datos Básicos": {"Precio (USD)": new_precio},
+        })
         
         # Save changes
         print("  Saving changes...")
-        await self.agent.run(
-            "Find and click the 'Guardar' or 'Save' button to save the changes. "
-            "Wait for the success notification to appear."
+        await run_cached(
+            self.agent,
+            "Find and click the 'Guardar' or 'Save' button to save the changes."
         )
         
         # Wait for success
-        await self.agent.run(
-            "Wait for a success toast notification indicating the unidad was updated. "
-            "Also wait for the modal to close and the list to refresh."
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt=(
+                "Wait for a success toast notification indicating the unidad was updated, "
+                "and for the modal to close."
+            ),
+            any_of=[".toast-success"],
+            absent=["ngb-modal-window"],
+            timeout_ms=15000
         )
         
         # Verify update in database
@@ -383,11 +514,13 @@ class UnidadCRUDTest:
         await self.verify_unidad_in_db(
             nombre=self.created_unidad_nombre,
             expected_precio=new_precio,
-            should_exist=True
+            should_exist=True,
+            unidad_id=self.created_unidad_id
         )
         
         print("✓ EDIT test passed")
     
+    @traced("TASK 4: Delete Unidad", kind="task")
     async def test_delete_unidad(self):
         """Task 4: Delete the unidad."""
         print("\n" + "="*60)
@@ -398,43 +531,173 @@ class UnidadCRUDTest:
             raise Exception("Cannot delete: No unidad was created")
         
         # Find and click delete button
-        await self.agent.run(
-            f"Find the unidad with name '{self.created_unidad_nombre}' in the table/list. "
-            "Look for the delete button (usually a trash icon) and click it."
+        await run_cached(
+            self.agent,
+            "Find the unidad with name '{nombre}' in the table/list. "
+            "Look for the delete button (usually a trash icon) and click it.",
+            params={"nombre": self.created_unidad_nombre}
         )
         
         # Confirm deletion
-        await self.agent.run(
+        await run_cached(
+            self.agent,
             "A confirmation dialog should appear asking to confirm deletion. "
-            "Click the confirm/accept button (usually 'Eliminar', 'Delete', or 'OK'). "
-            "Wait for the confirmation dialog to close."
+            "Click the confirm/accept button (usually 'Eliminar', 'Delete', or 'OK')."
+        )
+        
+        # Wait for the toast (the app shows deletions as a red toast) and the
+        # dialog closed; the toast repeats the nombre, so the row check below
+        # only looks at the list itself
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt=(
+                "Wait for a toast notification indicating the unidad was deleted, "
+                "and for the confirmation dialog to close."
+            ),
+            any_of=[".toast-error"],
+            text="eliminada exitosamente",
+            absent=["ngb-modal-window"],
+            timeout_ms=15000
         )
         
-        # Wait for success notification
-        await self.agent.run(
-            "Wait for a success toast notification indicating the unidad was deleted. "
-            "Also wait for the unidades list/table to refresh and the unidad to disappear."
+        # Wait for the row (or card) to be gone from the list
+        await wait_for_angular(
+            self.agent,
+            fallback_prompt="Wait for the deleted unidad to disappear from the list.",
+            absent_text=self.created_unidad_nombre,
+            absent_text_in=".unidades-table tbody tr, .clickable-cards-container"
         )
         
         # Verify deletion in database
         print("  Verifying deletion in database...")
         await self.verify_unidad_in_db(
             nombre=self.created_unidad_nombre,
-            should_exist=False
+            should_exist=False,
+            unidad_id=self.created_unidad_id
         )
         
         print("✓ DELETE test passed")
     
+    def report_trace(self):
+        """Write the JSON trace of the run and print the per-task summary."""
+        if not self.trace:
+            return
+        if self.network and not self.network.steps:
+            self.network.attribute(self.trace)
+        path = write_trace(self.trace)
+        print("\n" + "="*60)
+        print("STEP TIMINGS")
+        print("="*60)
+        print(format_flame(self.trace))
+        if self.network and self.network.steps:
+            print("\nSUPABASE REQUESTS PER STEP")
+            print(self.network.format_report())
+        if self.router:
+            print("\nMODEL TIERS")
+            print(self.router.format_report())
+        print(f"📈 Trace saved: {path}")
+        if store_enabled():
+            self.record_perf()
+    
+    def record_perf(self):
+        """Store the run in the performance history and warn about slowdowns."""
+        try:
+            slower = record_scenario_run(
+                self.trace, self.SCENARIO, self.test_timestamp, batch=self.perf_batch, hermetic=self.hermetic
+            )
+        except Exception as e:
+            print(f"⚠ Could not record the run in the performance history: {e}")
+            return
+        for step in slower:
+            print(f"⚠ Slower than baseline: {step.path} {step.current[0]:.2f}s "
+                  f"({step.ratio:.2f}x its last {len(step.baseline)} passing runs)")
+    
+    async def check_network_budgets(self):
+        """
+        Attribute the app's Supabase requests to steps and enforce the budgets.
+        
+        Raises:
+            AssertionError: If any step exceeded its network budget
+        """
+        if not self.network:
+            return
+        await drain_capture(self.agent)
+        self.network.attribute(self.trace)
+        violations = self.network.violations()
+        if violations:
+            raise AssertionError("Network budget exceeded:\n  " + "\n  ".join(violations))
+    
+    async def snapshot_db_state(self) -> Dict[str, Any]:
+        """
+        Rows this scenario owns as they are now (the created unidad, or its absence).
+        
+        Returns:
+            ``{"unidades": {id: row or None}}``, or {} before the create step
+        """
+        if not self.created_unidad_id:
+            return {}
+        async with trace_step("snapshot checkpoint", kind="db"):
+            response = await (self.supabase.table("unidades")
+                              .select("*")
+                              .eq("id", self.created_unidad_id)
+                              .execute())
+            record(db_calls=1, db_rows=len(response.data))
+        return {"unidades": {self.created_unidad_id: response.data[0] if response.data else None}}
+    
+    async def restore_db_state(self, state: Dict[str, Any]):
+        """Put the checkpointed rows back: upsert recorded rows, delete rows recorded as absent."""
+        async with trace_step("restore checkpoint", kind="db"):
+            for table, rows in state.items():
+                present = [row for row in rows.values() if row is not None]
+                absent = [row_id for row_id, row in rows.items() if row is None]
+                if present:
+                    await self.supabase.table(table).upsert(present).execute()
+                if absent:
+                    await self.supabase.table(table).delete().in_("id", absent).execute()
+                record(db_calls=bool(present) + bool(absent), db_rows=len(present) + len(absent))
+    
+    async def run_steps(self):
+        """
+        Run STEPS in order, checkpointing after each one.
+        
+        When resuming, the checkpointed rows are restored first and only the
+        replay steps and the steps not completed yet run.
+        """
+        steps = list(self.STEPS)
+        if self.resume is not None:
+            await self.restore_db_state(self.resume.db_state)
+            steps = self.resume.pending(self.STEPS)
+            skipped = [step.name for step in self.STEPS if step not in steps]
+            first = next((step.name for step in steps if not step.replay), "the end")
+            print(f"↻ Resuming {self.test_timestamp} at '{first}' (skipping {', '.join(skipped) or 'nothing'})")
+        for step in steps:
+            missing = missing_inputs(self, step)
+            if missing:
+                raise ValueError(f"Step '{step.name}' needs {', '.join(missing)}, which no earlier step set")
+            try:
+                await getattr(self, step.method)()
+            except Exception as e:
+                self.checkpoint.fail(step, e)
+                raise
+            self.checkpoint.complete(
+                step,
+                {name: getattr(self, name) for name in step.outputs},
+                await self.snapshot_db_state()
+            )
+    
     async def run_all_tests(self):
-        """Run all CRUD tests in sequence."""
+        """Run all CRUD tests in sequence, recording a per-step trace."""
         try:
-            await self.setup()
-            
-            # Run tests in sequence
-            await self.test_login_and_navigate()
-            await self.test_create_unidad()
-            await self.test_edit_unidad()
-            await self.test_delete_unidad()
+            with start_trace(f"unidad_crud_{self.test_timestamp}") as self.trace:
+                if capture_enabled():
+                    self.network = NetworkCapture()
+                    use_network_capture(self.network)
+                self.recorder = new_recorder()
+                use_flight_recorder(self.recorder)
+                await self.setup()
+                await self.run_steps()
+                self.checkpoint.remove()
+                await self.check_network_budgets()
             
             print("\n" + "="*60)
             print("✅ ALL TESTS PASSED")
@@ -442,18 +705,34 @@ class UnidadCRUDTest:
             
         except Exception as e:
             print(f"\n❌ TEST FAILED: {e}")
-            await self.take_screenshot("test_failure")
+            await self.take_screenshot("test_failure", e)
             raise
         finally:
             await self.teardown()
+            self.report_trace()
 
 
 async def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Run the Unidad CRUD scenario")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="CHECKPOINT",
+                        help="Continue a failed run from its failed step (default: the latest checkpoint)")
+    args = parser.parse_args()
     base_url = os.getenv("BASE_URL", "http://localhost:4200")
     
-    test = UnidadCRUDTest(base_url=base_url)
-    await test.run_all_tests()
+    resume = None
+    if args.resume:
+        path = latest_checkpoint(UnidadCRUDTest.SCENARIO) if args.resume == "latest" else Path(args.resume)
+        if path is None or not path.exists():
+            print("❌ No checkpoint to resume from")
+            sys.exit(2)
+        resume = ScenarioCheckpoint.load(path)
+    
+    test = UnidadCRUDTest(base_url=base_url, resume=resume)
+    try:
+        await test.run_all_tests()
+    finally:
+        await close_shared_pool()
 
 
 if __name__ == "__main__":
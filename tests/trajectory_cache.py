@@ -0,0 +1,475 @@
+"""
+Record/replay cache for agent action trajectories.
+
+The first time a prompt runs, the concrete browser actions the agent chose
+(click, type, select, navigate, wait) are recorded together with the element
+XPaths it interacted with. The trajectory is keyed by the prompt text and a
+fingerprint of the interactive DOM at the moment the step started. Later runs
+with the same prompt on an identical DOM replay those actions directly in the
+page, without any LLM call. If the fingerprint changed, or replay fails, the
+agent runs again and the trajectory is re-recorded.
+
+Prompts containing run-specific data (e.g. a timestamped unidad name) can be
+passed as a template plus ``params`` so the cache key stays stable:
+
+    await run_cached(agent, "Type '{nombre}' into Nombre", params={"nombre": nombre})
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from browser_use import Agent
+
+from browser_page import get_current_page
+from instrumentation import annotate, record, trace_step
+from network_capture import attach_capture, drain_capture
+from flight_recorder import record_frame
+from model_router import run_agent
+
+
+# Default location of recorded trajectories (override with TRAJECTORY_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".trajectory_cache"
+
+# Longest 'wait' action replayed as-is, in seconds
+MAX_REPLAY_WAIT_SECONDS = 3.0
+
+# Structural fingerprint of what the agent can interact with: every visible
+# interactive element with its identifying attributes and label or button
+# text. Data is left out so the same screen matches across runs: controls in
+# table rows count once per distinct control (whatever the number of rows)
+# and without their text unless they are buttons, and the step's params are
+# replaced by their names before hashing.
+DOM_FINGERPRINT_JS = """
+({ params }) => {
+    const norm = (s) => {
+        let text = (s || '').replace(/\\s+/g, ' ').trim();
+        for (const [name, value] of params) text = text.split(value).join(`{${name}}`);
+        return text.slice(0, 80);
+    };
+    const parts = [location.pathname];
+    const rowControls = new Set();
+    const selector = 'a, button, input, select, textarea, label, [role="tab"], [role="button"], .nav-link';
+    for (const el of document.querySelectorAll(selector)) {
+        if (el.getClientRects().length === 0) continue;
+        const inRow = !!el.closest('tbody tr');
+        const hasText = !['INPUT', 'SELECT', 'TEXTAREA'].includes(el.tagName) && (!inRow || el.tagName === 'BUTTON');
+        const entry = [
+            el.tagName,
+            el.id,
+            el.getAttribute('name'),
+            el.getAttribute('formcontrolname'),
+            el.getAttribute('type'),
+            norm(el.getAttribute('aria-label')),
+            hasText ? norm(el.textContent) : '',
+        ].join('|');
+        if (inRow) rowControls.add(entry); else parts.push(entry);
+    }
+    parts.push(...Array.from(rowControls).map((entry) => 'row|' + entry));
+    return parts.join('\\n');
+}
+"""
+
+# Elements are located by a recorded XPath or, for hand-written (scripted)
+# steps, by a CSS selector optionally narrowed to the visible element whose
+# text contains ``text`` and/or whose row/card contains ``withinText``. A
+# recorded XPath through a table row with ``withinText`` is re-anchored to
+# the row containing that text (rows move as data changes).
+REPLAY_ACTION_JS = """
+async ({ op, xpath, selector, text, withinText, value, timeoutMs }) => {
+    const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const first = (path, root) => document.evaluate(
+        path, root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    const byXpath = () => {
+        const path = xpath.startsWith('/') ? xpath : '/' + xpath;
+        if (!withinText) return first(path, document);
+        // Row-anchored: the same control in the only row containing withinText
+        const match = /^(.*\\/tr)(?:\\[\\d+\\])?((?:\\/.*)?)$/.exec(path);
+        if (!match) return null;
+        const rows = document.evaluate(match[1], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const found = [];
+        for (let i = 0; i < rows.snapshotLength; i++) {
+            const row = rows.snapshotItem(i);
+            if (norm(row.textContent).includes(norm(withinText))) found.push(row);
+        }
+        if (found.length !== 1) return null;
+        return match[2] ? first('.' + match[2], found[0]) : found[0];
+    };
+    const bySelector = () => Array.from(document.querySelectorAll(selector || 'a, button, [role="button"]'))
+        .filter((el) => el.getClientRects().length > 0)
+        .filter((el) => !text || norm(el.textContent).includes(norm(text)))
+        .find((el) => {
+            if (!withinText) return true;
+            const container = el.closest('tr, .card, li');
+            return container && norm(container.textContent).includes(norm(withinText));
+        });
+    const find = () => xpath ? byXpath() : bySelector();
+    const deadline = Date.now() + timeoutMs;
+    let el = find();
+    while ((!el || el.disabled) && Date.now() < deadline) {
+        await new Promise((r) => setTimeout(r, 50));
+        el = find();
+    }
+    if (!el || el.disabled) return false;
+
+    if (op === 'click') {
+        el.click();
+        return true;
+    }
+    if (op === 'select') {
+        const option = Array.from(el.options || [])
+            .find((o) => norm(o.textContent) === norm(value) || o.value === value || o.value.endsWith(`: ${value}`));
+        if (!option) return false;
+        el.value = option.value;
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        return true;
+    }
+    if (op === 'fill') {
+        const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        el.focus();
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.dispatchEvent(new Event('blur'));
+        return true;
+    }
+    return false;
+}
+"""
+
+# Recorded XPaths going through a table row
+_ROW_XPATH = re.compile(r"/tr(\[\d+\])?(/|$)")
+
+# browser-use action names (they changed between releases) -> replay op
+_ACTION_OPS = {
+    "click_element": "click",
+    "click_element_by_index": "click",
+    "click": "click",
+    "input_text": "fill",
+    "input": "fill",
+    "select_dropdown_option": "select",
+    "select_dropdown": "select",
+    "go_to_url": "goto",
+    "navigate": "goto",
+    "open_tab": "goto",
+    "wait": "wait",
+    "done": "done",
+    "scroll_down": "noop",
+    "scroll_up": "noop",
+    "scroll": "noop",
+    "scroll_to_text": "noop",
+    "get_dropdown_options": "noop",
+    "extract_content": "noop",
+}
+
+
+class TrajectoryCache:
+    """File-backed store of recorded trajectories, one JSON file per key."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, enabled: bool = True):
+        self.cache_dir = Path(cache_dir or os.getenv("TRAJECTORY_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, fingerprint: str) -> str:
+        """Cache key for a prompt template on a given DOM fingerprint."""
+        return hashlib.sha256(f"{prompt}\n--\n{fingerprint}".encode("utf-8")).hexdigest()[:24]
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the recorded actions for a key, or None."""
+        if not self.enabled:
+            return None
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))["actions"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, prompt: str, url: str, actions: List[Dict[str, Any]]) -> None:
+        """Store the actions recorded for a key (atomically)."""
+        if not self.enabled:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({
+            "prompt": prompt,
+            "url": url,
+            "recorded_at": time.time(),
+            "actions": actions,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def invalidate(self, key: str) -> None:
+        """Forget the trajectory for a key."""
+        self._path(key).unlink(missing_ok=True)
+
+
+_default_cache: Optional[TrajectoryCache] = None
+
+# Hand-written steps replayed instead of running the agent (hermetic mode)
+_step_script: Optional[List[Dict[str, Any]]] = None
+
+
+def get_default_cache() -> TrajectoryCache:
+    """Process-wide cache, disabled with TRAJECTORY_CACHE=0."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TrajectoryCache(enabled=os.getenv("TRAJECTORY_CACHE", "1") != "0")
+    return _default_cache
+
+
+def use_step_script(script: Optional[List[Dict[str, Any]]]) -> None:
+    """
+    Replace the agent with scripted steps, or restore it with None.
+
+    Each entry is ``{"match": str, "actions": [...]}``; a step runs the
+    actions of the first entry whose ``match`` occurs (case-insensitively) in
+    its prompt template. A prompt without a matching entry raises LookupError
+    instead of reaching the LLM.
+    """
+    global _step_script
+    _step_script = script
+
+
+def _element_xpath(element: Any) -> Optional[str]:
+    """XPath of a browser-use DOMHistoryElement (object or dict form)."""
+    if element is None:
+        return None
+    if isinstance(element, dict):
+        return element.get("xpath")
+    return getattr(element, "xpath", None)
+
+
+def _parametrize(value: Any, params: Dict[str, Any]) -> Any:
+    """Replace a recorded value equal to a param with a reference to it."""
+    for name, param in params.items():
+        if str(value) == str(param):
+            return {"param": name}
+    return value
+
+
+def _resolve(value: Any, params: Dict[str, Any]) -> Any:
+    """Inverse of _parametrize: substitute a ``{"param": name}`` reference."""
+    if isinstance(value, dict) and "param" in value:
+        return str(params[value["param"]])
+    return value
+
+
+def extract_actions(history: Any, params: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Convert a browser-use AgentHistoryList into replayable actions.
+
+    Args:
+        history: Return value of ``agent.run``
+        params: Prompt parameters; recorded values equal to one of them are
+            stored as references so the trajectory works for other values
+
+    Returns:
+        List of ``{"op", "xpath", "value"}`` dicts, or None if the run failed
+        or used an action that cannot be replayed
+    """
+    params = params or {}
+    if history is None or not hasattr(history, "model_actions"):
+        return None
+    if hasattr(history, "has_errors") and history.has_errors():
+        return None
+    if hasattr(history, "is_successful") and history.is_successful() is False:
+        return None
+
+    actions = []
+    for raw in history.model_actions():
+        element = raw.get("interacted_element")
+        names = [name for name in raw if name != "interacted_element"]
+        if not names:
+            continue
+        name = names[0]
+        args = raw[name] or {}
+        op = _ACTION_OPS.get(name)
+        if op is None:
+            return None
+        if op in ("noop", "done"):
+            continue
+        if op == "goto":
+            actions.append({"op": "goto", "value": _parametrize(args.get("url"), params)})
+        elif op == "wait":
+            actions.append({"op": "wait", "value": float(args.get("seconds", 1))})
+        else:
+            xpath = _element_xpath(element)
+            if not xpath:
+                return None
+            value = args.get("text")
+            action = {"op": op, "xpath": xpath, "value": _parametrize(value, params)}
+            # Controls in table rows are found again by the step's first
+            # param (e.g. the unidad nombre), not by the row's position
+            if params and _ROW_XPATH.search(xpath):
+                action["within_text"] = {"param": next(iter(params))}
+            actions.append(action)
+    return actions
+
+
+async def replay_actions(
+    page: Any,
+    actions: List[Dict[str, Any]],
+    params: Optional[Dict[str, Any]] = None,
+    timeout_ms: int = 3000
+) -> bool:
+    """
+    Replay recorded actions directly in the page.
+
+    Each action has an ``op`` (click, fill, select, goto, wait) and locates
+    its element by ``xpath`` (recorded) or ``selector``/``text``/
+    ``within_text`` (scripted). ``value``, ``text`` and ``within_text`` may be
+    ``{"param": name}`` references resolved from ``params``.
+
+    Returns:
+        True if every action was applied, False on the first failure
+    """
+    params = params or {}
+    for action in actions:
+        try:
+            value, text, within_text = (
+                _resolve(action.get(field), params) for field in ("value", "text", "within_text")
+            )
+        except KeyError:
+            return False
+
+        op = action["op"]
+        try:
+            if op == "goto":
+                await page.goto(value)
+            elif op == "wait":
+                await asyncio.sleep(min(float(value), MAX_REPLAY_WAIT_SECONDS))
+            else:
+                applied = await page.evaluate(REPLAY_ACTION_JS, {
+                    "op": op,
+                    "xpath": action.get("xpath"),
+                    "selector": action.get("selector"),
+                    "text": text,
+                    "withinText": within_text,
+                    "value": value,
+                    "timeoutMs": timeout_ms,
+                })
+                if not applied:
+                    return False
+        except Exception:
+            return False
+    return True
+
+
+async def dom_fingerprint(page: Any, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Hash of the interactive DOM of the page, or None if unavailable.
+
+    Args:
+        page: Page object (see browser_page.get_current_page)
+        params: Step params, replaced by their names before hashing
+    """
+    values = sorted(((name, str(value)) for name, value in (params or {}).items() if str(value)),
+                    key=lambda item: -len(item[1]))
+    try:
+        structure = await page.evaluate(DOM_FINGERPRINT_JS, {"params": values})
+    except Exception:
+        return None
+    return hashlib.sha256(structure.encode("utf-8")).hexdigest()
+
+
+async def run_cached(
+    agent: Agent,
+    prompt: str,
+    params: Optional[Dict[str, Any]] = None,
+    cache: Optional[TrajectoryCache] = None
+) -> Any:
+    """
+    Run an agent step, replaying a recorded trajectory when possible.
+
+    Args:
+        agent: The browser-use Agent instance
+        prompt: Task for the agent; may contain ``{name}`` placeholders
+        params: Values for the placeholders in ``prompt``
+        cache: Trajectory cache to use (default: process-wide cache)
+
+    Returns:
+        The agent history when the agent ran, None when the step was replayed
+        or done by a direct action (see model_router)
+    """
+    params = params or {}
+    cache = cache or get_default_cache()
+    task = prompt.format(**params) if params else prompt
+
+    async with trace_step(" ".join(prompt.split())[:60], kind="agent"):
+        annotate(prompt=prompt)
+        await attach_capture(agent)
+        error: Optional[BaseException] = None
+        try:
+            return await _run_cached(agent, prompt, task, params, cache)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            await drain_capture(agent)
+            await record_frame(agent, task, error)
+
+
+async def _run_cached(
+    agent: Agent,
+    prompt: str,
+    task: str,
+    params: Dict[str, Any],
+    cache: TrajectoryCache
+) -> Any:
+    """Body of run_cached, executed inside its trace span."""
+    if _step_script is not None:
+        return await _run_scripted(agent, prompt, params)
+
+    page = await get_current_page(agent)
+    fingerprint = await dom_fingerprint(page, params) if page is not None and cache.enabled else None
+    if fingerprint is None:
+        return await run_agent(agent, prompt, task, params, page)
+
+    key = TrajectoryCache.make_key(prompt, fingerprint)
+    actions = cache.get(key)
+    if actions is not None:
+        if await replay_actions(page, actions, params):
+            cache.hits += 1
+            annotate(replayed=True)
+            record(browser_actions=len(actions))
+            return None
+        print("  ⚠ Trajectory replay failed, re-recording with agent")
+        cache.invalidate(key)
+
+    cache.misses += 1
+    annotate(replayed=False)
+    history = await run_agent(agent, prompt, task, params, page)
+    if history is None:
+        # Done by a direct action (see model_router), nothing to record
+        return None
+    recorded = extract_actions(history, params)
+    # Steps without browser actions only observed or waited; replaying them
+    # as a no-op would silently drop the check, so they are never cached
+    if recorded:
+        cache.put(key, prompt, getattr(page, "url", ""), recorded)
+    return history
+
+
+async def _run_scripted(agent: Agent, prompt: str, params: Dict[str, Any]) -> None:
+    """Run a step from the step script (see use_step_script)."""
+    normalized = " ".join(prompt.split()).lower()
+    entry = next((e for e in _step_script if e["match"].lower() in normalized), None)
+    if entry is None:
+        raise LookupError(f"No scripted step matches prompt: {normalized[:80]!r}")
+    page = await get_current_page(agent, start=True)
+    if page is None:
+        raise RuntimeError("Scripted step needs a browser page, none is available")
+    if not await replay_actions(page, entry["actions"], params, timeout_ms=10000):
+        raise RuntimeError(f"Scripted step '{entry['match']}' could not be applied on {page.url}")
+    annotate(scripted=True)
+    record(browser_actions=len(entry["actions"]))
@@ -0,0 +1,135 @@
+"""
+Streaming reader for the first sheet of an XLSX file.
+
+Parses the sheet XML incrementally with expat, a block at a time, so memory
+is bounded by the shared-strings table rather than by the number of rows.
+Cell values come back as strings, like a CSV read with ``dtype=str``:
+numbers keep their XML text ('175000', '3.5'), empty cells are ''.
+"""
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List
+from xml.etree.ElementTree import iterparse
+from xml.parsers.expat import ParserCreate
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+@lru_cache(maxsize=None)
+def _letters_index(letters: str) -> int:
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _column_index(ref: str) -> int:
+    """Zero-based column index of a cell reference such as 'AB12'."""
+    return _letters_index(ref.rstrip("0123456789"))
+
+
+def _first_sheet_path(zf: zipfile.ZipFile) -> str:
+    """Path of the first worksheet inside the archive."""
+    try:
+        with zf.open("xl/workbook.xml") as f:
+            for _, element in iterparse(f):
+                if element.tag == f"{_NS}sheet":
+                    rel_id = element.get(f"{_REL_NS}id")
+                    break
+            else:
+                rel_id = None
+        with zf.open("xl/_rels/workbook.xml.rels") as f:
+            for _, element in iterparse(f):
+                if element.get("Id") == rel_id:
+                    target = element.get("Target").lstrip("/")
+                    return target if target.startswith("xl/") else f"xl/{target}"
+    except KeyError:
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, element in iterparse(f):
+            if element.tag == f"{_NS}si":
+                strings.append("".join(t.text or "" for t in element.iter(f"{_NS}t")))
+                element.clear()
+    return strings
+
+
+def iter_xlsx_rows(path: Path, read_size: int = 1 << 20) -> Iterator[List[str]]:
+    """
+    Yield the rows of the first sheet as lists of strings.
+
+    Uses expat directly (no element tree) and feeds the sheet in
+    ``read_size`` blocks; short rows are padded to the header's width.
+    Rows missing from the sheet XML (empty rows) come back as empty rows,
+    except before the first row, so row positions match the spreadsheet.
+    Cells without an ``r`` reference follow the previous cell of their row.
+    """
+    with zipfile.ZipFile(path) as zf:
+        strings = _shared_strings(zf)
+        parser = ParserCreate()
+        parser.buffer_text = True
+        rows: List[List[str]] = []
+        state = {"row": [], "number": 0, "last": 0, "col": 0, "next": 0, "type": None, "text": None, "width": 0}
+
+        def start(name: str, attrs: Dict[str, str]) -> None:
+            if name == "c":
+                ref = attrs.get("r")
+                state["col"] = _column_index(ref) if ref else state["next"]
+                state["type"] = attrs.get("t")
+            elif name in ("v", "t"):
+                state["text"] = []
+            elif name == "row":
+                ref = attrs.get("r")
+                state["number"] = int(ref) if ref else state["last"] + 1
+                state["row"] = []
+                state["next"] = 0
+
+        def data(text: str) -> None:
+            if state["text"] is not None:
+                state["text"].append(text)
+
+        def end(name: str) -> None:
+            if name == "c":
+                value = "".join(state["text"] or ())
+                kind = state["type"]
+                if kind == "s" and value:
+                    value = strings[int(value)]
+                elif kind == "b":
+                    value = "TRUE" if value == "1" else "FALSE"
+                row, col = state["row"], state["col"]
+                if col >= len(row):
+                    row.extend([""] * (col + 1 - len(row)))
+                row[col] = value
+                state["next"] = col + 1
+                state["text"] = None
+            elif name == "row":
+                row, width = state["row"], state["width"]
+                if not width:
+                    state["width"] = len(row)
+                else:
+                    # Empty rows the sheet leaves out
+                    rows.extend([""] * width for _ in range(state["number"] - state["last"] - 1))
+                    row.extend([""] * (width - len(row)))
+                state["last"] = state["number"]
+                rows.append(row)
+
+        parser.StartElementHandler = start
+        parser.CharacterDataHandler = data
+        parser.EndElementHandler = end
+        with zf.open(_first_sheet_path(zf)) as f:
+            while True:
+                block = f.read(read_size)
+                parser.Parse(block, not block)
+                yield from rows
+                rows.clear()
+                if not block:
+                    break